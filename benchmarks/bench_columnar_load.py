@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: export size and dashboard cold load, JSON vs Parquet
+
+Aggregates a synthetic multi-account Prowler tree once (which writes both
+the JSON and the Parquet export), then compares:
+
+- file size of aggregated_findings_*.json vs *.parquet (+ remediations)
+- cold load of the findings list page, as the dashboard does it:
+  get_snapshot() (reads the export and sets up its index) followed by
+  GET /findings (first page, facet counts)
+    parquet: the newest run's Parquet export, read column by column
+    json:    the same run once the Parquet files are removed (the whole
+             document is parsed)
+
+The Parquet run also lists the columns the page actually read.
+
+Usage:
+    python benchmarks/bench_columnar_load.py
+    python benchmarks/bench_columnar_load.py --accounts 50 --checks 20000
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from bench_parallel_load import build_tree  # noqa: E402
+from dashboard import app as dashboard_app  # noqa: E402
+from scripts.scanning.aggregate_findings import FindingsAggregator  # noqa: E402
+
+
+def cold_list_page(client) -> float:
+    """Time get_snapshot() plus the first findings page, with nothing cached."""
+    dashboard_app._snapshot = None
+    dashboard_app._pointer_cache = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        dashboard_app.get_snapshot()
+        response = client.get('/findings')
+        elapsed = time.perf_counter() - start
+    assert response.status_code == 200
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--accounts', type=int, default=20)
+    parser.add_argument('--checks', type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        build_tree(root / "output", args.accounts, args.checks)
+        aggregator = FindingsAggregator(root / "output", root / "scoutsuite", root / "aggregated",
+                                        use_cache=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            aggregator.aggregate_findings()
+            aggregator.export_results()
+
+        out = root / "aggregated"
+        json_file = next(out.glob("aggregated_findings_*.json"))
+        parquet_file = next(out.glob("aggregated_findings_*.parquet"))
+        parquet_size = parquet_file.stat().st_size + next(out.glob("remediations_*.parquet")).stat().st_size
+
+        print(f"{len(aggregator.findings)} findings")
+        print(f"  JSON export:    {json_file.stat().st_size / 1e6:8.2f} MB")
+        print(f"  Parquet export: {parquet_size / 1e6:8.2f} MB")
+
+        # Serve the files, not the SQLite store written next to them
+        (out / "findings.db").unlink(missing_ok=True)
+        dashboard_app.FINDINGS_DIR = out
+        client = dashboard_app.app.test_client()
+        # Compile the page templates first, so only the data is timed
+        cold_list_page(client)
+
+        elapsed = cold_list_page(client)
+        columns = dashboard_app.get_snapshot().findings.loaded_columns
+        print(f"  Cold list page, Parquet: {elapsed * 1000:8.1f} ms "
+              f"({len(columns)} columns read: {', '.join(columns)})")
+
+        for path in out.glob("*.parquet"):
+            path.unlink()
+        print(f"  Cold list page, JSON:    {cold_list_page(client) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
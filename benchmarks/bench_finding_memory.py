@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory held by normalized findings, dicts vs Finding records
+
+Streams a synthetic Prowler file through the normalizer and measures how
+much memory the retained findings occupy (tracemalloc, after the raw check
+rows have been released):
+
+- dict:    the previous representation, one 16-key dict per finding
+- Finding: the slotted record with interned shared strings
+
+Usage:
+    python benchmarks/bench_finding_memory.py
+    python benchmarks/bench_finding_memory.py --findings 500000
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from bench_parallel_load import make_check  # noqa: E402
+from scripts.scanning.aggregate_findings import FindingsAggregator, iter_json_array  # noqa: E402
+
+
+def as_dict(finding) -> dict:
+    """Rebuild the old per-finding dict, with its own (non-interned) strings."""
+    return {
+        name: (value.encode().decode() if isinstance(value, str) else value)
+        for name, value in finding.to_dict().items()
+    }
+
+
+def retained_bytes(path: Path, aggregator: FindingsAggregator, convert) -> tuple:
+    """Normalize every FAIL row in path and return (bytes retained, count)."""
+    gc.collect()
+    tracemalloc.start()
+    with open(path) as f:
+        findings = [
+            convert(aggregator._normalize_prowler_finding(check))
+            for check in iter_json_array(f)
+            if check.get('Status') == 'FAIL'
+        ]
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, len(findings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--findings', type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "prowler-output-bench.json"
+        # make_check() fails one row in ten; generate only the FAIL rows
+        rows = [make_check('123456789012', i * 10) for i in range(args.findings)]
+        with open(path, 'w') as f:
+            json.dump(rows, f)
+        del rows
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            aggregator = FindingsAggregator(tmp, tmp, tmp, use_cache=False)
+
+        print(f"{'representation':>15} {'MB retained':>12} {'bytes/finding':>14}")
+        for label, convert in (('dict', as_dict), ('Finding', lambda f: f)):
+            used, count = retained_bytes(path, aggregator, convert)
+            print(f"{label:>15} {used / 2**20:>12.1f} {used / count:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: multi-account Prowler loading vs. number of worker processes
+
+Builds a synthetic multi-account output/ tree (one prowler-output-*.json
+per numeric account folder, like run_multi_account_scan.sh produces) and
+times FindingsAggregator.load_prowler_findings() for several --workers
+values.
+
+Usage:
+    python benchmarks/bench_parallel_load.py
+    python benchmarks/bench_parallel_load.py --accounts 300 --checks 2000 --workers 1 2 4 8 16
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.scanning.aggregate_findings import FindingsAggregator  # noqa: E402
+
+
+def make_check(account_id: str, index: int) -> dict:
+    """One Prowler v3 check row; roughly one in ten fails."""
+    return {
+        'AccountId': account_id,
+        'CheckID': f"s3_check_{index % 40}",
+        'CheckTitle': 'Ensure S3 buckets have default encryption enabled',
+        'Status': 'FAIL' if index % 10 == 0 else 'PASS',
+        'StatusExtended': f"Bucket bucket-{index} does not have encryption enabled.",
+        'Severity': 'medium',
+        'ResourceId': f"bucket-{index}",
+        'ResourceArn': f"arn:aws:s3:::bucket-{index}",
+        'Region': 'us-east-1',
+        'Description': 'Checks whether default encryption is configured. ' * 4,
+        'Risk': 'Unencrypted data can be read if the bucket is exposed. ' * 4,
+        'Remediation': {
+            'Code': {
+                'CLI': 'aws s3api put-bucket-encryption --bucket <BUCKET_NAME> ...',
+                'Terraform': 'resource "aws_s3_bucket_server_side_encryption_configuration" {}',
+            },
+            'Recommendation': {
+                'Text': 'Enable default encryption. Use SSE-KMS where possible.',
+                'Url': 'https://docs.aws.amazon.com/AmazonS3/latest/userguide/default-bucket-encryption.html',
+            },
+        },
+        'Compliance': {'CIS-1.5': ['2.1.1'], 'NIST-800-53': ['SC-28']},
+    }
+
+
+def build_tree(root: Path, accounts: int, checks: int) -> None:
+    for a in range(accounts):
+        account_id = f"{100000000000 + a}"
+        account_dir = root / account_id
+        account_dir.mkdir(parents=True)
+        rows = [make_check(account_id, i) for i in range(checks)]
+        with open(account_dir / f"prowler-output-{account_id}-20240101.json", 'w') as f:
+            json.dump(rows, f, indent=2)
+
+
+def time_load(prowler_dir: Path, output_dir: Path, workers: int) -> tuple:
+    aggregator = FindingsAggregator(
+        prowler_dir=str(prowler_dir),
+        scoutsuite_dir=str(prowler_dir / "no-scoutsuite"),
+        output_dir=str(output_dir),
+        workers=workers
+    )
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        findings = aggregator.load_prowler_findings()
+    return time.perf_counter() - start, len(findings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--accounts', type=int, default=64)
+    parser.add_argument('--checks', type=int, default=2000, help="Check rows per account")
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=[1, 2, 4, 8, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prowler_dir = Path(tmp) / "output"
+        print(f"Building {args.accounts} accounts x {args.checks} checks...")
+        build_tree(prowler_dir, args.accounts, args.checks)
+
+        print(f"\n{'workers':>8} {'seconds':>10} {'speedup':>8} {'findings':>10}")
+        baseline = None
+        for workers in sorted(set(args.workers)):
+            elapsed, count = time_load(prowler_dir, Path(tmp) / "aggregated", workers)
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {elapsed:>10.2f} {baseline / elapsed:>7.2f}x {count:>10}")
+
+
+if __name__ == "__main__":
+    main()
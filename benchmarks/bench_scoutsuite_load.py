@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak memory of ScoutSuite results parsing
+
+Writes a synthetic scoutsuite_results_azure-*.js file and compares the
+previous read/split/strip loader with the memory-mapped
+read_scoutsuite_results(). Each loader runs in a fresh subprocess so the
+measurements do not influence each other.
+
+Reported per loader:
+- heap peak:  tracemalloc peak (Python allocations: strings, dicts, lists)
+- max RSS:    resident set size high-water mark of the subprocess
+
+Usage:
+    python benchmarks/bench_scoutsuite_load.py
+    python benchmarks/bench_scoutsuite_load.py --findings 200000
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+
+# Runs inside the subprocess: load the file with one loader and print stats
+MEASURE = r'''
+import json, resource, sys, time, tracemalloc
+sys.path.insert(0, sys.argv[1])
+from scripts.scanning.aggregate_findings import read_scoutsuite_results
+
+def legacy(path):
+    with open(path, 'r') as f:
+        content = f.read()
+    json_str = content.split('scoutsuite_results =', 1)[1].strip()
+    if json_str.startswith('\n'):
+        json_str = json_str[1:]
+    return json.loads(json_str)
+
+loader = {'legacy': legacy, 'mmap': read_scoutsuite_results}[sys.argv[2]]
+tracemalloc.start()
+start = time.perf_counter()
+data = loader(sys.argv[3])
+elapsed = time.perf_counter() - start
+_, peak = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({'peak': peak, 'rss_kb': rss_kb, 'seconds': elapsed,
+                  'services': len(data['services'])}))
+'''
+
+
+def build_results(path: Path, findings: int) -> None:
+    services = {}
+    for i in range(findings):
+        service = services.setdefault(f"service{i % 20}", {'findings': {}})
+        service['findings'][f"finding-{i}"] = {
+            'description': 'Storage account allows traffic over HTTP ' * 3,
+            'rationale': 'Data in transit should be encrypted. ' * 5,
+            'remediation': '<ol><li>Open the storage account</li><li>Enable secure transfer</li></ol>',
+            'level': 'warning',
+            'flagged_items': 2,
+            'items': [f"storageaccounts.subscriptions.sub.storage_accounts.acct{i}.{j}"
+                      for j in range(2)],
+        }
+    with open(path, 'w') as f:
+        f.write("scoutsuite_results =\n")
+        json.dump({'services': services}, f, indent=2)
+
+
+def measure(loader: str, path: Path) -> dict:
+    out = subprocess.run(
+        [sys.executable, '-c', MEASURE, str(PROJECT_ROOT), loader, str(path)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--findings', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "scoutsuite_results_azure-tenant-bench.js"
+        build_results(path, args.findings)
+        size_mb = path.stat().st_size / 2**20
+        print(f"Results file: {size_mb:.1f} MB ({args.findings} findings)\n")
+
+        print(f"{'loader':>8} {'heap peak MB':>13} {'max RSS MB':>11} {'seconds':>8}")
+        for loader in ('legacy', 'mmap'):
+            stats = measure(loader, path)
+            print(f"{loader:>8} {stats['peak'] / 2**20:>13.1f} "
+                  f"{stats['rss_kb'] / 1024:>11.1f} {stats['seconds']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
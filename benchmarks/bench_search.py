@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: dashboard text search, substring scan vs inverted index
+
+Builds a synthetic snapshot of normalized findings and times, per query:
+
+- scan:  the previous approach, a lowercase substring test of every
+         finding's searchable fields (what data-searchable did in the browser)
+- index: FindingsIndex.search() (first call, then a repeated call that is
+         served from the search cache, as when paging through results)
+
+Usage:
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --findings 500000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from dashboard.findings_index import TEXT_FIELDS, FindingsIndex  # noqa: E402
+
+QUERIES = ['bucket-4242', 'encryption', 'publ', 'logging bucket-42', 'nomatch']
+
+
+def make_finding(index: int) -> dict:
+    check = index % 40
+    return {
+        'severity': ('Critical', 'High', 'Medium', 'Low')[index % 4],
+        'cloud_provider': 'AWS',
+        'account_id': f"{100000000000 + index % 25}",
+        'source': 'Prowler',
+        'region': ('us-east-1', 'us-west-2', 'eu-west-1')[index % 3],
+        'finding_id': f"s3_check_{check}",
+        'title': f"Check {check}: bucket encryption, logging and public access",
+        'resource': f"bucket-{index}",
+        'resource_arn': f"arn:aws:s3:::bucket-{index}",
+        'issue': f"Bucket bucket-{index} does not have encryption enabled.",
+        'risk': 'Unencrypted data can be read if the bucket is exposed.',
+    }
+
+
+def timed(function, repeat: int = 5) -> float:
+    """Best wall time of several runs, in milliseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--findings', type=int, default=100000)
+    args = parser.parse_args()
+
+    findings = [make_finding(i) for i in range(args.findings)]
+    start = time.perf_counter()
+    index = FindingsIndex(findings)
+    print(f"{args.findings} findings, index built in {time.perf_counter() - start:.2f}s "
+          f"({len(index.vocabulary)} distinct words)")
+    print()
+    print(f"{'query':<18} {'matches':>8} {'scan ms':>9} {'index ms':>9} {'cached ms':>10}")
+
+    for query in QUERIES:
+        needle = query.lower()
+
+        def scan():
+            return [p for p, f in enumerate(findings)
+                    if needle in ' '.join(str(f.get(k) or '') for k in TEXT_FIELDS).lower()]
+
+        def search():
+            index._searches.clear()
+            return index.search(query)
+
+        matches = len(index.search(query))
+        print(f"{query:<18} {matches:>8} {timed(scan, 1):>9.1f} {timed(search):>9.3f} "
+              f"{timed(lambda: index.search(query)):>10.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -23,11 +23,42 @@ For more complex pages, we use templates:
         return render_template('dashboard.html', findings=data)
 """
 
+import hashlib
 import json
-import os
-from datetime import datetime
+import re
+import sys
+import threading
+from collections import Counter
+from datetime import datetime, timezone
 from pathlib import Path
-from flask import Flask, render_template, jsonify
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from flask import Flask, Response, render_template, jsonify, request, send_file
+
+try:
+    from .findings_index import FILTER_FIELDS, FindingsIndex, InvalidQuery
+    from .ndjson_findings import NdjsonFindings
+    from .parquet_findings import PARQUET_AVAILABLE, ParquetFindings, read_remediations
+    from .sql_findings import SQL_AVAILABLE, latest_scan, load_scan
+    from .trends import DEFAULT_POINTS, MAX_POINTS, load_history, parse_time, trends
+except ImportError:
+    # Running as a script: python dashboard/app.py
+    from findings_index import FILTER_FIELDS, FindingsIndex, InvalidQuery
+    from ndjson_findings import NdjsonFindings
+    from parquet_findings import PARQUET_AVAILABLE, ParquetFindings, read_remediations
+    from sql_findings import SQL_AVAILABLE, latest_scan, load_scan
+    from trends import DEFAULT_POINTS, MAX_POINTS, load_history, parse_time, trends
+
+# The diff is shared with `aggregate_findings.py diff`, so both find and
+# compare runs (including compacted ones) the same way. Compressed exports
+# are read with the aggregator's own compression module.
+try:
+    from scripts.scanning.compression import ZSTD_AVAILABLE, compression_of, open_text
+    from scripts.scanning.scan_diff import ScanDiff, diff_scans, resolve_scans, scan_file
+except ImportError:
+    # Running as a script (python dashboard/app.py): add the project root
+    sys.path.insert(0, str(Path(__file__).absolute().parent.parent))
+    from scripts.scanning.compression import ZSTD_AVAILABLE, compression_of, open_text
+    from scripts.scanning.scan_diff import ScanDiff, diff_scans, resolve_scans, scan_file
 
 # =============================================================================
 # FLASK APP INITIALIZATION
@@ -43,34 +74,383 @@ PROJECT_ROOT = Path(__file__).parent.parent.absolute()
 # Where our aggregated findings are stored
 FINDINGS_DIR = PROJECT_ROOT / "scan-results" / "aggregated"
 
+# Page size limits for /api/findings
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# SQLite store written by the aggregator next to the exports
+# (see scripts/scanning/findings_store.py)
+FINDINGS_DB_NAME = "findings.db"
+
+# Names the newest run's files, so we do not have to list the directory
+# (written by the aggregator, see scripts/scanning/retention.py)
+LATEST_POINTER = "latest.json"
+
+# Per-run counts written by the aggregator (see scripts/scanning/scan_history.py)
+HISTORY_SCANS_FILE = Path("history") / "scans.jsonl"
+
+# Export formats the dashboard can read, as file patterns. Parquet is
+# only used when pyarrow is installed, zstd-compressed NDJSON only when
+# zstandard is; the aggregator writes Parquet last, so it is the newest
+# file of an export that has one.
+FINDINGS_PATTERNS = (
+    ("aggregated_findings_*.json", "aggregated_findings_*.ndjson",
+     "aggregated_findings_*.ndjson.gz")
+    + (("aggregated_findings_*.ndjson.zst",) if ZSTD_AVAILABLE else ())
+    + (("aggregated_findings_*.parquet",) if PARQUET_AVAILABLE else ())
+)
+
+# Media type of /api/export
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Cache-Control max-age (seconds) of the JSON API. Responses carry an
+# ETag and Last-Modified, so pollers and reverse proxies can keep a copy
+# and revalidate it with a conditional request that costs a 304 and no
+# body. With 0 they revalidate on every use, so a new aggregation run
+# shows up at once; raise it to let a proxy answer without asking.
+API_MAX_AGE = 0
+
+# Findings per page on the /findings page
+FINDINGS_PER_PAGE = 50
+
+# Filters offered by the /findings page (a subset of FILTER_FIELDS)
+PAGE_FILTERS = ('severity', 'provider', 'account')
+
 
 # =============================================================================
 # HELPER FUNCTIONS
 # =============================================================================
 
-def load_latest_findings():
+class Snapshot(NamedTuple):
     """
-    Load the most recent aggregated findings JSON file.
+    Everything the dashboard serves, parsed from one aggregation run.
 
-    Returns a list of finding dictionaries, or an empty list if no files found.
+    A snapshot is never modified after it is built. When a newer export
+    appears we build a complete new snapshot and swap it in, so a request
+    always sees either the old data or the new data, never a mix.
+    """
+    # Identity of the data this snapshot was loaded from:
+    # ((findings path, mtime), (summary path, mtime)) for export files,
+    # ('store', scan id) for the SQLite store
+    key: Tuple
+    # A list, or a lazy NdjsonFindings / ParquetFindings reading from disk
+    findings: Sequence
+    remediations: Dict[str, Dict]
+    summary: Dict
+    # Filter/sort indexes over findings (see findings_index.py), or the
+    # same queries answered by the store (see sql_findings.py)
+    index: FindingsIndex
+    # HTTP validators for the API (see _not_modified): the ETag changes
+    # whenever the data does; modified is when the data was written
+    # (Unix time), for Last-Modified
+    etag: str = ''
+    modified: Optional[float] = None
+
+
+# The current snapshot. Replacing it is a single reference assignment,
+# which is atomic, so readers never need the lock.
+_snapshot: Optional[Snapshot] = None
+# Makes sure only one request re-parses when a new export shows up
+_snapshot_lock = threading.Lock()
+
+
+def _export_timestamp(path: Path) -> str:
+    """aggregated_findings_20240101_120000.ndjson.gz -> 20240101_120000"""
+    return path.name.split('.', 1)[0][len('aggregated_findings_'):]
+
+
+def _is_ndjson(path: Path) -> bool:
+    """Whether an export is NDJSON, compressed or not."""
+    return '.ndjson' in path.suffixes
+
+
+def _compressed_lines(path: Path) -> Iterator[bytes]:
+    """The non-empty lines of a compressed NDJSON export, decompressed as they are read."""
+    with open_text(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line.encode()
+
+
+def _read_aggregate(latest_file: Path) -> Tuple[Sequence, Dict[str, Dict]]:
+    """
+    Parse an aggregated findings JSON file into (findings, remediations).
+
+    Older exports are a plain list of findings with the remediation inlined
+    in every finding; for those the remediation table is empty.
+
+    NDJSON and Parquet exports are not parsed up front: findings are read
+    from the file as they are needed (see ndjson_findings.py and
+    parquet_findings.py), and the remediation table comes from the
+    remediations_<timestamp> file written next to them. Compressed NDJSON
+    cannot be read line by line at random, so it is decoded into a list
+    (see scripts/scanning/compression.py).
+    """
+    print(f"Loading findings from: {latest_file}")
+    timestamp = _export_timestamp(latest_file)
+
+    if latest_file.suffix == '.parquet':
+        remediations_file = latest_file.with_name(f"remediations_{timestamp}.parquet")
+        remediations = read_remediations(remediations_file) if remediations_file.exists() else {}
+        return ParquetFindings(latest_file), remediations
+
+    if _is_ndjson(latest_file):
+        remediations_file = latest_file.with_name(f"remediations_{timestamp}.json")
+        remediations = {}
+        if remediations_file.exists():
+            with open(remediations_file, 'r') as f:
+                remediations = json.load(f)
+        if compression_of(latest_file):
+            return [json.loads(line) for line in _compressed_lines(latest_file)], remediations
+        return NdjsonFindings(latest_file), remediations
+
+    with open(latest_file, 'r') as f:
+        data = json.load(f)
+
+    if isinstance(data, list):
+        return data, {}
+    return data.get('findings', []), data.get('remediations', {})
+
+
+def _exports() -> Dict[str, Path]:
+    """
+    Export file of each aggregation run on disk, by timestamp
+    (YYYYMMDD_HHMMSS), oldest first. When a run has several formats the
+    last one in FINDINGS_PATTERNS is used.
+    """
+    exports = {}
+    for pattern in FINDINGS_PATTERNS:
+        for path in FINDINGS_DIR.glob(pattern):
+            exports[_export_timestamp(path)] = path
+    return dict(sorted(exports.items()))
+
+
+def _latest_export() -> Tuple[Optional[Tuple[Path, int]], Optional[Tuple[Path, int]]]:
+    """
+    ((findings path, mtime_ns), (summary path, mtime_ns)) of the newest
+    export on disk, for results written before latest.json existed.
+
+    The newest run is picked by the timestamp in the file names, so only
+    the two files used are stat()ed, and the summary always belongs to
+    the same run as the findings.
+    """
+    exports = _exports()
+    if not exports:
+        return None, None
+    timestamp, findings_file = exports.popitem()
+    summary_file = FINDINGS_DIR / f"findings_summary_{timestamp}.json"
+    summary = (summary_file, summary_file.stat().st_mtime_ns) if summary_file.exists() else None
+    return (findings_file, findings_file.stat().st_mtime_ns), summary
+
+
+# (mtime_ns, parsed pointer) of the last latest.json read
+_pointer_cache: Optional[Tuple[int, Dict]] = None
+
+
+def _read_pointer() -> Optional[Dict]:
+    """
+    The newest run according to latest.json, or None if there is no
+    pointer (results written before it existed). One stat per call; the
+    file is only parsed again when it changes.
+    """
+    global _pointer_cache
+
+    path = FINDINGS_DIR / LATEST_POINTER
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    cached = _pointer_cache
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+    with open(path, 'r') as f:
+        pointer = json.load(f)
+    _pointer_cache = (mtime_ns, pointer)
+    return pointer
+
+
+def _pointer_key(pointer: Dict) -> Optional[Tuple]:
+    """Snapshot key for the run latest.json points at (see get_snapshot)."""
+    if pointer.get('store_scan') is not None and SQL_AVAILABLE \
+            and (FINDINGS_DIR / FINDINGS_DB_NAME).exists():
+        return ('store', pointer['store_scan'])
+
+    summary_file = FINDINGS_DIR / pointer['summary']
+    summary = (summary_file, summary_file.stat().st_mtime_ns) if summary_file.exists() else None
+    for name in pointer.get('findings', []):
+        if name.endswith('.parquet') and not PARQUET_AVAILABLE:
+            continue
+        if name.endswith('.zst') and not ZSTD_AVAILABLE:
+            continue
+        findings_file = FINDINGS_DIR / name
+        if findings_file.exists():
+            return ((findings_file, findings_file.stat().st_mtime_ns), summary)
+    return None
+
+
+def _latest_store_scan() -> Optional[Dict]:
+    """The newest scan in the SQLite store, if there is a usable store."""
+    db_file = FINDINGS_DIR / FINDINGS_DB_NAME
+    if not SQL_AVAILABLE or not db_file.exists():
+        return None
+    return latest_scan(db_file)
+
+
+def get_snapshot() -> Snapshot:
+    """
+    Return the snapshot for the newest aggregation run.
+
+    WHY CACHE?
+    Re-parsing the findings JSON on every request makes each page load as
+    slow as the file is big. Instead we keep the parsed data in memory and
+    only check (with a cheap stat) whether a newer export has appeared.
+    The file is parsed again only when it has actually changed.
+
+    When the SQLite store holds the newest run, nothing is parsed at all:
+    the snapshot's findings and index send their queries to the store.
+
+    The newest run is found through latest.json, which the aggregator
+    updates after each export: one small file instead of listing the
+    whole directory. Without a pointer (older results) we fall back to
+    the newest export by file name, and use the store if its latest scan
+    was stored after that export was written (so a later --ndjson export
+    still wins).
     """
+    global _snapshot
+
     if not FINDINGS_DIR.exists():
         print(f"Findings directory not found: {FINDINGS_DIR}")
-        return []
+        return Snapshot(None, [], {}, {}, FindingsIndex([]))
+
+    pointer = _read_pointer()
+    key = _pointer_key(pointer) if pointer is not None else None
+    if key is None:
+        findings_file, summary_file = _latest_export()
+        scan = _latest_store_scan()
+        if scan is not None and (findings_file is None or
+                                 scan['created_at'] * 1e9 >= findings_file[1]):
+            key = ('store', scan['id'])
+        else:
+            key = (findings_file, summary_file)
+
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.key == key:
+        return snapshot
+
+    with _snapshot_lock:
+        # Another request may have loaded it while we waited for the lock
+        snapshot = _snapshot
+        if snapshot is not None and snapshot.key == key:
+            return snapshot
+
+        # Short id for this snapshot, embedded in pagination cursors
+        version = hashlib.sha1(repr(key).encode()).hexdigest()[:12]
+
+        if key[0] == 'store':
+            print(f"Loading findings from: {FINDINGS_DIR / FINDINGS_DB_NAME} (scan {key[1]})")
+            findings, remediations, summary, index, created_at = load_scan(
+                FINDINGS_DIR / FINDINGS_DB_NAME, key[1], version
+            )
+            snapshot = Snapshot(key, findings, remediations, summary, index,
+                                _etag(key, created_at), created_at)
+            _snapshot = snapshot
+            return snapshot
+
+        findings_file, summary_file = key
+        if findings_file is None:
+            print("No aggregated findings files found")
+            findings, remediations = [], {}
+        else:
+            findings, remediations = _read_aggregate(findings_file[0])
+
+        summary = {}
+        if summary_file is not None:
+            with open(summary_file[0], 'r') as f:
+                summary = json.load(f)
+
+        # mtimes are in the key, so the ETag changes with either file
+        modified = max((f[1] / 1e9 for f in key if f is not None), default=None)
+        snapshot = Snapshot(key, findings, remediations, summary,
+                            FindingsIndex(findings, version), _etag(key, modified), modified)
+        _snapshot = snapshot
+        return snapshot
+
+
+def _etag(key: Tuple, modified: Optional[float]) -> str:
+    """
+    ETag of a snapshot's data. Scan ids start again from 1 in a new store,
+    so the time the data was written is part of it too.
+    """
+    return hashlib.sha1(repr((key, modified)).encode()).hexdigest()[:16]
 
-    # Find all aggregated findings files
-    finding_files = list(FINDINGS_DIR.glob("aggregated_findings_*.json"))
 
-    if not finding_files:
-        print("No aggregated findings files found")
-        return []
+def _not_modified(snapshot: Snapshot, variant: str = '') -> Optional[Response]:
+    """
+    A 304 Not Modified response if the client already has this snapshot's
+    data, else None.
 
-    # Get the most recent file (by creation time)
-    latest_file = max(finding_files, key=os.path.getctime)
-    print(f"Loading findings from: {latest_file}")
+    If-None-Match is checked when it is sent (weak comparison, so ETags a
+    proxy marked W/ after compressing still match); otherwise
+    If-Modified-Since. Checking costs one stat (done by get_snapshot):
+    nothing is serialized for a 304.
 
-    with open(latest_file, 'r') as f:
-        return json.load(f)
+    Args:
+        variant: Tells apart representations of the same data (e.g. the
+                 Content-Encoding of /api/export)
+    """
+    if not snapshot.etag:
+        return None
+    if request.if_none_match:
+        current = request.if_none_match.contains_weak(_variant_etag(snapshot, variant))
+    else:
+        since = request.if_modified_since
+        current = (since is not None and snapshot.modified is not None
+                   and int(snapshot.modified) <= since.timestamp())
+    if not current:
+        return None
+    return _cacheable(Response(status=304), snapshot, variant)
+
+
+def _cacheable(response: Response, snapshot: Snapshot, variant: str = '') -> Response:
+    """Add ETag, Last-Modified and Cache-Control to an API response."""
+    if not snapshot.etag:
+        return response
+    response.set_etag(_variant_etag(snapshot, variant))
+    if snapshot.modified is not None:
+        # HTTP dates have whole seconds
+        response.last_modified = datetime.fromtimestamp(int(snapshot.modified), timezone.utc)
+    response.cache_control.public = True
+    response.cache_control.max_age = API_MAX_AGE
+    response.cache_control.must_revalidate = True
+    return response
+
+
+def _variant_etag(snapshot: Snapshot, variant: str) -> str:
+    return f"{snapshot.etag}-{variant}" if variant else snapshot.etag
+
+
+def load_latest_aggregate():
+    """
+    Load the most recent aggregated findings.
+
+    Returns a (findings, remediations) tuple:
+    - findings: list of finding dictionaries
+    - remediations: shared remediation table, keyed by each finding's
+      'remediation_id'
+    """
+    snapshot = get_snapshot()
+    return snapshot.findings, snapshot.remediations
+
+
+def load_latest_findings():
+    """
+    Load the findings from the most recent aggregated findings file.
+
+    Returns a list of finding dictionaries, or an empty list if no files found.
+    """
+    return get_snapshot().findings
 
 
 def load_latest_summary():
@@ -79,18 +459,20 @@ def load_latest_summary():
 
     Returns a dictionary with summary statistics.
     """
-    if not FINDINGS_DIR.exists():
-        return {}
+    return get_snapshot().summary
 
-    summary_files = list(FINDINGS_DIR.glob("findings_summary_*.json"))
 
-    if not summary_files:
-        return {}
-
-    latest_file = max(summary_files, key=os.path.getctime)
+def parse_filters(args) -> Dict[str, List[str]]:
+    """
+    Read filter query parameters into {param: [values]}.
 
-    with open(latest_file, 'r') as f:
-        return json.load(f)
+    Comma-separated values are alternatives: severity=Critical,High
+    """
+    return {
+        param: [v for v in args.get(param, '').split(',') if v]
+        for param in FILTER_FIELDS
+        if param in args
+    }
 
 
 def get_severity_color(severity):
@@ -122,25 +504,36 @@ def index():
 
     We load the findings and summary, then pass them to the template.
     The template uses this data to render charts and statistics.
+
+    All the counts come from the summary file, which the aggregator fills
+    in while it normalizes the findings, so this page only reads the ten
+    findings it lists.
     """
-    findings = load_latest_findings()
-    summary = load_latest_summary()
+    snapshot = get_snapshot()
+    findings = snapshot.findings
+    summary = snapshot.summary
+
+    by_severity = summary.get('by_severity')
+    if by_severity is None or summary.get('total_findings') != len(findings):
+        # No summary for these findings (e.g. it was deleted): count them
+        by_severity = dict(Counter(f.get('severity') or 'Unknown' for f in findings))
+        summary = dict(summary, total_findings=len(findings), by_severity=by_severity)
 
     # Calculate some additional stats for the dashboard
     stats = {
         'total': len(findings),
-        'critical': sum(1 for f in findings if f.get('severity') == 'Critical'),
-        'high': sum(1 for f in findings if f.get('severity') == 'High'),
-        'medium': sum(1 for f in findings if f.get('severity') == 'Medium'),
-        'low': sum(1 for f in findings if f.get('severity') == 'Low'),
+        'critical': by_severity.get('Critical', 0),
+        'high': by_severity.get('High', 0),
+        'medium': by_severity.get('Medium', 0),
+        'low': by_severity.get('Low', 0),
     }
 
     # Get severity data for the chart
-    severity_data = summary.get('by_severity', {})
+    severity_data = by_severity
 
     return render_template(
         'index.html',
-        findings=findings,
+        findings=findings[:10],
         summary=summary,
         stats=stats,
         severity_data=severity_data,
@@ -153,23 +546,88 @@ def findings_list():
     """
     Detailed findings page.
 
-    Shows all findings in a searchable, sortable table.
+    Shows one page of findings, filtered on the server.
     Supports filtering by account for multi-account environments.
+
+    Query parameters (set by the filter form):
+        q, severity, provider, account   Filters (see /api/findings)
+        page                             Page number, starting at 1
+
+    Only a summary row is rendered per finding. The details are fetched
+    from finding_detail() when a finding is opened, so the page size no
+    longer grows with the amount of remediation text.
     """
-    findings = load_latest_findings()
-    summary = load_latest_summary()
+    snapshot = get_snapshot()
+    summary = snapshot.summary
 
     # Extract accounts list for the filter dropdown
     accounts = summary.get('accounts', [])
 
+    # Filters currently applied; passed back so the form and page links keep them
+    query = {key: request.args[key] for key in ('q',) + PAGE_FILTERS if request.args.get(key)}
+    filters = {param: [query[param]] for param in PAGE_FILTERS if param in query}
+
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+    except ValueError:
+        page = 1
+
+    positions, total, _ = snapshot.index.query(
+        filters,
+        text=query.get('q', ''),
+        limit=FINDINGS_PER_PAGE,
+        offset=(page - 1) * FINDINGS_PER_PAGE
+    )
+    pages = max(1, -(-total // FINDINGS_PER_PAGE))
+
+    # Match counts shown next to each filter choice
+    facets = snapshot.index.facets(filters, query.get('q', ''), PAGE_FILTERS)
+
     return render_template(
         'findings.html',
-        findings=findings,
+        findings=[(p, snapshot.findings[p]) for p in positions],
+        total=total,
+        overall=len(snapshot.findings),
+        page=page,
+        pages=pages,
+        query=query,
+        version=snapshot.index.version,
+        facets=facets,
         accounts=accounts,
         get_severity_color=get_severity_color
     )
 
 
+@app.route('/findings/<int:position>/detail')
+def finding_detail(position):
+    """
+    Expanded details of one finding, as an HTML fragment.
+
+    Loaded by the findings page when a finding is opened. 'position' is
+    the finding's place in the current snapshot; the page also sends the
+    snapshot version (v) it was rendered from, and gets 410 Gone if a
+    newer export has replaced it since.
+    """
+    snapshot = get_snapshot()
+    version = request.args.get('v')
+    if version and version != snapshot.index.version:
+        return "Findings have been updated; reload the page", 410
+    if position >= len(snapshot.findings):
+        return "Finding not found", 404
+
+    finding = snapshot.findings[position]
+    # Newer exports refer to the shared table, older ones inline it
+    remediation = snapshot.remediations.get(finding.get('remediation_id') or '',
+                                            finding.get('remediation'))
+
+    return render_template(
+        'finding_detail.html',
+        finding=finding,
+        remediation=remediation,
+        position=position
+    )
+
+
 @app.route('/api/findings')
 def api_findings():
     """
@@ -181,18 +639,270 @@ def api_findings():
     3. Testing and debugging
 
     Example: curl http://localhost:5000/api/findings
+
+    Without query parameters the whole list is returned (as before);
+    for NDJSON and Parquet exports it is streamed instead of built in memory.
+    With any of the parameters below the response is one page:
+
+        {"findings": [...], "total": 1234, "next_cursor": "..." | null}
+
+    Query parameters:
+        severity, provider, account, source, region, finding_id
+                  Filters; comma-separate values to accept several
+                  (severity=Critical,High)
+        q         Full-text search over title, issue, resource, ARN, risk,
+                  check id and account. Every word must match; words match
+                  as prefixes (q=s3 publ)
+        sort      severity, provider, account, source, region, finding_id,
+                  title, resource or timestamp; prefix with '-' for descending
+        limit     Page size (default 100, max 1000)
+        cursor    next_cursor from the previous page
+        fields    Comma-separated list of fields to return (projection)
+        facets    Comma-separated filter names to count matches for
+                  (facets=severity,account adds {"facets": {"severity":
+                  {"High": 12, ...}, "account": {...}}} to the response)
+
+    Example: curl "http://localhost:5000/api/findings?severity=Critical&sort=account&limit=50"
+
+    Responses carry an ETag and Last-Modified: pollers that send them back
+    (If-None-Match / If-Modified-Since) get an empty 304 until the next
+    aggregation run.
+    """
+    snapshot = get_snapshot()
+    not_modified = _not_modified(snapshot)
+    if not_modified is not None:
+        return not_modified
+
+    if not request.args:
+        findings = snapshot.findings
+        if isinstance(findings, list):
+            return _cacheable(jsonify(findings), snapshot)
+        if isinstance(findings, NdjsonFindings):
+            lines = findings.iter_lines()
+        else:
+            lines = (json.dumps(dict(finding)).encode() for finding in findings)
+        return _cacheable(Response(_stream_json_array(lines), mimetype='application/json'),
+                          snapshot)
+
+    args = request.args
+    filters = parse_filters(args)
+    fields = [f for f in args.get('fields', '').split(',') if f]
+    facet_params = [f for f in args.get('facets', '').split(',') if f]
+
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': "limit must be an integer"}), 400
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    try:
+        positions, total, next_cursor = snapshot.index.query(
+            filters,
+            text=args.get('q', ''),
+            sort=args.get('sort', ''),
+            cursor=args.get('cursor') or None,
+            limit=limit
+        )
+        facets = snapshot.index.facets(filters, args.get('q', ''), facet_params)
+    except InvalidQuery as e:
+        return jsonify({'error': str(e)}), 400
+
+    # dict(): lazily loaded findings are mappings, not dicts
+    page = [dict(snapshot.findings[p]) for p in positions]
+    if fields:
+        page = [{field: finding.get(field) for field in fields} for finding in page]
+
+    response = {'findings': page, 'total': total, 'next_cursor': next_cursor}
+    if facet_params:
+        response['facets'] = facets
+    return _cacheable(jsonify(response), snapshot)
+
+
+def _stream_json_array(lines):
+    """Join pre-encoded JSON values into a JSON array, one chunk at a time."""
+    yield b'['
+    for i, line in enumerate(lines):
+        yield b',\n' + line if i else line
+    yield b']\n'
+
+
+@app.route('/api/export')
+def api_export():
+    """
+    API endpoint that returns every finding of the latest run as NDJSON
+    (one JSON finding per line, application/x-ndjson).
+
+    When the run was exported compressed (aggregate_findings.py --ndjson
+    --compress gzip|zstd) and the client accepts that encoding, the file
+    is sent byte for byte with a Content-Encoding header: nothing is
+    decompressed or compressed on the server. Other clients get the
+    decompressed lines.
+
+    Example: curl --compressed -o findings.ndjson http://localhost:5000/api/export
+    """
+    snapshot = get_snapshot()
+    key = snapshot.key
+    export_file = key[0][0] if key and key[0] not in ('store', None) else None
+    if export_file is not None and not _is_ndjson(export_file):
+        export_file = None
+
+    # stored: how the export's bytes are compressed ('gzip' and 'zstd' are
+    # also their Content-Encoding names); sent: whether we can send them
+    # like that. The two responses are different bytes, so they get
+    # different ETags.
+    stored = compression_of(export_file) if export_file is not None else None
+    sent = stored if stored and request.accept_encodings.quality(stored) > 0 else None
+
+    response = _not_modified(snapshot, sent or '')
+    if response is None:
+        if export_file is not None and (stored is None or sent):
+            response = send_file(export_file, mimetype=NDJSON_MIMETYPE, etag=False)
+            if sent:
+                response.headers['Content-Encoding'] = sent
+        else:
+            if export_file is not None:
+                lines = _compressed_lines(export_file)
+            elif isinstance(snapshot.findings, NdjsonFindings):
+                lines = snapshot.findings.iter_lines()
+            else:
+                lines = (json.dumps(dict(finding)).encode() for finding in snapshot.findings)
+            response = Response((line + b'\n' for line in lines), mimetype=NDJSON_MIMETYPE)
+        response = _cacheable(response, snapshot, sent or '')
+    if stored:
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+@app.route('/api/remediations')
+def api_remediations():
+    """
+    API endpoint that returns the shared remediation table as JSON.
+
+    Findings from /api/findings refer to entries here by 'remediation_id'.
     """
-    findings = load_latest_findings()
-    return jsonify(findings)
+    snapshot = get_snapshot()
+    return _not_modified(snapshot) or _cacheable(jsonify(snapshot.remediations), snapshot)
 
 
 @app.route('/api/summary')
 def api_summary():
     """
     API endpoint that returns the summary as JSON.
+
+    Like /api/findings, it answers conditional requests with 304 until
+    the data changes.
+    """
+    snapshot = get_snapshot()
+    return _not_modified(snapshot) or _cacheable(jsonify(snapshot.summary), snapshot)
+
+
+@app.route('/api/trends')
+def api_trends():
+    """
+    API endpoint that returns finding counts over time, one point per
+    scan or per time bucket (see trends.py).
+
+    Query parameters:
+        by      severity (default), account, provider or check
+        from    Start of the range, ISO date or date-time (default: first scan)
+        to      End of the range, inclusive (default: last scan)
+        points  Maximum number of points (default 100, max 1000); with more
+                scans than that in the range, they are grouped into equal
+                time buckets
+        agg     last (default), max or mean: how a bucket's scans are combined
+
+    Example: curl "http://localhost:5000/api/trends?by=severity&from=2024-01-01&points=52"
+    """
+    args = request.args
+    try:
+        points = int(args.get('points', DEFAULT_POINTS))
+    except ValueError:
+        return jsonify({'error': "points must be an integer"}), 400
+    points = min(points, MAX_POINTS)
+
+    try:
+        start = parse_time(args['from']) if args.get('from') else None
+        end = parse_time(args['to'], end=True) if args.get('to') else None
+        times, entries = load_history(FINDINGS_DIR / HISTORY_SCANS_FILE)
+        result = trends(times, entries, by=args.get('by', 'severity'),
+                        start=start, end=end, points=points,
+                        agg=args.get('agg', 'last'))
+    except InvalidQuery as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+
+# The last diff computed: ((base, file, mtime), (head, file, mtime)) -> result.
+# Charts and follow-up requests usually ask for the same pair again.
+_last_diff: Optional[Tuple[Tuple, ScanDiff]] = None
+
+# Runs are named by their export timestamp (YYYYMMDD_HHMMSS)
+_SCAN_ID = re.compile(r'^\d{8}_\d{6}$')
+
+
+@app.route('/api/diff')
+def api_diff():
     """
-    summary = load_latest_summary()
-    return jsonify(summary)
+    API endpoint that compares two aggregation runs.
+
+    The runs are found and compared by scripts/scanning/scan_diff.py, like
+    `aggregate_findings.py diff`: a run the compaction job has moved into
+    the history can still be compared.
+
+    Query parameters:
+        base    Older run, by export timestamp (YYYYMMDD_HHMMSS);
+                default: the run before head
+        head    Newer run; default: the latest run
+        limit   Findings listed per section (default 100, max 1000);
+                the counts always cover everything
+        fields  Comma-separated list of fields to return (projection)
+
+    Response:
+        {"base": "...", "head": "...",
+         "counts": {"new": 3, "resolved": 10, "unchanged": 490},
+         "new": [...], "resolved": [...], "unchanged": [...]}
+
+    Example: curl "http://localhost:5000/api/diff?fields=severity,title,resource"
+    """
+    global _last_diff
+
+    args = request.args
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': "limit must be an integer"}), 400
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    fields = [f for f in args.get('fields', '').split(',') if f]
+
+    # Only run timestamps: scan_diff also accepts file paths
+    for name in ('base', 'head'):
+        if args.get(name) and not _SCAN_ID.match(args[name]):
+            return jsonify({'error': f"{name} must be a scan timestamp (YYYYMMDD_HHMMSS)"}), 400
+
+    if not FINDINGS_DIR.exists():
+        return jsonify({'error': "No aggregated findings yet"}), 404
+    try:
+        base, head = resolve_scans(FINDINGS_DIR, args.get('base'), args.get('head'))
+        files = [scan_file(FINDINGS_DIR, scan) for scan in (base, head)]
+        key = tuple((scan, path, path.stat().st_mtime_ns) for scan, path in zip((base, head), files))
+        cached = _last_diff
+        if cached is not None and cached[0] == key:
+            diff = cached[1]
+        else:
+            _, _, diff = diff_scans(FINDINGS_DIR, base, head)
+            _last_diff = (key, diff)
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+
+    def project(finding):
+        if fields:
+            return {name: finding.get(name) for name in fields}
+        return dict(finding)
+
+    result = {'base': base, 'head': head, 'counts': diff.counts()}
+    for section, findings in diff._asdict().items():
+        result[section] = [project(finding) for finding in findings[:limit]]
+    return jsonify(result)
 
 
 # =============================================================================
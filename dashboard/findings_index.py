@@ -0,0 +1,469 @@
+"""
+Query indexes over a findings snapshot
+
+Used by dashboard/app.py to answer filtered, sorted and paginated requests
+(/api/findings?severity=High&account=...&sort=-severity&limit=100) without
+scanning every finding on every request.
+
+HOW IT WORKS:
+-------------
+1. POSTINGS: for each filterable field we keep, per value, the sorted list
+   of positions of the findings with that value:
+       severity -> {'High': [0, 4, 9, ...], 'Low': [1, 2, ...]}
+   A filtered query only walks the shortest matching posting list and
+   checks the remaining filters on those findings.
+
+2. SORT RANKS: for each sort key we compute, once, the rank of every
+   finding in that order. Sorting a page of results is then a cheap
+   integer comparison, and a page boundary is just "rank > last rank".
+
+3. TEXT SEARCH: every word of the searchable fields (title, issue,
+   resource, ARN, risk, check id, account) goes into an inverted index:
+       'encryption' -> [0, 4, 9, ...]
+   A search term matches every indexed word that starts with it, and all
+   terms must match ("s3 publ" finds "S3 bucket is public"). The sorted
+   vocabulary lets us find the words for a prefix with a binary search.
+
+4. CURSORS: the position of a page in the result set is the rank of its
+   last finding. Unlike page numbers, a cursor stays correct while the
+   client walks through the results, and it is tied to the snapshot it
+   came from so a stale cursor is rejected instead of skipping findings.
+
+Each part of the index is built the first time a request needs it: the
+postings of a field on the first filter (or facet count) on that field,
+the text index on the first search. A page that neither filters nor
+searches therefore only reads the fields it displays, which matters for
+lazy sequences such as ParquetFindings that load a column on first use.
+Once built, a part is never modified, so it can be shared by concurrent
+requests without locking.
+"""
+
+import base64
+import bisect
+import heapq
+import json
+import re
+import sys
+import threading
+from collections import Counter, defaultdict, deque
+from itertools import chain, islice
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Shared with the aggregator's SQLite store, so both sort and search alike
+try:
+    from scripts.scanning.finding import SEVERITY_ORDER, TEXT_FIELDS
+except ImportError:
+    # Running as a script (python dashboard/app.py): add the project root
+    sys.path.insert(0, str(Path(__file__).absolute().parent.parent))
+    from scripts.scanning.finding import SEVERITY_ORDER, TEXT_FIELDS
+
+# Query parameter -> finding field, for filters
+FILTER_FIELDS = {
+    'severity': 'severity',
+    'provider': 'cloud_provider',
+    'account': 'account_id',
+    'source': 'source',
+    'region': 'region',
+    'finding_id': 'finding_id',
+}
+
+# Query parameter -> finding field, for sorting
+SORT_FIELDS = dict(FILTER_FIELDS, title='title', resource='resource', timestamp='timestamp')
+
+# Words are runs of letters and digits: "arn:aws:s3:::my-bucket" ->
+# arn, aws, s3, my, bucket
+_WORD = re.compile(r'[a-z0-9]+')
+
+# How many recent searches to remember (paging repeats the same search)
+SEARCH_CACHE_SIZE = 128
+
+
+class InvalidQuery(ValueError):
+    """Raised for query parameters the index cannot answer."""
+
+
+def encode_cursor(version: str, sort: str, after) -> str:
+    """
+    Opaque pagination cursor: the snapshot version, the sort order and
+    where the previous page ended (any JSON value).
+    """
+    payload = json.dumps({'v': version, 's': sort, 'a': after})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, version: str, sort: str):
+    """Return the 'after' value of a cursor issued for this version and sort."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        after = payload['a']
+    except (ValueError, KeyError, TypeError):
+        raise InvalidQuery("Malformed cursor")
+
+    if payload.get('v') != version:
+        raise InvalidQuery("Cursor belongs to an older snapshot; start again without it")
+    if payload.get('s') != sort:
+        raise InvalidQuery("Cursor was issued for a different sort order")
+    return after
+
+
+def _contains(positions: List[int], position: int) -> bool:
+    """Membership test on an ascending posting list."""
+    i = bisect.bisect_left(positions, position)
+    return i < len(positions) and positions[i] == position
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase words (used for both indexing and queries)."""
+    return _WORD.findall(text.lower())
+
+
+class FindingsIndex:
+    """Read-only query indexes over one list of findings"""
+
+    def __init__(self, findings: Sequence, version: str = ''):
+        """
+        Args:
+            findings: The snapshot's findings (not copied, never modified);
+                      a list, or a lazy sequence such as NdjsonFindings
+            version: Identifies the snapshot; embedded in cursors
+        """
+        self.findings = findings
+        self.version = version
+
+        # param -> value -> ascending positions, built per param on first use
+        self._postings: Dict[str, Dict[str, List[int]]] = {}
+        # word -> ascending positions, and the sorted words (for prefix
+        # lookups), built on the first search
+        self._terms: Optional[Dict[str, List[int]]] = None
+        self._vocabulary: Optional[List[str]] = None
+        self._searches: Dict[str, List[int]] = {}
+        # Building a part reads a whole field of every finding, so two
+        # requests needing the same part wait for one build
+        self._build_lock = threading.Lock()
+
+        # Sort orders are computed the first time each key is used
+        self._sorts: Dict[str, Tuple[List[int], List[int]]] = {}
+
+    def postings(self, param: str) -> Dict[str, List[int]]:
+        """Value -> ascending positions of the findings with it, for one filter."""
+        values = self._postings.get(param)
+        if values is None:
+            with self._build_lock:
+                values = self._postings.get(param)
+                if values is None:
+                    field = FILTER_FIELDS[param]
+                    positions = defaultdict(list)
+                    for position, finding in enumerate(self.findings):
+                        positions[finding.get(field) or ''].append(position)
+                    # A plain dict, so lookups can never add empty entries
+                    values = self._postings[param] = dict(positions)
+        return values
+
+    def values(self, param: str) -> List[str]:
+        """Distinct values of a filterable field (for filter dropdowns)."""
+        return sorted(v for v in self.postings(param) if v)
+
+    # -------------------------------------------------------------------------
+    # Full-text search
+    # -------------------------------------------------------------------------
+
+    @property
+    def terms(self) -> Dict[str, List[int]]:
+        """Word -> ascending positions of the findings containing it."""
+        self._ensure_text_index()
+        return self._terms
+
+    @property
+    def vocabulary(self) -> List[str]:
+        """Indexed words, sorted (for prefix lookups)."""
+        self._ensure_text_index()
+        return self._vocabulary
+
+    def _ensure_text_index(self):
+        if self._terms is None:
+            with self._build_lock:
+                if self._terms is None:
+                    terms = self._build_text_index(self.findings)
+                    self._vocabulary = sorted(terms)
+                    # Set last: other threads only check _terms
+                    self._terms = terms
+
+    @staticmethod
+    def _build_text_index(findings: Sequence) -> Dict[str, List[int]]:
+        terms = defaultdict(list)
+        # Titles, issues and risks repeat for every finding of a check, so
+        # each distinct text is only tokenized once
+        words_of: Dict[str, frozenset] = {}
+
+        for position, finding in enumerate(findings):
+            words = set()
+            for field in TEXT_FIELDS:
+                value = finding.get(field)
+                if not value:
+                    continue
+                value = str(value)
+                cached = words_of.get(value)
+                if cached is None:
+                    cached = words_of[value] = frozenset(tokenize(value))
+                words |= cached
+            for word in words:
+                terms[word].append(position)
+
+        return dict(terms)
+
+    def _expand(self, prefix: str) -> List[str]:
+        """Indexed words starting with prefix."""
+        vocabulary = self.vocabulary
+        start = bisect.bisect_left(vocabulary, prefix)
+        end = start
+        while end < len(vocabulary) and vocabulary[end].startswith(prefix):
+            end += 1
+        return vocabulary[start:end]
+
+    def search(self, text: str) -> Optional[List[int]]:
+        """
+        Positions of findings matching every word of text (ascending).
+
+        Each query word is a prefix: "enc" matches "encryption" and
+        "encrypted". Returns None when text has no words at all, meaning
+        "no text filter".
+        """
+        words = sorted(set(tokenize(text)))
+        if not words:
+            return None
+
+        key = ' '.join(words)
+        cached = self._searches.get(key)
+        if cached is not None:
+            return cached
+
+        # One list of posting lists per query word
+        terms = self.terms
+        per_word = []
+        for word in words:
+            lists = [terms[term] for term in self._expand(word)]
+            if not lists:
+                return []
+            per_word.append(lists)
+
+        # Intersect starting from the rarest word, so the working set is small
+        per_word.sort(key=lambda lists: sum(len(p) for p in lists))
+        if len(per_word) == 1 and len(per_word[0]) == 1:
+            result = per_word[0][0]
+        else:
+            matches = set(chain.from_iterable(per_word[0]))
+            for lists in per_word[1:]:
+                if len(matches) * len(lists) < sum(len(p) for p in lists):
+                    # Few candidates left: binary-search them in the long lists
+                    matches = {p for p in matches if any(_contains(lst, p) for lst in lists)}
+                else:
+                    matches.intersection_update(chain.from_iterable(lists))
+                if not matches:
+                    break
+            result = sorted(matches)
+
+        if len(self._searches) >= SEARCH_CACHE_SIZE:
+            self._searches.clear()
+        self._searches[key] = result
+        return result
+
+    # -------------------------------------------------------------------------
+    # Sorting
+    # -------------------------------------------------------------------------
+
+    def _sort_order(self, sort: str) -> Tuple[List[int], List[int]]:
+        """
+        Return (order, ranks) for a sort key:
+        - order[rank] = position of the finding at that place (ascending)
+        - ranks[position] = place of that finding in ascending order
+        """
+        cached = self._sorts.get(sort)
+        if cached is None:
+            field = SORT_FIELDS[sort]
+            # One front-to-back pass over the findings (cheap even when they
+            # are read lazily from disk), then sort positions by key
+            if field == 'severity':
+                keys = [SEVERITY_ORDER.get(f.get('severity'), 99) for f in self.findings]
+            else:
+                keys = [f.get(field) or '' for f in self.findings]
+
+            # sorted() is stable, so ties keep their original order
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            ranks = [0] * len(order)
+            for rank, position in enumerate(order):
+                ranks[position] = rank
+            # Benign race: two threads may both compute the same lists
+            cached = (order, ranks)
+            self._sorts[sort] = cached
+        return cached
+
+    # -------------------------------------------------------------------------
+    # Cursors
+    # -------------------------------------------------------------------------
+
+    def encode_cursor(self, sort: str, after: int) -> str:
+        return encode_cursor(self.version, sort, after)
+
+    def decode_cursor(self, cursor: str, sort: str) -> int:
+        after = decode_cursor(cursor, self.version, sort)
+        if not isinstance(after, int):
+            raise InvalidQuery("Malformed cursor")
+        return after
+
+    # -------------------------------------------------------------------------
+    # Querying
+    # -------------------------------------------------------------------------
+
+    def match(self, filters: Dict[str, List[str]], text: str = '') -> Iterable[int]:
+        """
+        Yield positions of findings matching every filter (ascending).
+
+        Args:
+            filters: param -> accepted values (values of one param are OR-ed,
+                     different params are AND-ed)
+            text: Search words, see search()
+        """
+        self._check_filters(filters)
+        active = {param: set(values) for param, values in filters.items() if values}
+        hits = self.search(text)
+
+        # Drive the scan from the most selective filter (or the search hits)
+        def selectivity(param):
+            return sum(len(self.postings(param).get(v, ())) for v in active[param])
+
+        driver = min(active, key=selectivity) if active else None
+        if hits is not None and (driver is None or len(hits) <= selectivity(driver)):
+            candidates = hits
+            hits = None
+        elif driver is not None:
+            candidates = sorted(
+                position
+                for value in active.pop(driver)
+                for position in self.postings(driver).get(value, ())
+            )
+            if hits is not None:
+                hits = set(hits)
+        else:
+            candidates = range(len(self.findings))
+
+        checks = [(FILTER_FIELDS[param], values) for param, values in active.items()]
+
+        for position in candidates:
+            if hits is not None and position not in hits:
+                continue
+            finding = self.findings[position]
+            if any((finding.get(field) or '') not in values for field, values in checks):
+                continue
+            yield position
+
+    def facets(self, filters: Dict[str, List[str]], text: str = '',
+               params: Iterable[str] = ()) -> Dict[str, Dict[str, int]]:
+        """
+        Count matching findings per value of each facet in params.
+
+        The count for one facet ignores that facet's own filter, so with
+        severity=High selected the severity counts still show how many
+        Critical, Medium... findings the other filters would give.
+        """
+        self._check_filters(dict.fromkeys(params))
+        counts = {}
+        for param in params:
+            others = {p: v for p, v in filters.items() if p != param}
+            if not any(others.values()) and self.search(text) is None:
+                counts[param] = {v: len(p) for v, p in self.postings(param).items() if v}
+                continue
+
+            field = FILTER_FIELDS[param]
+            tally = Counter(self.findings[p].get(field) or '' for p in self.match(others, text))
+            tally.pop('', None)
+            counts[param] = dict(tally)
+        return counts
+
+    @staticmethod
+    def _check_filters(filters: Dict[str, List[str]]):
+        for param in filters:
+            if param not in FILTER_FIELDS:
+                raise InvalidQuery(f"Unknown filter: {param}")
+
+    def query(self, filters: Dict[str, List[str]], text: str = '', sort: str = '',
+              cursor: Optional[str] = None, limit: int = 100,
+              offset: int = 0) -> Tuple[List[int], int, Optional[str]]:
+        """
+        Run a filtered, sorted, paginated query.
+
+        Args:
+            filters: See match()
+            text: See match()
+            sort: Sort key from SORT_FIELDS, prefixed with '-' for descending;
+                  empty keeps the aggregation order
+            cursor: next_cursor from the previous page, or None for the first page
+            limit: Page size
+            offset: Number of matches to skip first (numbered pages in the
+                    HTML view; API clients should use cursors instead)
+
+        Returns:
+            (positions of this page, total matches, cursor for the next page or None)
+        """
+        self._check_filters(filters)
+        descending = sort.startswith('-')
+        sort_key = sort.lstrip('-')
+        if sort_key and sort_key not in SORT_FIELDS:
+            raise InvalidQuery(f"Unknown sort key: {sort_key}")
+
+        # rank(position) = place of a finding in the requested order
+        if sort_key:
+            order, ranks = self._sort_order(sort_key)
+            last = len(ranks) - 1
+            if descending:
+                def rank(position):
+                    return last - ranks[position]
+            else:
+                def rank(position):
+                    return ranks[position]
+        else:
+            order = None
+
+            def rank(position):
+                return position
+
+        after = self.decode_cursor(cursor, sort) if cursor else -1
+        filtered = any(filters.values()) or bool(text)
+
+        if not filtered:
+            # Everything matches: the page is a slice of the sort order
+            total = len(self.findings)
+            first = after + 1 + offset
+            ranks_on_page = range(first, min(first + limit, total))
+            if order is None:
+                page = list(ranks_on_page)
+            elif descending:
+                page = [order[total - 1 - r] for r in ranks_on_page]
+            else:
+                page = [order[r] for r in ranks_on_page]
+            remaining = total - (after + 1)
+        else:
+            total = 0
+            remaining = 0
+
+            def after_cursor():
+                nonlocal total, remaining
+                for position in self.match(filters, text):
+                    total += 1
+                    if rank(position) > after:
+                        remaining += 1
+                        yield position
+
+            if sort_key:
+                page = heapq.nsmallest(offset + limit, after_cursor(), key=rank)[offset:]
+            else:
+                # match() yields positions in natural order already
+                matches = after_cursor()
+                page = list(islice(matches, offset, offset + limit))
+                deque(matches, maxlen=0)  # finish counting the totals
+
+        next_cursor = None
+        if page and remaining > offset + len(page):
+            next_cursor = self.encode_cursor(sort, rank(page[-1]))
+        return page, total, next_cursor
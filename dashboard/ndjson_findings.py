@@ -0,0 +1,106 @@
+"""
+Lazy, read-only view of an NDJSON findings export
+
+Used by dashboard/app.py for aggregated_findings_*.ndjson files (written by
+aggregate_findings.py --ndjson).
+
+HOW IT WORKS:
+-------------
+1. When the file is opened we read through it once and remember where
+   each line starts (8 bytes per finding). The findings themselves are
+   not kept.
+2. findings[i] reads and decodes just line i, straight from the file.
+   The most recently used findings are kept in a small cache, since a
+   page of results is usually read more than once.
+3. Iterating reads the file front to back, one line at a time.
+
+So the dashboard can page through, filter and serve an export without
+ever holding the full list of findings in memory.
+"""
+
+import json
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Dict, Iterator, List, Union
+
+# Decoded findings kept in memory for repeated access
+CACHE_SIZE = 4096
+
+
+class NdjsonFindings(Sequence):
+    """A list-like sequence of findings that reads each one from disk on demand"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+        # offsets[i] = byte offset of line i; the last entry is the end of
+        # the file, so line i is offsets[i]:offsets[i + 1]
+        self.offsets = array('Q')
+        offset = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    self.offsets.append(offset)
+                offset += len(line)
+        self.offsets.append(offset)
+
+        # os.pread() reads at an offset without moving a shared file
+        # position, so concurrent requests can use one descriptor
+        self._fd = os.open(self.path, os.O_RDONLY)
+        self._cache: 'OrderedDict[int, Dict]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict, List[Dict]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("finding index out of range")
+
+        with self._cache_lock:
+            finding = self._cache.get(index)
+            if finding is not None:
+                self._cache.move_to_end(index)
+                return finding
+
+        start, end = self.offsets[index], self.offsets[index + 1]
+        finding = json.loads(os.pread(self._fd, end - start, start))
+
+        with self._cache_lock:
+            self._cache[index] = finding
+            if len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return finding
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Read every finding in file order (bypasses the cache)."""
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def iter_lines(self) -> Iterator[bytes]:
+        """Yield the raw JSON text of each finding, without decoding it."""
+        with open(self.path, 'rb') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+
+    def close(self):
+        fd, self._fd = getattr(self, '_fd', None), None
+        if fd is not None:
+            os.close(fd)
+
+    def __del__(self):
+        # A replaced snapshot is dropped by reference; release its descriptor
+        self.close()
@@ -0,0 +1,137 @@
+"""
+Column-at-a-time view of a Parquet findings export
+
+Used by dashboard/app.py for aggregated_findings_*.parquet files (written
+by aggregate_findings.py when pyarrow is installed, see
+scripts/scanning/columnar_export.py).
+
+HOW IT WORKS:
+-------------
+1. Opening the file only reads its footer (schema and row count).
+2. A column is read from the file the first time any finding's value in
+   that column is asked for, and then kept. The list page only needs
+   severity, title and provider (and the account, for the filter
+   counts); FindingsIndex builds its search and filter indexes on first
+   use, so the long issue/risk/description texts are only loaded once
+   something (a search, the detail view, the API) actually uses them.
+3. findings[i] is a small read-only mapping that looks its values up in
+   those columns, so it works anywhere a finding dict is expected
+   (finding['severity'], finding.get('region'), dict(finding)).
+
+Dictionary-encoded columns are expanded so that every row shares the
+same string object for the same value.
+"""
+
+import threading
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Dict, Iterator, List, Union
+
+# pyarrow is optional: without it the dashboard uses the JSON export
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+PARQUET_AVAILABLE = pa is not None
+
+
+class ParquetRow(Mapping):
+    """One finding of a ParquetFindings; values are read from its columns"""
+
+    __slots__ = ('_findings', '_index')
+
+    def __init__(self, findings: 'ParquetFindings', index: int):
+        self._findings = findings
+        self._index = index
+
+    def __getitem__(self, name: str):
+        if name not in self._findings.field_set:
+            raise KeyError(name)
+        return self._findings.column(name)[self._index]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._findings.fields)
+
+    def __len__(self) -> int:
+        return len(self._findings.fields)
+
+    def __repr__(self) -> str:
+        return f"ParquetRow({self._index})"
+
+
+class ParquetFindings(Sequence):
+    """A list-like sequence of findings backed by a Parquet file"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = pq.ParquetFile(self.path)
+        self.fields = tuple(self._file.schema_arrow.names)
+        self.field_set = frozenset(self.fields)
+        self._length = self._file.metadata.num_rows
+
+        # Loaded columns: name -> list of Python values
+        self._columns: Dict[str, List] = {}
+        self._lock = threading.Lock()
+
+    def column(self, name: str) -> List:
+        """All values of one column, read from the file on first use."""
+        values = self._columns.get(name)
+        if values is None:
+            with self._lock:
+                values = self._columns.get(name)
+                if values is None:
+                    values = self._read_column(name)
+                    self._columns[name] = values
+        return values
+
+    def _read_column(self, name: str) -> List:
+        array = self._file.read(columns=[name]).column(0).combine_chunks()
+        if pa.types.is_dictionary(array.type):
+            # Decode each distinct value once and share it between rows
+            distinct = array.dictionary.to_pylist()
+            return [None if i is None else distinct[i] for i in array.indices.to_pylist()]
+        return array.to_pylist()
+
+    @property
+    def loaded_columns(self) -> List[str]:
+        return sorted(self._columns)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[ParquetRow, List[ParquetRow]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("finding index out of range")
+        return ParquetRow(self, index)
+
+    def __iter__(self) -> Iterator[ParquetRow]:
+        for index in range(len(self)):
+            yield ParquetRow(self, index)
+
+
+def read_remediations(path: Path) -> Dict[str, Dict]:
+    """
+    Read a remediations_*.parquet file back into the remediation table
+    (remediation_id -> {summary, doc_url, options}).
+
+    Option fields an option did not have (e.g. 'steps' on a CLI option)
+    come back as nulls from the struct column; they are dropped so the
+    table is the same as in the JSON export.
+    """
+    remediations = {}
+    for row in pq.read_table(path).to_pylist():
+        remediation_id = row.pop('remediation_id')
+        row['options'] = [
+            {key: value for key, value in option.items() if value is not None}
+            for option in row['options'] or []
+        ]
+        remediations[remediation_id] = row
+    return remediations
@@ -0,0 +1,312 @@
+"""
+Dashboard queries against the SQLite findings store
+
+Used by dashboard/app.py when scan-results/aggregated/findings.db holds
+the newest aggregation run (the store is written by aggregate_findings.py,
+see scripts/scanning/findings_store.py).
+
+Two classes mirror what the in-memory snapshot provides, so the routes do
+not care where the findings come from:
+
+- SqlFindings:      a list-like sequence of one scan's findings;
+                    findings[i] is one primary-key lookup
+- SqlFindingsIndex: the same query()/facets() interface as FindingsIndex,
+                    answered with SQL:
+                      filters  -> WHERE severity IN (...) AND ...
+                                  (served by the (scan_id, column) indexes)
+                      q        -> the findings_fts full-text index
+                      sort     -> ORDER BY column, position
+                      cursors  -> keyset pagination: the next page starts
+                                  after the (sort value, position) of the
+                                  last row, so deep pages cost the same as
+                                  the first one
+                      facets   -> GROUP BY column
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import sqlalchemy as sa
+except ImportError:
+    sa = None
+
+try:
+    from .findings_index import (FILTER_FIELDS, SORT_FIELDS, InvalidQuery,
+                                 decode_cursor, encode_cursor, tokenize)
+except ImportError:
+    # Running as a script: python dashboard/app.py
+    from findings_index import (FILTER_FIELDS, SORT_FIELDS, InvalidQuery,
+                                decode_cursor, encode_cursor, tokenize)
+
+SQL_AVAILABLE = sa is not None
+
+# Findings kept in memory for repeated access (a page is read more than once)
+CACHE_SIZE = 4096
+
+# One engine per database file, shared by all requests
+_engines: Dict[str, 'sa.engine.Engine'] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(path: Path) -> 'sa.engine.Engine':
+    key = str(path)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = sa.create_engine(f"sqlite:///{key}")
+        return engine
+
+
+def _tables(engine) -> Tuple:
+    """Lightweight table objects, with the column names found in the database."""
+    inspector = sa.inspect(engine)
+    findings = sa.table('findings', *[sa.column(c['name']) for c in inspector.get_columns('findings')])
+    scans = sa.table('scans', *[sa.column(c['name']) for c in inspector.get_columns('scans')])
+    remediations = sa.table('remediations', sa.column('scan_id'), sa.column('remediation_id'),
+                            sa.column('data'))
+    return scans, findings, remediations
+
+
+def latest_scan(path: Path) -> Optional[Dict]:
+    """
+    The newest scan in a store: {'id', 'scan_timestamp', 'created_at'},
+    or None if the store is empty or unreadable.
+    """
+    try:
+        with get_engine(path).connect() as conn:
+            row = conn.exec_driver_sql(
+                "SELECT id, scan_timestamp, created_at FROM scans ORDER BY id DESC LIMIT 1"
+            ).mappings().first()
+    except sa.exc.SQLAlchemyError:
+        return None
+    return dict(row) if row else None
+
+
+def load_scan(path: Path, scan_id: int, version: str):
+    """
+    Open one scan of a store.
+
+    Returns:
+        (findings, remediations, summary, index, created_at), where
+        created_at is when the scan was stored (Unix time)
+    """
+    engine = get_engine(path)
+    scans, findings_table, remediations_table = _tables(engine)
+
+    with engine.connect() as conn:
+        scan = conn.execute(
+            sa.select(scans.c.total_findings, scans.c.summary, scans.c.created_at)
+            .where(scans.c.id == scan_id)
+        ).one()
+        remediations = {
+            row.remediation_id: json.loads(row.data)
+            for row in conn.execute(
+                sa.select(remediations_table.c.remediation_id, remediations_table.c.data)
+                .where(remediations_table.c.scan_id == scan_id)
+            )
+        }
+
+    findings = SqlFindings(engine, findings_table, scan_id, scan.total_findings)
+    index = SqlFindingsIndex(findings, version)
+    return findings, remediations, json.loads(scan.summary), index, scan.created_at
+
+
+class SqlFindings(Sequence):
+    """The findings of one scan, read from the store on demand"""
+
+    def __init__(self, engine, table, scan_id: int, length: int):
+        self.engine = engine
+        self.table = table
+        self.scan_id = scan_id
+        self._length = length
+        # Columns returned for a finding (store-only columns left out)
+        self.fields = [
+            c.name for c in table.columns
+            if c.name not in ('id', 'scan_id', 'position', 'severity_rank')
+        ]
+        self._cache: 'OrderedDict[int, Dict]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _to_finding(self, row) -> Dict:
+        finding = {name: row[name] for name in self.fields}
+        finding['compliance'] = json.loads(finding.get('compliance') or '[]')
+        return finding
+
+    def _select(self):
+        return sa.select(*[self.table.c[name] for name in self.fields],
+                         self.table.c.position).where(self.table.c.scan_id == self.scan_id)
+
+    def prefetch(self, positions: Iterable[int]):
+        """Load several findings with one query (e.g. a page of results)."""
+        with self._cache_lock:
+            missing = [p for p in positions if p not in self._cache]
+        if not missing:
+            return
+
+        with self.engine.connect() as conn:
+            rows = conn.execute(self._select().where(self.table.c.position.in_(missing))).mappings()
+            loaded = {row['position']: self._to_finding(row) for row in rows}
+
+        with self._cache_lock:
+            self._cache.update(loaded)
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict, List[Dict]]:
+        if isinstance(index, slice):
+            positions = range(*index.indices(len(self)))
+            self.prefetch(positions)
+            return [self[i] for i in positions]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("finding index out of range")
+
+        with self._cache_lock:
+            finding = self._cache.get(index)
+            if finding is not None:
+                self._cache.move_to_end(index)
+                return finding
+
+        self.prefetch([index])
+        with self._cache_lock:
+            return self._cache[index]
+
+    def __iter__(self) -> Iterator[Dict]:
+        """All findings in position order, streamed from one query."""
+        with self.engine.connect() as conn:
+            result = conn.execution_options(yield_per=1000).execute(
+                self._select().order_by(self.table.c.position)
+            ).mappings()
+            for row in result:
+                yield self._to_finding(row)
+
+
+class SqlFindingsIndex:
+    """FindingsIndex interface (query, facets) answered by SQL queries"""
+
+    def __init__(self, findings: SqlFindings, version: str = ''):
+        self.findings = findings
+        self.version = version
+        self.table = findings.table
+
+    def _where(self, filters: Dict[str, List[str]], text: str = '') -> List:
+        """WHERE conditions for a scan, filters and search words."""
+        for param in filters:
+            if param not in FILTER_FIELDS:
+                raise InvalidQuery(f"Unknown filter: {param}")
+
+        conditions = [self.table.c.scan_id == self.findings.scan_id]
+        for param, values in filters.items():
+            if values:
+                conditions.append(self.table.c[FILTER_FIELDS[param]].in_(values))
+
+        words = tokenize(text)
+        if words:
+            # Every word must match, each as a prefix ("enc" -> "encryption")
+            match = ' '.join(f'"{word}"*' for word in words)
+            fts = sa.text("SELECT rowid FROM findings_fts WHERE findings_fts MATCH :match")
+            conditions.append(self.table.c.id.in_(
+                fts.bindparams(match=match).columns(sa.column('rowid'))
+            ))
+        return conditions
+
+    def query(self, filters: Dict[str, List[str]], text: str = '', sort: str = '',
+              cursor: Optional[str] = None, limit: int = 100,
+              offset: int = 0) -> Tuple[List[int], int, Optional[str]]:
+        """Same arguments and result as FindingsIndex.query()."""
+        descending = sort.startswith('-')
+        sort_key = sort.lstrip('-')
+        if sort_key and sort_key not in SORT_FIELDS:
+            raise InvalidQuery(f"Unknown sort key: {sort_key}")
+
+        conditions = self._where(filters, text)
+        position = self.table.c.position
+        if not sort_key:
+            key = None
+        elif sort_key == 'severity':
+            key = self.table.c.severity_rank
+        else:
+            key = self.table.c[SORT_FIELDS[sort_key]]
+
+        with self.findings.engine.connect() as conn:
+            total = conn.execute(
+                sa.select(sa.func.count()).select_from(self.table).where(*conditions)
+            ).scalar()
+
+            page_conditions = list(conditions)
+            if cursor:
+                after = decode_cursor(cursor, self.version, sort)
+                page_conditions.append(self._after(key, after, descending))
+
+            if key is None:
+                order = [position]
+            elif descending:
+                # Ties in reverse position order, like FindingsIndex
+                order = [key.desc(), position.desc()]
+            else:
+                order = [key, position]
+
+            columns = [position] if key is None else [position, key]
+            # One extra row tells us whether there is a next page
+            rows = conn.execute(
+                sa.select(*columns).where(*page_conditions).order_by(*order)
+                .offset(offset).limit(limit + 1)
+            ).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        page = [row[0] for row in rows]
+        self.findings.prefetch(page)
+
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            after = last[0] if key is None else [last[1], last[0]]
+            next_cursor = encode_cursor(self.version, sort, after)
+        return page, total, next_cursor
+
+    def _after(self, key, after, descending: bool):
+        """Keyset condition: rows after the last row of the previous page."""
+        position = self.table.c.position
+        try:
+            if key is None:
+                return position > int(after)
+            value, last_position = after
+            last_position = int(last_position)
+        except (TypeError, ValueError):
+            raise InvalidQuery("Malformed cursor")
+
+        if descending:
+            return sa.tuple_(key, position) < sa.tuple_(value, last_position)
+        return sa.tuple_(key, position) > sa.tuple_(value, last_position)
+
+    def facets(self, filters: Dict[str, List[str]], text: str = '',
+               params: Iterable[str] = ()) -> Dict[str, Dict[str, int]]:
+        """Same as FindingsIndex.facets(): one GROUP BY per facet."""
+        params = list(params)
+        for param in params:
+            if param not in FILTER_FIELDS:
+                raise InvalidQuery(f"Unknown filter: {param}")
+
+        counts = {}
+        with self.findings.engine.connect() as conn:
+            for param in params:
+                others = {p: v for p, v in filters.items() if p != param}
+                column = self.table.c[FILTER_FIELDS[param]]
+                rows = conn.execute(
+                    sa.select(column, sa.func.count())
+                    .where(*self._where(others, text), column != '')
+                    .group_by(column)
+                )
+                counts[param] = {value: count for value, count in rows}
+        return counts
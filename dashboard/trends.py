@@ -0,0 +1,186 @@
+"""
+Finding counts over time, from the scan history
+
+Used by dashboard/app.py for /api/trends. The history is written by
+aggregate_findings.py (see scripts/scanning/scan_history.py): one small
+JSON line of counts per aggregation run, in history/scans.jsonl.
+
+HOW IT WORKS:
+-------------
+1. scans.jsonl is parsed once and kept until the file changes.
+2. A request picks a time range and a number of points. The scans in the
+   range are found with a binary search (the file is in time order).
+3. If there are more scans than points, the range is cut into `points`
+   equal time buckets and each bucket becomes one point:
+       last  the counts of the bucket's last scan (default: what was
+             open at the end of that period)
+       max   the highest count seen in the bucket
+       mean  the average count over the bucket's scans
+   So a year of daily scans can be charted as 52 weekly points without
+   sending 365 scans to the browser.
+"""
+
+import bisect
+import json
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .findings_index import InvalidQuery
+except ImportError:
+    # Running as a script: python dashboard/app.py
+    from findings_index import InvalidQuery
+
+# ?by= value -> breakdown kept in the history
+BREAKDOWNS = {
+    'severity': 'by_severity',
+    'account': 'by_account',
+    'provider': 'by_cloud_provider',
+    'check': 'by_check',
+}
+
+AGGREGATES = ('last', 'max', 'mean')
+
+DEFAULT_POINTS = 100
+MAX_POINTS = 1000
+
+# (path, mtime_ns, size) -> (times, entries) of the last history file read
+_loaded: Optional[Tuple[Tuple, Tuple[List[float], List[Dict]]]] = None
+_loaded_lock = threading.Lock()
+
+
+def parse_time(value: str, end: bool = False) -> float:
+    """
+    An ISO date or date-time (2024-01-31, 2024-01-31T12:00:00) as a timestamp.
+
+    With end=True a plain date means the end of that day, so
+    from=2024-01-01&to=2024-01-31 covers all of January.
+    """
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise InvalidQuery(f"Invalid date: {value}")
+    if end and len(value) == 10:
+        return (moment + timedelta(days=1)).timestamp() - 1e-6
+    return moment.timestamp()
+
+
+def load_history(scans_file: Path) -> Tuple[List[float], List[Dict]]:
+    """
+    The history's scans, oldest first, and their times (as timestamps).
+
+    Reuses the previous result while the file is unchanged.
+    """
+    global _loaded
+
+    try:
+        stat = scans_file.stat()
+    except FileNotFoundError:
+        return [], []
+    key = (str(scans_file), stat.st_mtime_ns, stat.st_size)
+
+    loaded = _loaded
+    if loaded is not None and loaded[0] == key:
+        return loaded[1]
+
+    with _loaded_lock:
+        entries = []
+        with open(scans_file, 'r') as f:
+            for line in f:
+                if line.strip():
+                    entries.append(json.loads(line))
+        # Appended in run order, but sort anyway: the chart needs time order
+        entries.sort(key=lambda entry: entry['time'])
+        times = [datetime.fromisoformat(entry['time']).timestamp() for entry in entries]
+        _loaded = (key, (times, entries))
+    return times, entries
+
+
+def trends(times: List[float], entries: List[Dict], by: str = 'severity',
+           start: Optional[float] = None, end: Optional[float] = None,
+           points: int = DEFAULT_POINTS, agg: str = 'last') -> Dict:
+    """
+    Counts over a time range, downsampled to at most `points` points.
+
+    Args:
+        times, entries: From load_history()
+        by: Breakdown to return (see BREAKDOWNS)
+        start, end: Time range (timestamps, inclusive); defaults to the
+                    first and last scan
+        points: Maximum number of points returned
+        agg: How a bucket's scans become one point (see AGGREGATES)
+
+    Returns:
+        {'by', 'agg', 'from', 'to', 'scans', 'points': [
+            {'time', 'scans', 'total', 'counts': {key: count}}, ...]}
+        Each point's time is the time of the last scan in it.
+    """
+    if by not in BREAKDOWNS:
+        raise InvalidQuery(f"Unknown breakdown: {by}")
+    if agg not in AGGREGATES:
+        raise InvalidQuery(f"Unknown aggregate: {agg}")
+    if points < 1:
+        raise InvalidQuery("points must be at least 1")
+
+    first = bisect.bisect_left(times, start) if start is not None else 0
+    last = bisect.bisect_right(times, end) if end is not None else len(times)
+    field = BREAKDOWNS[by]
+
+    result = {'by': by, 'agg': agg, 'scans': max(0, last - first), 'points': []}
+    if first >= last:
+        result['from'] = result['to'] = None
+        return result
+
+    if start is None:
+        start = times[first]
+    if end is None:
+        end = times[last - 1]
+    result['from'] = datetime.fromtimestamp(start).isoformat()
+    result['to'] = datetime.fromtimestamp(end).isoformat()
+
+    if last - first <= points:
+        # Nothing to downsample: one point per scan
+        buckets = [[i] for i in range(first, last)]
+    else:
+        width = (end - start) / points or 1
+        buckets = []
+        for i in range(first, last):
+            bucket = min(int((times[i] - start) / width), points - 1)
+            if buckets and buckets[-1][0] == bucket:
+                buckets[-1][1].append(i)
+            else:
+                buckets.append((bucket, [i]))
+        buckets = [members for _, members in buckets]
+
+    for members in buckets:
+        result['points'].append(_point(entries, members, field, agg))
+    return result
+
+
+def _point(entries: List[Dict], members: List[int], field: str, agg: str) -> Dict:
+    """Combine the scans of one bucket into one point."""
+    last = entries[members[-1]]
+    point = {'time': last['time'], 'scans': len(members)}
+
+    if agg == 'last' or len(members) == 1:
+        point['total'] = last['total']
+        point['counts'] = dict(last.get(field, {}))
+        return point
+
+    totals = [entries[i]['total'] for i in members]
+    counts: Dict[str, List[int]] = {}
+    for n, i in enumerate(members):
+        for key, count in entries[i].get(field, {}).items():
+            # A key missing from a scan counts as 0 in that scan
+            counts.setdefault(key, [0] * len(members))[n] = count
+
+    if agg == 'max':
+        point['total'] = max(totals)
+        point['counts'] = {key: max(values) for key, values in counts.items()}
+    else:
+        point['total'] = round(sum(totals) / len(members), 2)
+        point['counts'] = {key: round(sum(values) / len(members), 2)
+                           for key, values in counts.items()}
+    return point
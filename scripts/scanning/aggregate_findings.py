@@ -17,11 +17,17 @@ HOW IT WORKS:
 4. Results are exported to JSON/CSV for the dashboard to consume
 """
 
+import argparse
+import hashlib
 import json
+import mmap
 import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, IO, Iterable, Iterator, List, Optional, Tuple
 
 # pandas is used for data manipulation and CSV export
 # If not installed: pip install pandas
@@ -31,19 +37,464 @@ except ImportError:
     print("Warning: pandas not installed. CSV export will be disabled.")
     pd = None
 
+try:
+    from .atomic_files import atomic_write
+    from .columnar_export import PARQUET_AVAILABLE, write_findings_parquet
+    from .compression import (
+        COMPRESSION_SUFFIXES, ZSTD_AVAILABLE, can_read, compressed_writer, open_text,
+    )
+    from .finding import FINDING_FIELDS, Finding, finding_fingerprint
+    from .findings_cache import FindingsCache
+    from .findings_store import STORE_AVAILABLE, STORE_FILENAME, FindingsStore
+    from .retention import DEFAULT_HISTORY_DAYS, DEFAULT_KEEP_RUNS, compact, write_latest_pointer
+    from .scan_diff import diff_scans
+    from .scan_history import HISTORY_DIRNAME, ScanHistory
+except ImportError:
+    # Running as a script: python scripts/scanning/aggregate_findings.py
+    from atomic_files import atomic_write
+    from columnar_export import PARQUET_AVAILABLE, write_findings_parquet
+    from compression import (
+        COMPRESSION_SUFFIXES, ZSTD_AVAILABLE, can_read, compressed_writer, open_text,
+    )
+    from finding import FINDING_FIELDS, Finding, finding_fingerprint
+    from findings_cache import FindingsCache
+    from findings_store import STORE_AVAILABLE, STORE_FILENAME, FindingsStore
+    from retention import DEFAULT_HISTORY_DAYS, DEFAULT_KEEP_RUNS, compact, write_latest_pointer
+    from scan_diff import diff_scans
+    from scan_history import HISTORY_DIRNAME, ScanHistory
+
+# Version of the normalized finding format. Bump this whenever the
+# normalizers change what they produce (or what a cache entry holds) so
+# cached findings are re-built.
+NORMALIZED_FORMAT_VERSION = 4
+
+
+# How much of a Prowler file we read at a time while streaming it.
+# Big enough to keep the number of read() calls low, small enough that
+# memory use does not depend on the size of the scan.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Written into a Prowler output directory once a scan has finished,
+# naming its output file(s): {"files": ["prowler-output-...json"], ...}.
+# While Prowler is still writing, the pointer still names the previous
+# (complete) output, so the aggregator never reads a half-written file.
+# A scan sharded by region or service (see multi_account_scan.py) names
+# one file per shard; they are merged into one account.
+PROWLER_POINTER = "latest.json"
+
+# Prowler output files, plain or compressed (see compression.py)
+PROWLER_PATTERNS = ("prowler-output-*.json", "prowler-output-*.json.gz",
+                    "prowler-output-*.json.zst")
+
+# Prowler output names end with the scan time:
+# prowler-output-ACCOUNTID-YYYYMMDDHHMMSS.json (optionally .gz / .zst)
+_PROWLER_TIMESTAMP = re.compile(r'^prowler-output-.+-(\d{8,14})\.json(?:\.gz|\.zst)?$')
+
+
+def write_prowler_pointer(directory: Path, files: List[Path]):
+    """Point a Prowler output directory's latest.json at a finished scan's files."""
+    pointer = {
+        'files': [Path(f).name for f in files],
+        'completed_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    with atomic_write(Path(directory) / PROWLER_POINTER) as f:
+        json.dump(pointer, f, indent=2)
+
+
+def prowler_file_order(path: Path) -> Tuple[str, str]:
+    """Sort key for Prowler outputs: the scan time in the name, then the name."""
+    match = _PROWLER_TIMESTAMP.match(path.name)
+    return (match.group(1).ljust(14, '0') if match else '', path.name)
+
+
+def iter_json_array(fp: IO[str], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator:
+    """
+    Yield the elements of a top-level JSON array one at a time.
+
+    WHY STREAM?
+    A full-organization Prowler scan can contain hundreds of thousands of
+    PASS rows that we throw away anyway. json.load() would need the whole
+    list in memory first. Here we only ever hold one chunk of text plus the
+    element currently being decoded, so memory stays flat no matter how
+    big the file is.
+
+    Args:
+        fp: Open text file positioned at the start of the JSON document
+        chunk_size: Number of characters to read per refill
+
+    Raises:
+        json.JSONDecodeError: If the document is not a well-formed JSON array
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+
+    def refill(min_size: int = chunk_size) -> None:
+        # Drop what we have already consumed and append the next chunk
+        nonlocal buf, pos, eof
+        chunk = fp.read(max(min_size, chunk_size))
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def skip_whitespace() -> None:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            refill()
+
+    # The document must open with '['
+    skip_whitespace()
+    if pos >= len(buf) or buf[pos] != '[':
+        raise json.JSONDecodeError("Expected a JSON array", buf, pos)
+    pos += 1
+
+    first = True
+    while True:
+        skip_whitespace()
+        if pos >= len(buf):
+            raise json.JSONDecodeError("Unterminated JSON array", buf, pos)
+        if buf[pos] == ']':
+            return
+
+        # Elements after the first one are separated by commas
+        if not first:
+            if buf[pos] != ',':
+                raise json.JSONDecodeError("Expected ',' between array elements", buf, pos)
+            pos += 1
+            skip_whitespace()
+        first = False
+
+        # Decode one element. If it runs past the end of the buffer we
+        # read more (doubling the request so huge elements stay linear).
+        while True:
+            try:
+                element, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                refill(len(buf))
+                continue
+            # A number at the very end of the buffer may be cut short
+            if end == len(buf) and not eof:
+                refill(len(buf))
+                continue
+            break
+
+        pos = end
+        yield element
+
+
+def write_json_array(fp: IO[str], items: Iterable, level: int = 0) -> None:
+    """
+    Write items as a pretty-printed JSON array, one element at a time.
+
+    The output is byte-for-byte what json.dump(list(items), fp, indent=2)
+    would produce, without building the whole list (or the whole document)
+    in memory first.
+
+    Args:
+        fp: Open text file to write to
+        items: JSON-serializable elements
+        level: Nesting depth of the array (for arrays inside an object)
+    """
+    outer = '  ' * level
+    inner = outer + '  '
+    empty = True
+    for item in items:
+        fp.write('[\n' + inner if empty else ',\n' + inner)
+        # Re-indent the element to nest it inside the array. Newlines
+        # inside JSON strings are escaped, so only structural newlines
+        # are affected.
+        fp.write(json.dumps(item, indent=2).replace('\n', '\n' + inner))
+        empty = False
+    fp.write('[]' if empty else '\n' + outer + ']')
+
+
+def write_findings_document(fp: IO[str], findings: Iterable[Dict], remediations: Dict) -> None:
+    """
+    Write the aggregated findings export.
+
+    Layout:
+        {
+          "remediations": { "<remediation_id>": {summary, doc_url, options}, ... },
+          "findings": [ {..., "remediation_id": "<remediation_id>", ...}, ... ]
+        }
+
+    Remediation guidance is the same for every resource that fails a given
+    check, so it is stored once in "remediations" and each finding refers
+    to its entry by remediation_id.
+    """
+    fp.write('{\n  "remediations": ')
+    fp.write(json.dumps(remediations, indent=2).replace('\n', '\n  '))
+    fp.write(',\n  "findings": ')
+    write_json_array(fp, findings, level=1)
+    fp.write('\n}')
+
+
+def write_ndjson(fp: IO[str], items: Iterable) -> int:
+    """
+    Write items as newline-delimited JSON: one compact JSON value per line.
+
+    Unlike a JSON array, an NDJSON file can be written while the items are
+    still being produced, and read back one line at a time, so neither side
+    ever needs the whole list in memory.
+
+    Returns:
+        Number of items written
+    """
+    count = 0
+    for item in items:
+        fp.write(json.dumps(item, separators=(',', ':')))
+        fp.write('\n')
+        count += 1
+    return count
+
+
+def _content_hash(data) -> str:
+    """Short, stable hash of a JSON-serializable value."""
+    encoded = json.dumps(data, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:8]
+
+
+# ScoutSuite wraps its JSON in a JavaScript assignment
+SCOUTSUITE_RESULTS_MARKER = b'scoutsuite_results ='
+_LEADING_WHITESPACE = re.compile(r'[ \t\r\n]*')
+
+
+def read_scoutsuite_results(path: Path) -> Optional[Dict]:
+    """
+    Decode the JSON payload of a scoutsuite_results_*.js file.
+
+    WHY MEMORY-MAP?
+    These files can be hundreds of MB for large tenants. Reading the file
+    into a string and then splitting/stripping it makes two or three full
+    copies before json even starts. Instead we map the file, search the
+    mapping for the 'scoutsuite_results =' marker, and decode the payload
+    straight out of the mapped pages. The only full-size copy is the one
+    text string the JSON decoder needs.
+
+    Returns:
+        The parsed results dict, or None if the marker is missing
+
+    Raises:
+        json.JSONDecodeError: If the payload is not valid JSON
+    """
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return None
+
+    with mapped:
+        offset = mapped.find(SCOUTSUITE_RESULTS_MARKER)
+        if offset < 0:
+            return None
+        offset += len(SCOUTSUITE_RESULTS_MARKER)
+
+        # Decode directly from the mapping (no intermediate bytes object)
+        with memoryview(mapped) as view, view[offset:] as payload:
+            text = str(payload, 'utf-8')
+
+    # Start raw_decode at the first non-whitespace character instead of
+    # strip()-ing a copy; it also ignores anything after the JSON value
+    # (e.g. a trailing ';')
+    start = _LEADING_WHITESPACE.match(text).end()
+    results, _ = json.JSONDecoder().raw_decode(text, start)
+    return results
+
+
+class SummaryCounter:
+    """
+    Running counts for the findings summary.
+
+    Findings are added one at a time, as they are normalized (see
+    iter_prowler_file and _parse_scoutsuite_file), so the summary never
+    needs another pass over the findings. Each input file gets its own
+    counter; the aggregator merges them in file order, and cached or
+    worker-loaded files bring their counts with them.
+
+    Besides the one-way breakdowns, two cross-tabs are kept:
+        by_severity_account:  {severity: {account_id: count}}
+        by_severity_provider: {severity: {cloud_provider: count}}
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.by_severity: Dict[str, int] = {}
+        self.by_cloud_provider: Dict[str, int] = {}
+        self.by_source: Dict[str, int] = {}
+        self.by_account: Dict[str, int] = {}
+        self.by_check: Dict[str, int] = {}
+        self.by_severity_account: Dict[str, Dict[str, int]] = {}
+        self.by_severity_provider: Dict[str, Dict[str, int]] = {}
+
+    def add(self, finding: Finding):
+        self.total += 1
+
+        # Count by severity
+        sev = finding.severity or 'Unknown'
+        self.by_severity[sev] = self.by_severity.get(sev, 0) + 1
+
+        # Count by cloud provider
+        provider = finding.cloud_provider or 'Unknown'
+        self.by_cloud_provider[provider] = self.by_cloud_provider.get(provider, 0) + 1
+        row = self.by_severity_provider.setdefault(sev, {})
+        row[provider] = row.get(provider, 0) + 1
+
+        # Count by source tool
+        source = finding.source or 'Unknown'
+        self.by_source[source] = self.by_source.get(source, 0) + 1
+
+        # Count by check
+        check = finding.finding_id
+        if check:
+            self.by_check[check] = self.by_check.get(check, 0) + 1
+
+        # Count by account
+        account = finding.account_id
+        if account:
+            self.by_account[account] = self.by_account.get(account, 0) + 1
+            row = self.by_severity_account.setdefault(sev, {})
+            row[account] = row.get(account, 0) + 1
+
+    def merge(self, other: 'SummaryCounter'):
+        """Add another counter's counts (e.g. one input file's) to this one."""
+        self.total += other.total
+        for name in ('by_severity', 'by_cloud_provider', 'by_source', 'by_account', 'by_check'):
+            _add_counts(getattr(self, name), getattr(other, name))
+        for name in ('by_severity_account', 'by_severity_provider'):
+            table = getattr(self, name)
+            for sev, counts in getattr(other, name).items():
+                _add_counts(table.setdefault(sev, {}), counts)
+
+    @classmethod
+    def from_summary(cls, summary: Dict) -> 'SummaryCounter':
+        """Rebuild a counter from a summary() dict (e.g. a cache entry)."""
+        counter = cls()
+        counter.total = summary.get('total_findings', 0)
+        for name in ('by_severity', 'by_cloud_provider', 'by_source', 'by_account', 'by_check'):
+            setattr(counter, name, dict(summary.get(name, {})))
+        for name in ('by_severity_account', 'by_severity_provider'):
+            setattr(counter, name, {
+                sev: dict(counts) for sev, counts in summary.get(name, {}).items()
+            })
+        return counter
+
+    def summary(self) -> Dict:
+        return {
+            'total_findings': self.total,
+            'by_severity': self.by_severity,
+            'by_cloud_provider': self.by_cloud_provider,
+            'by_source': self.by_source,
+            'by_account': self.by_account,
+            'by_check': self.by_check,
+            'by_severity_account': self.by_severity_account,
+            'by_severity_provider': self.by_severity_provider,
+            'accounts': list(self.by_account.keys()),
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+def _add_counts(target: Dict[str, int], counts: Dict[str, int]):
+    for key, count in counts.items():
+        target[key] = target.get(key, 0) + count
+
+
+def _sharded_directories(prowler_files: List[Path]) -> set:
+    """Directories (accounts) with more than one file in prowler_files."""
+    counts: Dict[Path, int] = {}
+    for path in prowler_files:
+        counts[path.parent] = counts.get(path.parent, 0) + 1
+    return {directory for directory, count in counts.items() if count > 1}
+
+
+def _drop_repeats(findings: Iterable[Finding], seen: set,
+                  counter: SummaryCounter) -> Iterator[Finding]:
+    """
+    The findings of one shard that no earlier shard of the account
+    reported, counted in counter as they pass. seen holds the earlier
+    shards' fingerprints; this shard's are added once it is done.
+    """
+    reported = set()
+    for finding in findings:
+        if finding.fingerprint in seen:
+            continue
+        reported.add(finding.fingerprint)
+        counter.add(finding)
+        yield finding
+    seen.update(reported)
+
+
+# Aggregator used by each process-pool worker (see load_prowler_findings).
+# It is created once per worker process by _init_prowler_worker() so the
+# per-account tasks only have to ship a directory path over the pipe.
+_worker_aggregator = None
+
+
+def _init_prowler_worker(prowler_dir: str, scoutsuite_dir: str, output_dir: str):
+    """Process-pool initializer: build this worker's private aggregator."""
+    global _worker_aggregator
+    _worker_aggregator = FindingsAggregator(prowler_dir, scoutsuite_dir, output_dir,
+                                            use_cache=False)
+
+
+def _load_prowler_file_in_worker(path: str) -> Tuple[List[Finding], Dict, SummaryCounter]:
+    """Process-pool task: parse and normalize one Prowler output file."""
+    findings = _worker_aggregator._load_prowler_file(Path(path))
+    return (findings, _worker_aggregator.remediations_for(findings),
+            _worker_aggregator._file_counter)
+
 
 class FindingsAggregator:
     """Aggregate and normalize security findings from multiple sources"""
     
-    def __init__(self, prowler_dir: str, scoutsuite_dir: str, output_dir: str):
+    def __init__(self, prowler_dir: str, scoutsuite_dir: str, output_dir: str,
+                 workers: int = 1, use_cache: bool = True):
+        """
+        Args:
+            prowler_dir: Prowler output directory (single or multi-account layout)
+            scoutsuite_dir: ScoutSuite report directory
+            output_dir: Where aggregated results are written
+            workers: Number of processes used to load multi-account Prowler
+                     output. 1 (the default) loads accounts serially in this
+                     process; 0 uses one worker per CPU.
+            use_cache: Reuse normalized findings for input files that have not
+                       changed since the last run (see findings_cache.py).
+                       The cache lives in output_dir/.cache.
+        """
         self.prowler_dir = Path(prowler_dir)
         self.scoutsuite_dir = Path(scoutsuite_dir)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.cache = (
+            FindingsCache(self.output_dir / ".cache", NORMALIZED_FORMAT_VERSION)
+            if use_cache else None
+        )
         
         self.findings = []
+
+        # Shared remediation table: remediation_id -> remediation dict.
+        # Every failing resource of the same check points at one entry.
+        self.remediations: Dict[str, Dict] = {}
+        # Per-input-file memo: check key -> remediation_id, so remediation
+        # is only extracted once per check per file
+        self._remediation_memo: Dict[str, str] = {}
+
+        # Summary counts of everything loaded so far, kept up to date as
+        # findings are normalized (see SummaryCounter), and the counts of
+        # the input file being read
+        self.summary_counter = SummaryCounter()
+        self._file_counter = SummaryCounter()
     
-    def load_prowler_findings(self) -> List[Dict]:
+    def load_prowler_findings(self) -> List[Finding]:
         """
         Load and parse Prowler JSON results.
 
@@ -64,57 +515,279 @@ class FindingsAggregator:
 
         all_findings = []
 
+        for findings in self.load_prowler_files(self.prowler_files()):
+            all_findings.extend(findings)
+
+        print(f"Loaded {len(all_findings)} Prowler findings (failures only)")
+        return all_findings
+
+    def prowler_files(self) -> List[Path]:
+        """
+        The Prowler output files to load (in account order). An account
+        scanned in shards has one file per shard, next to each other.
+        """
         # Check for multi-account structure (subdirectories with account IDs)
         account_dirs = [d for d in self.prowler_dir.iterdir() if d.is_dir() and d.name.isdigit()]
 
         if account_dirs:
             # Multi-account mode: scan each account subdirectory
             print(f"Multi-account mode: Found {len(account_dirs)} account folders")
-            for account_dir in sorted(account_dirs):
-                findings = self._load_prowler_from_dir(account_dir)
-                all_findings.extend(findings)
+            directories = sorted(account_dirs)
         else:
             # Single account mode: scan the main output directory
-            findings = self._load_prowler_from_dir(self.prowler_dir)
-            all_findings.extend(findings)
+            directories = [self.prowler_dir]
 
-        print(f"Loaded {len(all_findings)} Prowler findings (failures only)")
-        return all_findings
+        return [f for d in directories for f in self.latest_prowler_files(d)]
+
+    def iter_findings(self) -> Iterator[Finding]:
+        """
+        Stream every normalized finding, one input file at a time.
+
+        The generator counterpart of aggregate_findings(): nothing is kept
+        in self.findings, so memory use is bounded by the largest input
+        file rather than by the whole scan. Input files are read in this
+        process one after another (the worker pool is not used), and the
+        input cache is still consulted and updated.
+
+        self.summary_counter is reset and counts the findings as they pass.
+        """
+        self.summary_counter = SummaryCounter()
+        print("Streaming Prowler findings...")
+        prowler_files = self.prowler_files()
+        sharded = _sharded_directories(prowler_files)
+        # Sharded account directory -> fingerprints its earlier shards reported
+        seen: Dict[Path, set] = {}
+        for path in prowler_files:
+            if path.parent in sharded:
+                yield from _drop_repeats(self._stream_prowler_file(path, count=False),
+                                         seen.setdefault(path.parent, set()),
+                                         self.summary_counter)
+            else:
+                yield from self._stream_prowler_file(path)
+
+        yield from self.load_scoutsuite_findings()
+
+        if self.cache:
+            self.cache.save()
+            print(f"Input cache: {self.cache.hits} reused, {self.cache.misses} parsed")
+
+    def _stream_prowler_file(self, path: Path, count: bool = True) -> Iterator[Finding]:
+        """
+        Stream one Prowler file's findings for iter_findings(), through the
+        input cache. With count, the file's summary counts are merged into
+        self.summary_counter.
+
+        A cache hit is streamed from the cache file. A miss with the cache
+        enabled holds that one file's findings in memory, since the cache
+        entry is written once the whole file has been parsed.
+        """
+        cached = self.cache.stream('prowler', path) if self.cache else None
+        if cached is not None:
+            # Read back one finding at a time, like iter_prowler_file()
+            print(f"  Cached:  {path}")
+            header, finding_dicts = cached
+            renamed = self._merge_remediations(header['remediations'])
+            for data in finding_dicts:
+                finding = Finding.from_dict(data)
+                finding.remediation_id = renamed.get(finding.remediation_id,
+                                                     finding.remediation_id)
+                yield finding
+            counter = SummaryCounter.from_summary(header['summary'])
+        elif self.cache:
+            # The cache entry needs the file's full list of findings
+            findings = self._load_prowler_file(path)
+            counter = self._file_counter
+            self._cache_put('prowler', path, findings)
+            yield from findings
+        else:
+            yield from self.iter_prowler_file(path)
+            counter = self._file_counter
+        if count:
+            self.summary_counter.merge(counter)
+
+    def load_prowler_files(self, prowler_files: List[Path]) -> List[List[Finding]]:
+        """
+        Load several Prowler files, reusing cached results where possible.
+
+        Files whose content has not changed since the last run come straight
+        from the cache; only the rest are parsed (in parallel if configured).
+        The returned list lines up with prowler_files. Each file's summary
+        counts are merged into self.summary_counter, in file order.
+
+        Shards of one account's scan are merged: a finding an earlier shard
+        already reported (a global check such as IAM shows up in every
+        region's shard) is left out of the later ones.
+        """
+        results: List[Optional[List[Finding]]] = [None] * len(prowler_files)
+        counters: List[Optional[SummaryCounter]] = [None] * len(prowler_files)
+        to_parse = []
+
+        for i, path in enumerate(prowler_files):
+            cached = self._cache_get('prowler', path)
+            if cached is not None:
+                print(f"  Cached:  {path}")
+                findings, remediations, counters[i] = cached
+                results[i] = self._adopt_remediations(findings, remediations)
+            else:
+                to_parse.append(i)
+
+        parsed = self._map_prowler_files([prowler_files[i] for i in to_parse])
+        for i, (findings, remediations, counter) in zip(to_parse, parsed):
+            results[i] = self._adopt_remediations(findings, remediations)
+            counters[i] = counter
+            self._cache_put('prowler', prowler_files[i], findings, counter)
+
+        sharded = _sharded_directories(prowler_files)
+        seen: Dict[Path, set] = {}
+        for i, path in enumerate(prowler_files):
+            if path.parent in sharded:
+                results[i] = list(_drop_repeats(results[i], seen.setdefault(path.parent, set()),
+                                                self.summary_counter))
+            else:
+                self.summary_counter.merge(counters[i])
+        return results
+
+    def _cache_get(self, kind: str,
+                   path: Path) -> Optional[Tuple[List[Finding], Dict, SummaryCounter]]:
+        """Look up cached findings (with their remediations and summary counts) for an input file."""
+        if not self.cache:
+            return None
+        cached = self.cache.get(kind, path)
+        if cached is None:
+            return None
+        findings = [Finding.from_dict(data) for data in cached['findings']]
+        return findings, cached['remediations'], SummaryCounter.from_summary(cached['summary'])
+
+    def _cache_put(self, kind: str, path: Path, findings: List[Finding],
+                   counter: Optional[SummaryCounter] = None):
+        """Store the findings parsed from an input file in the cache."""
+        if self.cache:
+            self.cache.put(kind, path, {
+                'findings': [finding.to_dict() for finding in findings],
+                'remediations': self.remediations_for(findings),
+                'summary': (counter or self._file_counter).summary(),
+            })
+
+    def _map_prowler_files(
+            self, prowler_files: List[Path]) -> Iterator[Tuple[List[Finding], Dict, SummaryCounter]]:
+        """
+        Parse each Prowler file, in parallel when workers > 1.
+
+        Results are yielded in the same order as prowler_files (executor.map
+        preserves input order), so the aggregated output is identical no
+        matter how many workers were used.
+        """
+        workers = min(self.workers, len(prowler_files))
+        if workers <= 1:
+            for prowler_file in prowler_files:
+                findings = self._load_prowler_file(prowler_file)
+                yield findings, self.remediations_for(findings), self._file_counter
+            return
+
+        print(f"Loading accounts with {workers} worker processes")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_prowler_worker,
+            initargs=(str(self.prowler_dir), str(self.scoutsuite_dir), str(self.output_dir)),
+        ) as executor:
+            # chunksize=1: account sizes vary a lot, so hand them out one by one
+            yield from executor.map(
+                _load_prowler_file_in_worker, [str(f) for f in prowler_files], chunksize=1
+            )
+
+    def latest_prowler_files(self, directory: Path) -> List[Path]:
+        """
+        Return the newest Prowler JSON output in a directory: one file, one
+        per shard for a sharded scan, or none.
+
+        The directory's latest.json (see write_prowler_pointer), written by
+        the scan scripts once Prowler has finished, decides. Without one
+        the newest file is picked by the scan time in its name: no stat()
+        per file.
+        """
+        pointer = directory / PROWLER_POINTER
+        try:
+            with open(pointer, 'r') as f:
+                files = json.load(f).get('files', [])
+        except FileNotFoundError:
+            files = []
+        except json.JSONDecodeError as e:
+            print(f"Ignoring unreadable {pointer}: {e}")
+            files = []
+        latest_files = [directory / name for name in files]
+        missing = [f.name for f in latest_files if not f.exists()]
+        if latest_files and not missing:
+            return latest_files
+        if missing:
+            print(f"{pointer} names missing file(s): {', '.join(missing)}")
 
-    def _load_prowler_from_dir(self, directory: Path) -> List[Dict]:
-        """Load Prowler findings from a specific directory."""
         # Prowler outputs files with pattern: prowler-output-ACCOUNTID-TIMESTAMP.json
-        # We look for .json files but exclude .ocsf.json (different format)
+        # We look for .json files (also compressed, e.g. pulled from object
+        # storage as .json.gz) but exclude .ocsf.json (different format)
         prowler_files = [
-            f for f in directory.glob("prowler-output-*.json")
-            if not f.name.endswith('.ocsf.json')
+            f for pattern in PROWLER_PATTERNS for f in directory.glob(pattern)
+            if '.ocsf.json' not in f.name
         ]
+        unreadable = [f for f in prowler_files if not can_read(f)]
+        for f in unreadable:
+            print(f"  Skipping {f.name} (zstandard not installed: pip install zstandard)")
+        prowler_files = [f for f in prowler_files if can_read(f)]
 
         if not prowler_files:
             return []
 
-        # Get the most recently created file
-        latest_file = max(prowler_files, key=os.path.getctime)
-        print(f"  Reading: {latest_file}")
+        return [max(prowler_files, key=prowler_file_order)]
 
-        # Load the JSON file
-        with open(latest_file, 'r') as f:
-            prowler_data = json.load(f)
+    def _load_prowler_from_dir(self, directory: Path) -> List[Finding]:
+        """Load Prowler findings from a specific directory (all shards of its latest scan)."""
+        return list(self.iter_prowler_findings(directory))
 
-        # Prowler v3.x outputs a list of finding objects
-        # We only care about FAILED checks (those are the security issues)
-        findings = []
+    def _load_prowler_file(self, path: Path) -> List[Finding]:
+        """Load Prowler findings from a specific output file."""
+        return list(self.iter_prowler_file(path))
 
-        for check in prowler_data:
-            # Only include findings that FAILED (not PASS)
-            if check.get('Status') == 'FAIL':
-                # Normalize each finding to our common format
-                normalized = self._normalize_prowler_finding(check)
-                findings.append(normalized)
+    def iter_prowler_findings(self, directory: Path) -> Iterator[Finding]:
+        """Stream normalized Prowler findings from a specific directory."""
+        latest_files = self.latest_prowler_files(directory)
+        if len(latest_files) == 1:
+            yield from self.iter_prowler_file(latest_files[0])
+            return
+        # Shards: merged like load_prowler_files does
+        seen = set()
+        for path in latest_files:
+            yield from _drop_repeats(self.iter_prowler_file(path), seen, SummaryCounter())
 
-        return findings
+    def iter_prowler_file(self, path: Path) -> Iterator[Finding]:
+        """
+        Stream normalized Prowler findings from one Prowler output file.
+
+        The file is parsed incrementally with iter_json_array(), so each
+        check is decoded, kept (FAIL) or dropped (PASS), and released before
+        the next one is read. Only the failures ever reach the caller.
+        PASS rows are still decoded in full, so this saves peak memory, not
+        parse time (skipping them unparsed means scanning the raw text for
+        element boundaries in Python, which is far slower than the C decoder).
+        Each one is also counted in self._file_counter.
+
+        .json.gz and .json.zst files are decompressed as they are read
+        (see compression.py).
+        """
+        print(f"  Reading: {path}")
+        self._remediation_memo = {}
+        self._file_counter = counter = SummaryCounter()
+
+        # Prowler v3.x outputs a list of finding objects
+        # We only care about FAILED checks (those are the security issues)
+        with open_text(path) as f:
+            for check in iter_json_array(f):
+                # Only include findings that FAILED (not PASS)
+                if check.get('Status') == 'FAIL':
+                    # Normalize each finding to our common format
+                    finding = self._normalize_prowler_finding(check)
+                    counter.add(finding)
+                    yield finding
     
-    def load_scoutsuite_findings(self) -> List[Dict]:
+    def load_scoutsuite_findings(self) -> List[Finding]:
         """
         Load and parse ScoutSuite JSON results.
 
@@ -143,27 +816,45 @@ class FindingsAggregator:
 
         # Get the most recent file
         latest_file = max(result_files, key=os.path.getctime)
-        print(f"Reading: {latest_file}")
+
+        cached = self._cache_get('scoutsuite', latest_file)
+        if cached is not None:
+            print(f"Cached:  {latest_file}")
+            findings, remediations, counter = cached
+            findings = self._adopt_remediations(findings, remediations)
+        else:
+            print(f"Reading: {latest_file}")
+            findings = self._parse_scoutsuite_file(latest_file)
+            if findings is None:
+                return []
+            counter = self._file_counter
+            self._cache_put('scoutsuite', latest_file, findings, counter)
+        self.summary_counter.merge(counter)
+
+        print(f"Loaded {len(findings)} ScoutSuite findings")
+        return findings
+
+    def _parse_scoutsuite_file(self, latest_file: Path) -> Optional[List[Finding]]:
+        """
+        Parse a ScoutSuite results file into normalized findings.
+
+        Returns None if the file could not be parsed (so it is not cached).
+        The findings are counted in self._file_counter.
+        """
+        self._remediation_memo = {}
+        self._file_counter = counter = SummaryCounter()
 
         # Read and parse the JavaScript file
+        # File starts with: scoutsuite_results =\n{...} or scoutsuite_results = {...}
         try:
-            with open(latest_file, 'r') as f:
-                content = f.read()
-
-            # Remove the JavaScript variable assignment to get pure JSON
-            # File starts with: scoutsuite_results =\n{...} or scoutsuite_results = {...}
-            if 'scoutsuite_results =' in content:
-                json_str = content.split('scoutsuite_results =', 1)[1].strip()
-                if json_str.startswith('\n'):
-                    json_str = json_str[1:]
-                scout_data = json.loads(json_str)
-            else:
+            scout_data = read_scoutsuite_results(latest_file)
+            if scout_data is None:
                 print("Could not find scoutsuite_results in file")
-                return []
+                return None
 
         except json.JSONDecodeError as e:
             print(f"Error parsing ScoutSuite JSON: {e}")
-            return []
+            return None
 
         # Extract findings from services
         findings = []
@@ -184,6 +875,7 @@ class FindingsAggregator:
                         normalized = self._normalize_scoutsuite_finding(
                             finding_id, finding_data, service_name, None
                         )
+                        counter.add(normalized)
                         findings.append(normalized)
                     else:
                         # Create a finding entry for each affected resource
@@ -191,12 +883,12 @@ class FindingsAggregator:
                             normalized = self._normalize_scoutsuite_finding(
                                 finding_id, finding_data, service_name, item_id
                             )
+                            counter.add(normalized)
                             findings.append(normalized)
 
-        print(f"Loaded {len(findings)} ScoutSuite findings")
         return findings
     
-    def _normalize_prowler_finding(self, check: Dict) -> Dict:
+    def _normalize_prowler_finding(self, check: Dict) -> Finding:
         """
         Normalize Prowler finding to our common format.
 
@@ -217,32 +909,109 @@ class FindingsAggregator:
         - description: What the check does
         - issue: What specifically is wrong (StatusExtended)
         - risk: Why this matters (security impact)
-        - remediation: How to fix it
+        - remediation_id: Key of the fix in the shared remediation table
         - compliance: Which frameworks this maps to (CIS, NIST, etc.)
         """
-        # Extract structured remediation info (nested in Prowler output)
-        remediation_info = check.get('Remediation', {})
-        remediation = self._extract_prowler_remediation(remediation_info)
+        # Extract structured remediation info (nested in Prowler output).
+        # It only depends on the check, so it is built once per CheckID and
+        # shared through the remediation table.
+        check_id = check.get('CheckID', 'unknown')
+        remediation_id = self._remediation_id(
+            f"prowler:{check_id}",
+            lambda: self._extract_prowler_remediation(check.get('Remediation', {}))
+        )
+
+        resource = check.get('ResourceId', '')
+        resource_arn = check.get('ResourceArn', '')
+        account_id = check.get('AccountId', '')
+
+        return Finding(
+            source='Prowler',
+            cloud_provider='AWS',
+            finding_id=check_id,
+            title=check.get('CheckTitle', ''),
+            severity=self._map_severity(check.get('Severity', 'medium')),
+            status=check.get('Status', 'UNKNOWN'),
+            resource=resource,
+            resource_arn=resource_arn,
+            region=check.get('Region', ''),
+            account_id=account_id,
+            description=check.get('Description', ''),
+            issue=check.get('StatusExtended', ''),  # The specific problem
+            risk=check.get('Risk', ''),  # Why this matters
+            remediation_id=remediation_id,
+            compliance=list(check.get('Compliance', {}).keys()),  # CIS, NIST, etc.
+            timestamp=datetime.now().isoformat(),
+            # Same check + resource + account = same finding in every scan
+            fingerprint=finding_fingerprint('Prowler', check_id, resource_arn or resource, account_id)
+        )
+
+    def _remediation_id(self, check_key: str, build: Callable[[], Dict]) -> str:
+        """
+        Return the remediation table key for a check, building it at most once.
+
+        WHY A SHARED TABLE?
+        Every failing resource of the same check gets exactly the same
+        remediation (CLI, Terraform, console steps...). Storing one copy per
+        check instead of one per finding shrinks both memory and the
+        exported JSON by a large factor.
 
+        Args:
+            check_key: Source-qualified check ID, e.g. "prowler:s3_bucket_versioning"
+            build: Called on the first occurrence to extract the remediation
+        """
+        remediation_id = self._remediation_memo.get(check_key)
+        if remediation_id is None:
+            remediation_id = self._add_remediation(check_key, build())
+            self._remediation_memo[check_key] = remediation_id
+        return remediation_id
+
+    def _add_remediation(self, remediation_id: str, remediation: Dict) -> str:
+        """
+        Store a remediation under remediation_id and return the key used.
+
+        The same check can carry different text in two inputs (e.g. outputs
+        from two Prowler versions). In that case the second variant is
+        stored under a content-hashed key instead of overwriting the first.
+        """
+        existing = self.remediations.get(remediation_id)
+        if existing is None or existing == remediation:
+            self.remediations[remediation_id] = remediation
+            return remediation_id
+
+        variant_id = f"{remediation_id}#{_content_hash(remediation)}"
+        self.remediations.setdefault(variant_id, remediation)
+        return variant_id
+
+    def remediations_for(self, findings: List[Finding]) -> Dict[str, Dict]:
+        """The slice of the remediation table referenced by some findings."""
         return {
-            'source': 'Prowler',
-            'cloud_provider': 'AWS',
-            'finding_id': check.get('CheckID', 'unknown'),
-            'title': check.get('CheckTitle', ''),
-            'severity': self._map_severity(check.get('Severity', 'medium')),
-            'status': check.get('Status', 'UNKNOWN'),
-            'resource': check.get('ResourceId', ''),
-            'resource_arn': check.get('ResourceArn', ''),
-            'region': check.get('Region', ''),
-            'account_id': check.get('AccountId', ''),
-            'description': check.get('Description', ''),
-            'issue': check.get('StatusExtended', ''),  # The specific problem
-            'risk': check.get('Risk', ''),  # Why this matters
-            'remediation': remediation,
-            'compliance': list(check.get('Compliance', {}).keys()),  # CIS, NIST, etc.
-            'timestamp': datetime.now().isoformat()
+            finding.remediation_id: self.remediations[finding.remediation_id]
+            for finding in findings
         }
 
+    def _merge_remediations(self, remediations: Dict[str, Dict]) -> Dict[str, str]:
+        """Add remediations to our table; returns {their key: our key} for keys that changed."""
+        renamed = {}
+        for remediation_id, remediation in remediations.items():
+            stored_id = self._add_remediation(remediation_id, remediation)
+            if stored_id != remediation_id:
+                renamed[remediation_id] = stored_id
+        return renamed
+
+    def _adopt_remediations(self, findings: List[Finding],
+                            remediations: Dict[str, Dict]) -> List[Finding]:
+        """
+        Merge remediations loaded elsewhere (a worker process, the cache)
+        into our table, re-pointing findings whose key had to change.
+        """
+        renamed = self._merge_remediations(remediations)
+        if renamed:
+            for finding in findings:
+                finding.remediation_id = renamed.get(finding.remediation_id,
+                                                     finding.remediation_id)
+        return findings
+
     def _extract_prowler_remediation(self, remediation_info: Dict) -> Dict:
         """
         Extract structured remediation options from Prowler output.
@@ -350,7 +1119,7 @@ class FindingsAggregator:
         return steps if steps else [summary]
 
     def _normalize_scoutsuite_finding(self, finding_id: str, finding_data: Dict,
-                                        service_name: str, item_id: Optional[str]) -> Dict:
+                                        service_name: str, item_id: Optional[str]) -> Finding:
         """
         Normalize ScoutSuite finding to common format.
 
@@ -385,24 +1154,28 @@ class FindingsAggregator:
             parts = item_id.split('.')
             resource = parts[-1] if parts else item_id
 
-        return {
-            'source': 'ScoutSuite',
-            'cloud_provider': 'Azure',
-            'finding_id': finding_id,
-            'title': finding_data.get('description', finding_id),
-            'severity': severity,
-            'status': 'FAIL',
-            'resource': resource,
-            'resource_arn': item_id or '',  # Full resource path
-            'region': 'global',  # Azure doesn't always have region in findings
-            'account_id': '',  # Will be populated from subscription if available
-            'description': finding_data.get('description', ''),
-            'issue': f"{finding_data.get('description', '')} - {finding_data.get('flagged_items', 0)} resource(s) affected",
-            'risk': finding_data.get('rationale', ''),
-            'remediation': self._extract_scoutsuite_remediation(finding_data),
-            'compliance': finding_data.get('references', []),  # Compliance references if available
-            'timestamp': datetime.now().isoformat()
-        }
+        return Finding(
+            source='ScoutSuite',
+            cloud_provider='Azure',
+            finding_id=finding_id,
+            title=finding_data.get('description', finding_id),
+            severity=severity,
+            status='FAIL',
+            resource=resource,
+            resource_arn=item_id or '',  # Full resource path
+            region='global',  # Azure doesn't always have region in findings
+            account_id='',  # Will be populated from subscription if available
+            description=finding_data.get('description', ''),
+            issue=f"{finding_data.get('description', '')} - {finding_data.get('flagged_items', 0)} resource(s) affected",
+            risk=finding_data.get('rationale', ''),
+            remediation_id=self._remediation_id(
+                f"scoutsuite:{finding_id}",
+                lambda: self._extract_scoutsuite_remediation(finding_data)
+            ),
+            compliance=finding_data.get('references', []),  # Compliance references if available
+            timestamp=datetime.now().isoformat(),
+            fingerprint=finding_fingerprint('ScoutSuite', finding_id, item_id or resource, '')
+        )
 
     def _extract_scoutsuite_remediation(self, finding_data: Dict) -> Dict:
         """
@@ -463,11 +1236,16 @@ class FindingsAggregator:
         print("\n" + "="*50)
         print("Aggregating Security Findings")
         print("="*50 + "\n")
-        
+
+        self.summary_counter = SummaryCounter()
         prowler_findings = self.load_prowler_findings()
         scoutsuite_findings = self.load_scoutsuite_findings()
         
         self.findings = prowler_findings + scoutsuite_findings
+
+        if self.cache:
+            self.cache.save()
+            print(f"Input cache: {self.cache.hits} reused, {self.cache.misses} parsed")
         
         print(f"\nTotal findings aggregated: {len(self.findings)}")
     
@@ -481,93 +1259,180 @@ class FindingsAggregator:
         - Breakdown by cloud provider (AWS vs Azure)
         - Breakdown by source tool (Prowler vs ScoutSuite)
         - Breakdown by account (for multi-account support)
-        """
-        if not self.findings:
-            return {
-                'total_findings': 0,
-                'by_severity': {},
-                'by_cloud_provider': {},
-                'by_source': {},
-                'by_account': {},
-                'accounts': [],
-                'timestamp': datetime.now().isoformat()
-            }
-
-        # Count findings by different categories
-        # We do this manually so we don't depend on pandas for the summary
-        by_severity = {}
-        by_cloud_provider = {}
-        by_source = {}
-        by_account = {}
-
-        for finding in self.findings:
-            # Count by severity
-            sev = finding.get('severity', 'Unknown')
-            by_severity[sev] = by_severity.get(sev, 0) + 1
-
-            # Count by cloud provider
-            provider = finding.get('cloud_provider', 'Unknown')
-            by_cloud_provider[provider] = by_cloud_provider.get(provider, 0) + 1
-
-            # Count by source tool
-            source = finding.get('source', 'Unknown')
-            by_source[source] = by_source.get(source, 0) + 1
-
-            # Count by account
-            account = finding.get('account_id', 'Unknown')
-            if account:
-                by_account[account] = by_account.get(account, 0) + 1
-
-        summary = {
-            'total_findings': len(self.findings),
-            'by_severity': by_severity,
-            'by_cloud_provider': by_cloud_provider,
-            'by_source': by_source,
-            'by_account': by_account,
-            'accounts': list(by_account.keys()),
-            'timestamp': datetime.now().isoformat()
-        }
+        - Severity by account and severity by provider (cross-tabs)
 
-        return summary
+        The counts were kept while the findings were loaded (see
+        SummaryCounter), so this does not loop over the findings again -
+        unless self.findings was filled in some other way.
+        """
+        counter = self.summary_counter
+        if counter.total != len(self.findings):
+            counter = SummaryCounter()
+            for finding in self.findings:
+                counter.add(finding)
+        return counter.summary()
     
     def export_results(self):
         """
         Export aggregated findings to various formats.
 
         Outputs:
-        1. JSON file - Full findings data for the dashboard
+        1. JSON file - Full findings data for the dashboard, with a shared
+           "remediations" section (see write_findings_document)
         2. CSV file - For spreadsheet analysis (requires pandas)
-        3. Summary JSON - Quick stats for dashboard widgets
+        3. Parquet files - Compact columnar copy of the findings and the
+           remediation table, for fast dashboard loads and analytics
+           (requires pyarrow, see columnar_export.py)
+        4. Summary JSON - Quick stats for dashboard widgets
+        5. SQLite store - The run is added to findings.db, which the
+           dashboard queries with indexes (requires SQLAlchemy, see
+           findings_store.py)
+        6. History - The run's counts and finding fingerprints are added
+           to history/ for trend charts (see scan_history.py)
+
+        Every file is written atomically (see atomic_files.py), and
+        latest.json is pointed at the new files last (see retention.py), so
+        a reader never sees a half-written export.
         """
         print("\nExporting results...")
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
         # Export to JSON (always works - no dependencies)
+        # Findings become dicts one at a time here, at the JSON boundary
         json_file = self.output_dir / f"aggregated_findings_{timestamp}.json"
-        with open(json_file, 'w') as f:
-            json.dump(self.findings, f, indent=2)
+        with atomic_write(json_file) as f:
+            write_findings_document(
+                f,
+                (finding.to_dict() for finding in self.findings),
+                self.remediations_for(self.findings)
+            )
         print(f"JSON exported: {json_file}")
 
         # Export to CSV (requires pandas)
         if self.findings and pd is not None:
             csv_file = self.output_dir / f"aggregated_findings_{timestamp}.csv"
-            df = pd.DataFrame(self.findings)
-            df.to_csv(csv_file, index=False)
+            df = pd.DataFrame.from_records(
+                [finding.as_tuple() for finding in self.findings],
+                columns=FINDING_FIELDS
+            )
+            with atomic_write(csv_file, newline='') as f:
+                df.to_csv(f, index=False)
             print(f"CSV exported: {csv_file}")
         elif self.findings and pd is None:
             print("CSV export skipped (pandas not installed)")
 
+        # Readers prefer the Parquet copy when there is one
+        findings_files = [json_file]
+
+        # Export to Parquet (requires pyarrow)
+        if self.findings and PARQUET_AVAILABLE:
+            parquet_file = self.output_dir / f"aggregated_findings_{timestamp}.parquet"
+            write_findings_parquet(
+                parquet_file,
+                self.output_dir / f"remediations_{timestamp}.parquet",
+                self.findings,
+                self.remediations_for(self.findings)
+            )
+            print(f"Parquet exported: {parquet_file}")
+            findings_files.insert(0, parquet_file)
+        elif self.findings:
+            print("Parquet export skipped (pyarrow not installed)")
+
         # Export summary
         summary = self.generate_summary()
         summary_file = self.output_dir / f"findings_summary_{timestamp}.json"
-        with open(summary_file, 'w') as f:
+        with atomic_write(summary_file) as f:
             json.dump(summary, f, indent=2)
         print(f"Summary exported: {summary_file}")
 
+        # Add the run to the SQLite store (requires SQLAlchemy)
+        scan_id = None
+        if STORE_AVAILABLE:
+            store = FindingsStore(self.output_dir / STORE_FILENAME)
+            scan_id = store.write_scan(
+                timestamp, self.findings, self.remediations_for(self.findings), summary
+            )
+            store.engine.dispose()
+            print(f"Stored in: {store.path} (scan {scan_id})")
+        else:
+            print("SQLite store skipped (SQLAlchemy not installed)")
+
+        self._record_history(timestamp, summary,
+                             (int(finding.fingerprint, 16) for finding in self.findings))
+        write_latest_pointer(self.output_dir, timestamp, findings_files, summary_file, scan_id)
+
         # Print summary to console
         self._print_summary(summary)
     
+    def export_ndjson(self, compression: Optional[str] = None):
+        """
+        Aggregate and export in one streaming pass, as newline-delimited JSON.
+
+        Each finding is written as soon as it has been normalized (see
+        iter_findings, which also keeps the summary counts), so the full
+        list of findings never exists in memory.
+
+        Args:
+            compression: 'gzip' or 'zstd' to compress the NDJSON file as it
+                         is written (aggregated_findings_*.ndjson.gz / .zst;
+                         see compression.py). The dashboard serves these
+                         bytes as they are.
+
+        Outputs:
+        1. NDJSON file - One finding per line (aggregated_findings_*.ndjson)
+        2. Remediations JSON - The shared remediation table the findings'
+           remediation_id refers to (remediations_*.json)
+        3. Summary JSON - Quick stats for dashboard widgets
+        4. History - The run's counts and finding fingerprints
+
+        No CSV is written in this mode (the CSV export needs every finding
+        in a pandas DataFrame).
+        """
+        print("\n" + "="*50)
+        print("Aggregating Security Findings (streaming NDJSON)")
+        print("="*50 + "\n")
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        fingerprints = []
+
+        def written(findings: Iterable[Finding]) -> Iterator[Dict]:
+            for finding in findings:
+                fingerprints.append(int(finding.fingerprint, 16))
+                yield finding.to_dict()
+
+        ndjson_file = self.output_dir / (
+            f"aggregated_findings_{timestamp}.ndjson" + COMPRESSION_SUFFIXES.get(compression, '')
+        )
+        with atomic_write(ndjson_file, 'wb') as raw, compressed_writer(raw, compression) as f:
+            write_ndjson(f, written(self.iter_findings()))
+        print(f"\nNDJSON exported: {ndjson_file}")
+
+        # Written after the findings: the table is complete only once every
+        # input has been read
+        remediations_file = self.output_dir / f"remediations_{timestamp}.json"
+        with atomic_write(remediations_file) as f:
+            json.dump(self.remediations, f, indent=2)
+        print(f"Remediations exported: {remediations_file}")
+
+        summary = self.summary_counter.summary()
+        summary_file = self.output_dir / f"findings_summary_{timestamp}.json"
+        with atomic_write(summary_file) as f:
+            json.dump(summary, f, indent=2)
+        print(f"Summary exported: {summary_file}")
+
+        self._record_history(timestamp, summary, fingerprints)
+        write_latest_pointer(self.output_dir, timestamp, [ndjson_file], summary_file)
+
+        self._print_summary(summary)
+
+    def _record_history(self, timestamp: str, summary: Dict, fingerprints: Iterable[int]):
+        """Add the run's counts and fingerprints to the scan history."""
+        history = ScanHistory(self.output_dir / HISTORY_DIRNAME)
+        history.record(timestamp, summary, fingerprints)
+        print(f"History updated: {history.scans_file}")
+
     def _print_summary(self, summary: Dict):
         """Print findings summary to console"""
         print("\n" + "="*50)
@@ -597,13 +1462,103 @@ class FindingsAggregator:
         print("\n" + "="*50)
 
 
+# Findings listed per section by the diff subcommand (--json lists all)
+DIFF_PRINT_LIMIT = 20
+
+
+def print_diff(base: str, head: str, diff):
+    """Print a scan diff (see scan_diff.py) for the console."""
+    print(f"Base: {base}")
+    print(f"Head: {head}\n")
+    counts = diff.counts()
+    print(f"New: {counts['new']}   Resolved: {counts['resolved']}   "
+          f"Unchanged: {counts['unchanged']}")
+
+    for label, findings in (("New findings", diff.new), ("Resolved findings", diff.resolved)):
+        if not findings:
+            continue
+        print(f"\n{label}:")
+        for finding in findings[:DIFF_PRINT_LIMIT]:
+            account = finding.get('account_id') or '-'
+            print(f"  [{finding.get('severity')}] {finding.get('title')} - "
+                  f"{finding.get('resource')} ({account})")
+        if len(findings) > DIFF_PRINT_LIMIT:
+            print(f"  ... and {len(findings) - DIFF_PRINT_LIMIT} more (use --json to see all)")
+
+
 def main():
     """
     Main execution function.
 
     This script can be run from anywhere - it automatically finds the
     project root directory and locates the scan results.
+
+    Subcommands:
+        (none)   Aggregate the latest scan results (the default)
+        diff     Compare two aggregation runs: new, resolved and unchanged
+                 findings, e.g. `aggregate_findings.py diff` (latest run vs
+                 the one before) or `aggregate_findings.py diff 20240101_120000
+                 20240108_120000`
+        compact  Keep the newest runs, roll older ones into compressed
+                 history segments and expire old history (see retention.py)
     """
+    parser = argparse.ArgumentParser(
+        description="Aggregate Prowler and ScoutSuite findings for the dashboard"
+    )
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help="Processes used to load multi-account Prowler output "
+             "(default: 1, 0 = one per CPU)"
+    )
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help="Re-parse every input file instead of reusing unchanged results"
+    )
+    parser.add_argument(
+        '--ndjson', action='store_true',
+        help="Stream findings to newline-delimited JSON as they are normalized "
+             "(constant memory; no CSV, --workers is not used)"
+    )
+    parser.add_argument(
+        '--compress', choices=sorted(COMPRESSION_SUFFIXES),
+        help="With --ndjson: compress the NDJSON export "
+             "(aggregated_findings_*.ndjson.gz / .zst; zstd needs zstandard)"
+    )
+    subcommands = parser.add_subparsers(dest='command')
+    diff_parser = subcommands.add_parser(
+        'diff', help="Compare two aggregation runs (new, resolved, unchanged findings)"
+    )
+    diff_parser.add_argument(
+        'base', nargs='?',
+        help="Older run: export timestamp (YYYYMMDD_HHMMSS) or file "
+             "(default: the run before HEAD)"
+    )
+    diff_parser.add_argument(
+        'head', nargs='?',
+        help="Newer run: export timestamp or file (default: the latest run)"
+    )
+    diff_parser.add_argument(
+        '--json', action='store_true',
+        help="Print the full diff as JSON: {\"counts\", \"new\", \"resolved\", \"unchanged\"}"
+    )
+    compact_parser = subcommands.add_parser(
+        'compact', help="Roll old runs into compressed history and apply the retention policy"
+    )
+    compact_parser.add_argument(
+        '--keep', type=int, default=DEFAULT_KEEP_RUNS,
+        help=f"Newest runs kept as full exports (default: {DEFAULT_KEEP_RUNS})"
+    )
+    compact_parser.add_argument(
+        '--history-days', type=int, default=DEFAULT_HISTORY_DAYS,
+        help=f"Delete history older than this many days (default: {DEFAULT_HISTORY_DAYS}, "
+             "0 = keep forever)"
+    )
+    args = parser.parse_args()
+    if args.compress and not args.ndjson:
+        parser.error("--compress only applies to --ndjson exports")
+    if args.compress == 'zstd' and not ZSTD_AVAILABLE:
+        parser.error("--compress zstd needs zstandard (pip install zstandard)")
+
     # Find the project root (where this script lives)
     # We go up two levels: scripts/scanning/ -> scripts/ -> project_root/
     script_dir = Path(__file__).parent.absolute()
@@ -617,6 +1572,33 @@ def main():
     SCOUTSUITE_DIR = project_root / "scoutsuite-report"
     OUTPUT_DIR = project_root / "scan-results" / "aggregated"
 
+    if args.command == 'diff':
+        try:
+            base, head, diff = diff_scans(OUTPUT_DIR, args.base, args.head)
+        except FileNotFoundError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        if args.json:
+            json.dump({'base': base, 'head': head,
+                       'counts': diff.counts(), **diff._asdict()}, sys.stdout, indent=2)
+            print()
+        else:
+            print_diff(base, head, diff)
+        return
+
+    if args.command == 'compact':
+        if not OUTPUT_DIR.exists():
+            print(f"Error: {OUTPUT_DIR} does not exist", file=sys.stderr)
+            sys.exit(1)
+        report = compact(OUTPUT_DIR, keep_runs=args.keep, history_days=args.history_days)
+        print(f"Kept {len(report.kept)} runs, compacted {len(report.compacted)} into history segments")
+        if report.store_scans_removed:
+            print(f"Removed {report.store_scans_removed} scans from the SQLite store")
+        if report.history_files_removed:
+            print(f"Removed {report.history_files_removed} expired history files")
+        print(f"Directory size: {report.bytes_before / 1e6:.1f} MB -> {report.bytes_after / 1e6:.1f} MB")
+        return
+
     print(f"Project root: {project_root}")
     print(f"Looking for Prowler results in: {PROWLER_DIR}")
     print(f"Looking for ScoutSuite results in: {SCOUTSUITE_DIR}")
@@ -626,12 +1608,17 @@ def main():
     aggregator = FindingsAggregator(
         prowler_dir=str(PROWLER_DIR),
         scoutsuite_dir=str(SCOUTSUITE_DIR),
-        output_dir=str(OUTPUT_DIR)
+        output_dir=str(OUTPUT_DIR),
+        workers=args.workers,
+        use_cache=not args.no_cache
     )
 
     # Run aggregation
-    aggregator.aggregate_findings()
-    aggregator.export_results()
+    if args.ndjson:
+        aggregator.export_ndjson(args.compress)
+    else:
+        aggregator.aggregate_findings()
+        aggregator.export_results()
 
     print("\nAggregation complete!")
     print("Next step: Launch the dashboard to visualize findings")
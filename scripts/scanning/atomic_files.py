@@ -0,0 +1,86 @@
+"""
+Atomic file writes: readers see the old file or the new one, never half of one
+
+Used by aggregate_findings.py (and the modules it writes with) for every
+export file, and for the latest.json pointer that names the newest run.
+
+WHY?
+----
+Opening the destination and writing into it means that, for as long as
+the write takes, the file on disk is incomplete. The dashboard (or a
+second aggregator) reading it at that moment gets truncated JSON. A crash
+or power loss in the middle leaves it truncated for good.
+
+HOW IT WORKS:
+-------------
+1. The data is written to a temporary file in the same directory
+   (hidden, so export file patterns like aggregated_findings_*.json never
+   match it).
+2. The temporary file is flushed and fsync()ed, so its content is on disk.
+3. It is renamed over the destination with os.replace(). A rename within
+   one directory is atomic: at every moment the name refers to either the
+   complete old file or the complete new one.
+4. The directory is fsync()ed, so the rename itself survives a crash.
+
+If anything fails before the rename, the temporary file is removed and
+the destination is left as it was.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator
+
+# mkstemp() creates files readable by their owner only; give the final
+# file the permissions open() would have (0666 minus the umask), so the
+# dashboard can read exports written by another user
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+
+
+def fsync_directory(directory: Path):
+    """Make renames in a directory durable (a no-op where directories cannot be opened)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        # Windows cannot open a directory; its renames are already durable
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_write(path: Path, mode: str = 'w', **open_args) -> Iterator[IO]:
+    """
+    Open a file for writing that only replaces `path` once it is complete.
+
+        with atomic_write(summary_file) as f:
+            json.dump(summary, f)
+
+    Args:
+        path: Destination file
+        mode: 'w' (text) or 'wb' (binary)
+        open_args: Passed on to open() (e.g. encoding, newline)
+    """
+    path = Path(path)
+    fd, temp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        os.chmod(temp, FILE_MODE)
+        with open(fd, mode, **open_args) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            os.unlink(temp)
+        except FileNotFoundError:
+            pass
+        raise
+    fsync_directory(path.parent)
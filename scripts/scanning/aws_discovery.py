@@ -0,0 +1,198 @@
+"""
+AWS account discovery (caller identity, Organizations accounts, regions), cached
+
+Used by multi_account_scan.py to work out which accounts to scan.
+
+WHY CACHE?
+----------
+Every lookup used to be an `aws ...` subprocess: a second or more of
+AWS CLI start-up each time, before the API call is even made. With
+--profiles that was one `aws sts get-caller-identity` per profile, on
+every run, although a profile's account never changes, and an
+organization's account list changes rarely.
+
+HOW IT WORKS:
+-------------
+1. Lookups are made in this process with boto3 when it is installed
+   (pip install boto3); without it the AWS CLI is run as before.
+2. AccountDiscovery remembers each answer, so a lookup is made at most
+   once per run however many times it is asked for.
+3. Answers are also kept on disk (output/.discovery-cache.json) for
+   `ttl` seconds (--discovery-ttl, default one hour), so runs started
+   within the TTL make no discovery calls at all. Entries are keyed by
+   the credentials they were looked up with (profile name, or the
+   access key ID from the environment), so switching credentials never
+   returns another account's answer. Failed lookups are not cached.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    from .atomic_files import atomic_write
+except ImportError:
+    # Running as a script: python scripts/scanning/multi_account_scan.py
+    from atomic_files import atomic_write
+
+# boto3 is optional: without it every lookup runs the AWS CLI
+# If not installed: pip install boto3
+try:
+    import boto3
+    from botocore.exceptions import BotoCoreError, ClientError
+except ImportError:
+    boto3 = None
+
+BOTO3_AVAILABLE = boto3 is not None
+
+# Default file name, inside the Prowler output directory
+DISCOVERY_CACHE_NAME = ".discovery-cache.json"
+
+# How long cached answers are used (seconds)
+DEFAULT_DISCOVERY_TTL = 60 * 60
+
+
+def _aws(*args: str) -> Optional[str]:
+    """Run an AWS CLI query; its text output, or None if it failed."""
+    try:
+        out = subprocess.run(
+            ['aws', *args, '--output', 'text'],
+            capture_output=True, text=True, timeout=120
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    value = out.stdout.strip()
+    if out.returncode != 0 or not value or value == 'None':
+        return None
+    return value
+
+
+def get_account_id(profile: Optional[str] = None) -> Optional[str]:
+    """Account ID of the current credentials (or of a named profile)."""
+    if boto3 is not None:
+        try:
+            return boto3.Session(profile_name=profile).client('sts').get_caller_identity()['Account']
+        except (BotoCoreError, ClientError):
+            return None
+    args = ['sts', 'get-caller-identity', '--query', 'Account']
+    if profile:
+        args += ['--profile', profile]
+    return _aws(*args)
+
+
+def list_organization_accounts() -> Optional[List[str]]:
+    """IDs of the organization's active accounts, or None if they cannot be listed."""
+    if boto3 is not None:
+        try:
+            paginator = boto3.Session().client('organizations').get_paginator('list_accounts')
+            accounts = [account['Id'] for page in paginator.paginate()
+                        for account in page['Accounts'] if account['Status'] == 'ACTIVE']
+        except (BotoCoreError, ClientError):
+            return None
+        return accounts or None
+    accounts = _aws('organizations', 'list-accounts',
+                    '--query', "Accounts[?Status=='ACTIVE'].Id")
+    return accounts.split() if accounts else None
+
+
+def list_regions(profile: Optional[str] = None) -> Optional[List[str]]:
+    """The regions enabled for the current credentials (or a named profile)."""
+    if boto3 is not None:
+        try:
+            regions = boto3.Session(profile_name=profile).client('ec2').describe_regions()
+        except (BotoCoreError, ClientError):
+            return None
+        return sorted(region['RegionName'] for region in regions['Regions']) or None
+    args = ['ec2', 'describe-regions', '--query', 'Regions[].RegionName']
+    if profile:
+        args += ['--profile', profile]
+    regions = _aws(*args)
+    return sorted(regions.split()) if regions else None
+
+
+def _credentials_key(profile: Optional[str]) -> str:
+    """Which credentials a lookup uses, for the cache key."""
+    if profile:
+        return f"profile:{profile}"
+    key_id = os.environ.get('AWS_ACCESS_KEY_ID')
+    if key_id:
+        return 'key:' + hashlib.sha1(key_id.encode()).hexdigest()[:12]
+    return f"profile:{os.environ.get('AWS_PROFILE', 'default')}"
+
+
+class AccountDiscovery:
+    """Account lookups, each made once and then cached in memory and on disk"""
+
+    def __init__(self, cache_file: Optional[Path] = None, ttl: float = DEFAULT_DISCOVERY_TTL):
+        """
+        Args:
+            cache_file: Where answers are kept between runs (None: this run only)
+            ttl: How long a cached answer is used, in seconds (0: not cached on disk)
+        """
+        self.cache_file = Path(cache_file) if cache_file and ttl > 0 else None
+        self.ttl = ttl
+        # Answers looked up / found in the cache, for the run's report
+        self.lookups = 0
+        self.hits = 0
+        # key -> {"value": ..., "time": epoch seconds}
+        self._entries: Dict[str, Dict] = self._load()
+        self._lock = threading.Lock()
+        # One lock per key, so two workers asking for the same profile
+        # make one lookup, and different profiles are looked up side by side
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def _load(self) -> Dict[str, Dict]:
+        if self.cache_file is None:
+            return {}
+        try:
+            with open(self.cache_file, 'r') as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        now = time.time()
+        return {key: entry for key, entry in entries.items()
+                if now - entry.get('time', 0) < self.ttl}
+
+    def _save(self):
+        if self.cache_file is None:
+            return
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(self.cache_file) as f:
+            json.dump(self._entries, f, indent=2)
+
+    def _cached(self, key: str, lookup: Callable[[], Optional[object]]):
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    return entry['value']
+                self.lookups += 1
+            value = lookup()
+            if value is not None:
+                with self._lock:
+                    self._entries[key] = {'value': value, 'time': time.time()}
+                    self._save()
+            return value
+
+    def account_id(self, profile: Optional[str] = None) -> Optional[str]:
+        """Account ID of the current credentials (or of a named profile)."""
+        return self._cached(f"account_id|{_credentials_key(profile)}",
+                            lambda: get_account_id(profile))
+
+    def organization_accounts(self) -> Optional[List[str]]:
+        """IDs of the organization's active accounts, or None if they cannot be listed."""
+        return self._cached(f"organization_accounts|{_credentials_key(None)}",
+                            list_organization_accounts)
+
+    def regions(self, profile: Optional[str] = None) -> Optional[List[str]]:
+        """The regions enabled for the current credentials (or a named profile)."""
+        return self._cached(f"regions|{_credentials_key(profile)}",
+                            lambda: list_regions(profile))
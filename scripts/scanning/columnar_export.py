@@ -0,0 +1,150 @@
+"""
+Columnar (Parquet) export of aggregated findings
+
+Used by aggregate_findings.py next to the JSON and CSV exports, when
+pyarrow is installed.
+
+WHY COLUMNAR?
+-------------
+The JSON export repeats every field name and every value for every
+finding. Most values repeat a lot: there are only a handful of
+severities, providers, accounts and regions, and a few hundred check IDs.
+Parquet stores each field as its own column, and for those repetitive
+columns we use dictionary encoding: each distinct value is stored once,
+and each row only stores a small integer pointing at it.
+
+Because the data is split by column, a reader can also load just the
+columns it needs (the dashboard's list page only needs severity, title
+and provider, not the long issue and risk texts).
+
+Nested data keeps its real type instead of being flattened to a string
+like in the CSV:
+- compliance is a list of strings
+- the remediation table (remediations_<timestamp>.parquet) has one row
+  per remediation, with its options as a list of structs
+"""
+
+from pathlib import Path
+from typing import Dict, List
+
+try:
+    from .atomic_files import atomic_write
+except ImportError:
+    # Running as a script: python scripts/scanning/aggregate_findings.py
+    from atomic_files import atomic_write
+
+# pyarrow is optional: without it the Parquet export is skipped
+# If not installed: pip install pyarrow
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+PARQUET_AVAILABLE = pa is not None
+
+# Columns with few distinct values: stored dictionary-encoded
+DICTIONARY_FIELDS = frozenset({
+    'source', 'cloud_provider', 'finding_id', 'title', 'severity', 'status',
+    'region', 'account_id', 'remediation_id',
+})
+
+# Compression codec for both files
+COMPRESSION = 'zstd'
+
+
+def _schemas():
+    """Arrow schemas for the two files (built lazily: pyarrow is optional)."""
+    text = pa.string()
+    encoded = pa.dictionary(pa.int32(), pa.string())
+
+    findings = pa.schema([
+        ('source', encoded),
+        ('cloud_provider', encoded),
+        ('finding_id', encoded),
+        ('title', encoded),
+        ('severity', encoded),
+        ('status', encoded),
+        ('resource', text),
+        ('resource_arn', text),
+        ('region', encoded),
+        ('account_id', encoded),
+        ('description', text),
+        ('issue', text),
+        ('risk', text),
+        ('remediation_id', encoded),
+        ('compliance', pa.list_(text)),
+        ('timestamp', text),
+        ('fingerprint', text),
+    ])
+
+    option = pa.struct([
+        ('type', text),
+        ('label', text),
+        ('code', text),
+        ('html', text),
+        ('steps', pa.list_(text)),
+        ('note', text),
+    ])
+    remediations = pa.schema([
+        ('remediation_id', text),
+        ('summary', text),
+        ('doc_url', text),
+        ('options', pa.list_(option)),
+    ])
+    return findings, remediations
+
+
+def findings_table(findings: List) -> 'pa.Table':
+    """Build the findings table from Finding records, one column at a time."""
+    schema, _ = _schemas()
+    columns = []
+    for field in schema:
+        values = [getattr(finding, field.name) for finding in findings]
+        if field.name == 'compliance':
+            values = [[str(item) for item in value] if value else [] for value in values]
+            columns.append(pa.array(values, type=field.type))
+        elif field.name in DICTIONARY_FIELDS:
+            columns.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            columns.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def remediations_table(remediations: Dict[str, Dict]) -> 'pa.Table':
+    """Build the remediation table: one row per remediation_id."""
+    _, schema = _schemas()
+    option_fields = [f.name for f in schema.field('options').type.value_type]
+    rows = [
+        {
+            'remediation_id': remediation_id,
+            'summary': remediation.get('summary', ''),
+            'doc_url': remediation.get('doc_url', ''),
+            'options': [
+                {name: option.get(name) for name in option_fields}
+                for option in remediation.get('options', [])
+            ],
+        }
+        for remediation_id, remediation in remediations.items()
+    ]
+    return pa.Table.from_pylist(rows, schema=schema)
+
+
+def write_findings_parquet(findings_file: Path, remediations_file: Path,
+                           findings: List, remediations: Dict[str, Dict]):
+    """
+    Write findings and their remediation table as two Parquet files.
+
+    Args:
+        findings_file: Destination for the findings (one row per finding)
+        remediations_file: Destination for the remediation table
+        findings: Finding records
+        remediations: remediation_id -> remediation dict
+    """
+    # Remediations first: a reader that finds the findings file can rely
+    # on the remediation table being complete
+    with atomic_write(remediations_file, 'wb') as f:
+        pq.write_table(remediations_table(remediations), f, compression=COMPRESSION)
+    with atomic_write(findings_file, 'wb') as f:
+        pq.write_table(findings_table(findings), f, compression=COMPRESSION)
@@ -0,0 +1,115 @@
+"""
+Compressed inputs and outputs (gzip and zstd)
+
+Used by aggregate_findings.py to read Prowler output that was stored
+compressed (prowler-output-*.json.gz / .json.zst) and to write compressed
+NDJSON exports (--compress gzip|zstd), and by dashboard/app.py to read
+and serve those exports.
+
+WHY?
+----
+Scan output is very repetitive JSON: the same field names, check IDs and
+remediation texts over and over. It compresses 10-20x, so it is usually
+archived compressed (in object storage, for example) and pulled down as
+.json.gz. Reading it should not need a separate decompression step that
+writes the full JSON to disk first.
+
+HOW IT WORKS:
+-------------
+The compression is picked from the file name (.gz = gzip, .zst = zstd).
+open_text() returns a text stream that decompresses as it is read, so
+the streaming JSON parser (iter_json_array) only ever holds one chunk of
+decompressed data, whatever the size of the file.
+
+zstd is optional: it needs the zstandard package (pip install zstandard).
+Without it .zst files are skipped and --compress zstd is refused; gzip
+is in the standard library and always works.
+"""
+
+import gzip
+import io
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator, Optional
+
+# zstandard is optional: without it .zst files cannot be read or written
+# If not installed: pip install zstandard
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZSTD_AVAILABLE = zstandard is not None
+
+# Compression name -> file name suffix
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+# Compression levels: fast enough to keep up with the normalizers
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def compression_of(path: Path) -> Optional[str]:
+    """'gzip', 'zstd' or None (uncompressed), from a file name."""
+    suffix = Path(path).suffix
+    for compression, compressed_suffix in COMPRESSION_SUFFIXES.items():
+        if suffix == compressed_suffix:
+            return compression
+    return None
+
+
+def strip_compression(name: str) -> str:
+    """A file name without its compression suffix (x.json.gz -> x.json)."""
+    for suffix in COMPRESSION_SUFFIXES.values():
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def can_read(path: Path) -> bool:
+    """Whether open_text() can read a file (zstd files need zstandard)."""
+    return compression_of(path) != 'zstd' or ZSTD_AVAILABLE
+
+
+def open_text(path: Path) -> IO[str]:
+    """
+    Open a (possibly compressed) file for reading as UTF-8 text.
+
+    Decompression happens as the stream is read; nothing is decompressed
+    ahead of time.
+    """
+    compression = compression_of(path)
+    if compression == 'gzip':
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if compression == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError(f"Cannot read {path}: zstandard not installed")
+        raw = open(path, 'rb')
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(io.BufferedReader(reader), encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+@contextmanager
+def compressed_writer(raw: IO[bytes], compression: Optional[str]) -> Iterator[IO[str]]:
+    """
+    Text stream that compresses into an open binary file.
+
+    raw is left open (it is usually an atomic_write() file, which still
+    has to be synced and renamed once the compressed data is complete).
+    """
+    if compression == 'gzip':
+        with gzip.open(raw, 'wt', encoding='utf-8', compresslevel=GZIP_LEVEL) as out:
+            yield out
+    elif compression == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstd compression needs zstandard (pip install zstandard)")
+        writer = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=False)
+        with io.TextIOWrapper(writer, encoding='utf-8') as out:
+            yield out
+    else:
+        out = io.TextIOWrapper(raw, encoding='utf-8')
+        yield out
+        # Hand raw back to the caller still open
+        out.flush()
+        out.detach()
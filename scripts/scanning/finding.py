@@ -0,0 +1,128 @@
+"""
+Compact in-memory record for a normalized security finding
+
+WHY NOT A DICT?
+---------------
+Every normalized finding has the same 17 fields. As a dict, each finding
+carries its own hash table (several hundred bytes) on top of the values.
+Across a million findings that overhead dominates the aggregator's memory.
+
+A class with __slots__ stores the values in a fixed array instead of a
+per-instance dict, which is roughly a third of the size. We also intern
+the low-cardinality strings (check IDs, titles, regions, account IDs...)
+so thousands of findings from the same check share one copy of each text.
+
+Findings are converted to plain dicts only at the JSON boundary
+(exports, the input cache). Inside the aggregator they also support
+finding['field'] and finding.get('field') so code written against the
+dict format keeps working.
+"""
+
+import hashlib
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+# Field order used everywhere (record layout, JSON keys, CSV columns)
+FINDING_FIELDS = (
+    'source',
+    'cloud_provider',
+    'finding_id',
+    'title',
+    'severity',
+    'status',
+    'resource',
+    'resource_arn',
+    'region',
+    'account_id',
+    'description',
+    'issue',
+    'risk',
+    'remediation_id',
+    'compliance',
+    'timestamp',
+    'fingerprint',
+)
+
+# Severity sorts by importance, not alphabetically (the dashboard's sort
+# order, and the severity_rank column of the SQLite store)
+SEVERITY_ORDER = {'Critical': 0, 'High': 1, 'Medium': 2, 'Low': 3, 'Informational': 4}
+
+# Fields covered by full-text search (the dashboard's word index, and the
+# store's FTS table)
+TEXT_FIELDS = ('title', 'issue', 'resource', 'resource_arn', 'risk', 'finding_id', 'account_id')
+
+# Fields whose values repeat across many findings (same check, same account)
+_INTERNED_FIELDS = frozenset({
+    'source', 'cloud_provider', 'finding_id', 'title', 'severity', 'status',
+    'region', 'account_id', 'description', 'risk', 'remediation_id',
+})
+
+
+def finding_fingerprint(source: str, finding_id: str, resource_arn: str,
+                        account_id: str) -> str:
+    """
+    Stable identity of a finding across scans: 16 hex digits (64 bits).
+
+    The same check failing on the same resource of the same account gets
+    the same fingerprint in every run, whatever its severity, title or
+    timestamp, so two scans can be compared with set operations.
+    Normalizers pass the resource name when a finding has no ARN.
+    """
+    key = '\x1f'.join((source or '', finding_id or '', resource_arn or '', account_id or ''))
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class Finding:
+    """One normalized finding, stored in slots instead of a dict"""
+
+    __slots__ = FINDING_FIELDS
+
+    def __init__(self, **fields):
+        for name in FINDING_FIELDS:
+            value = fields.get(name, '')
+            if name in _INTERNED_FIELDS and type(value) is str:
+                value = sys.intern(value)
+            setattr(self, name, value)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Finding':
+        """Build a record from the JSON (dict) representation."""
+        finding = cls(**data)
+        if not finding.fingerprint:
+            # Exported before findings had fingerprints
+            finding.fingerprint = finding_fingerprint(
+                finding.source, finding.finding_id,
+                finding.resource_arn or finding.resource, finding.account_id
+            )
+        return finding
+
+    def to_dict(self) -> Dict:
+        """Return the JSON (dict) representation."""
+        return {name: getattr(self, name) for name in FINDING_FIELDS}
+
+    def as_tuple(self) -> Tuple:
+        """Field values in FINDING_FIELDS order (for columnar exports)."""
+        return tuple(getattr(self, name) for name in FINDING_FIELDS)
+
+    # Mapping-style access so finding['severity'] keeps working
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in FINDING_FIELDS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if name not in FINDING_FIELDS:
+            return default
+        return getattr(self, name)
+
+    def keys(self) -> Iterator[str]:
+        return iter(FINDING_FIELDS)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Finding):
+            return NotImplemented
+        return self.as_tuple() == other.as_tuple()
+
+    def __repr__(self) -> str:
+        return f"Finding({self.source}:{self.finding_id} {self.severity} {self.resource!r})"
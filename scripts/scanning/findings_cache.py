@@ -0,0 +1,221 @@
+"""
+Per-input-file cache of normalized findings
+
+Used by aggregate_findings.py so that re-running the aggregator only
+re-parses scanner output that actually changed.
+
+HOW IT WORKS:
+-------------
+1. A manifest (manifest.json) records, for every input file we read:
+   its path, size, modification time and SHA-256 content hash
+2. The normalized findings produced from that file (with their
+   remediations and summary counts) are stored once, in a cache file
+   named after the content hash. The file is NDJSON: a header line with
+   the remediations and summary, then one finding per line, so a cache
+   hit can be streamed finding by finding (see stream())
+3. On the next run:
+   - Same size and mtime  -> trust the recorded hash (no re-read at all)
+   - Different size/mtime -> re-hash the file; if the hash still matches
+                             (e.g. the file was copied or touched) reuse it
+   - Different hash       -> cache miss, the aggregator parses the file
+4. Cache entries for inputs that were not used in the latest run are
+   removed when the manifest is saved, so the cache never grows unbounded
+
+The manifest also stores a format version, and every cache file name
+carries it too (prowler-v4-<sha256>.ndjson). When the normalized finding
+format changes, the aggregator bumps that version and every cached entry
+is ignored; an entry that still does not have the expected shape is
+treated as a miss rather than handed to the aggregator.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+# Read size used when hashing input files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Keys every cache entry's header line must have (see FindingsCache.put)
+HEADER_KEYS = ('remediations', 'summary')
+
+
+def file_sha256(path: Path) -> str:
+    """Hash a file in chunks so large scanner outputs never sit in memory."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FindingsCache:
+    """Manifest-backed cache of normalized findings, one entry per input file"""
+
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, cache_dir: Path, version: int):
+        """
+        Args:
+            cache_dir: Directory holding manifest.json and the cached findings
+            version: Normalized-format version; entries from other versions are ignored
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.version = version
+
+        self._entries = self._read_manifest()
+        # Entries used during this run (what gets written back on save)
+        self._used: Dict[str, Dict] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def _read_manifest(self) -> Dict[str, Dict]:
+        manifest_file = self.cache_dir / self.MANIFEST_NAME
+        if not manifest_file.exists():
+            return {}
+
+        try:
+            with open(manifest_file, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable cache manifest: {e}")
+            return {}
+
+        if manifest.get('version') != self.version:
+            return {}
+        return manifest.get('files', {})
+
+    def _fingerprint(self, path: Path) -> Dict:
+        """Size, mtime and content hash of an input file."""
+        stat = path.stat()
+        entry = self._entries.get(str(path))
+
+        # Cheap check first: unchanged size and mtime means unchanged file
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            sha256 = entry['sha256']
+        else:
+            sha256 = file_sha256(path)
+
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+
+    def _cache_file(self, kind: str, sha256: str) -> Path:
+        return self.cache_dir / f"{kind}-v{self.version}-{sha256}.ndjson"
+
+    def _lookup(self, kind: str, path: Path) -> Path:
+        """Record an input file as used by this run and return its cache file."""
+        path = Path(path)
+        fingerprint = self._fingerprint(path)
+        fingerprint['kind'] = kind
+        self._used[str(path)] = fingerprint
+        return self._cache_file(kind, fingerprint['sha256'])
+
+    @staticmethod
+    def _read_header(f) -> Optional[Dict]:
+        """The header line of an open cache file, or None if it is not one."""
+        try:
+            header = json.loads(f.readline())
+        except json.JSONDecodeError:
+            return None
+        # Written by another format version, or damaged: parse the input again
+        if not isinstance(header, dict) or any(key not in header for key in HEADER_KEYS):
+            return None
+        return header
+
+    def get(self, kind: str, path: Path) -> Optional[Dict]:
+        """
+        Return the cached entry for an input file, or None on a miss.
+
+        The entry is what put() stored: {'findings': [...], 'remediations':
+        {...}, 'summary': {...}}.
+
+        Args:
+            kind: Which parser produced the entry ('prowler', 'scoutsuite')
+            path: Input file to look up
+        """
+        cache_file = self._lookup(kind, path)
+        try:
+            with open(cache_file, 'r') as f:
+                entry = self._read_header(f)
+                if entry is not None:
+                    entry['findings'] = [json.loads(line) for line in f]
+        except (OSError, json.JSONDecodeError):
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def stream(self, kind: str, path: Path) -> Optional[Tuple[Dict, Iterator[Dict]]]:
+        """
+        Like get(), but the findings are read lazily.
+
+        Returns (header, findings) where header is {'remediations': {...},
+        'summary': {...}} and findings yields one finding dict at a time
+        from the cache file, or None on a miss.
+        """
+        cache_file = self._lookup(kind, path)
+        try:
+            f = open(cache_file, 'r')
+        except OSError:
+            self.misses += 1
+            return None
+
+        header = self._read_header(f)
+        if header is None:
+            f.close()
+            self.misses += 1
+            return None
+
+        def findings() -> Iterator[Dict]:
+            with f:
+                for line in f:
+                    yield json.loads(line)
+
+        self.hits += 1
+        return header, findings()
+
+    def put(self, kind: str, path: Path, entry: Dict):
+        """
+        Store what was parsed from an input file.
+
+        Args:
+            kind: Which parser produced the entry ('prowler', 'scoutsuite')
+            path: Input file the entry was parsed from
+            entry: {'findings': normalized finding dicts, 'remediations':
+                   remediation table of those findings, 'summary': their
+                   summary counts}
+        """
+        path = Path(path)
+        fingerprint = self._used.get(str(path)) or dict(self._fingerprint(path), kind=kind)
+        self._used[str(path)] = fingerprint
+
+        cache_file = self._cache_file(kind, fingerprint['sha256'])
+        tmp_file = cache_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump({key: entry[key] for key in HEADER_KEYS}, f)
+            f.write('\n')
+            for finding in entry['findings']:
+                json.dump(finding, f)
+                f.write('\n')
+        os.replace(tmp_file, cache_file)
+
+    def save(self):
+        """Write the manifest and drop cache files no input refers to anymore."""
+        manifest_file = self.cache_dir / self.MANIFEST_NAME
+        tmp_file = manifest_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump({'version': self.version, 'files': self._used}, f, indent=2)
+        os.replace(tmp_file, manifest_file)
+
+        live = {self._cache_file(e['kind'], e['sha256']).name for e in self._used.values()}
+        # *json also catches the .json entries older versions wrote
+        for cache_file in self.cache_dir.glob("*-*.*json"):
+            if cache_file.name not in live:
+                cache_file.unlink()
+
+        self._entries = dict(self._used)
@@ -0,0 +1,267 @@
+"""
+SQLite store of aggregated findings
+
+Used by aggregate_findings.py, which adds every export to the store, and
+read by the dashboard (dashboard/sql_findings.py), which answers its
+pages with indexed SQL queries instead of scanning a list of findings.
+
+HOW IT WORKS:
+-------------
+The database (scan-results/aggregated/findings.db) has four tables:
+
+    scans          one row per aggregation run: its export timestamp,
+                   when it was stored, the finding count and the summary
+    findings       one row per finding, tagged with its scan and its
+                   position in that scan (the same order as the JSON export)
+    remediations   the shared remediation table of each scan
+    findings_fts   full-text index (SQLite FTS5) over the searchable
+                   fields, so word searches do not read every row
+
+Every query the dashboard makes is about one scan, so the findings
+indexes start with scan_id: (scan_id, severity), (scan_id, account_id)...
+SQLite can then jump straight to e.g. the High findings of the latest scan,
+already sorted by position.
+
+A scan is written in a single transaction with multi-row inserts, so
+readers never see half a scan and a large export is not slowed down by
+one commit per row.
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# SQLAlchemy is optional: without it the store is skipped
+# If not installed: pip install SQLAlchemy
+try:
+    import sqlalchemy as sa
+except ImportError:
+    sa = None
+
+try:
+    from .finding import FINDING_FIELDS, SEVERITY_ORDER, TEXT_FIELDS
+except ImportError:
+    # Running as a script: python scripts/scanning/aggregate_findings.py
+    from finding import FINDING_FIELDS, SEVERITY_ORDER, TEXT_FIELDS
+
+STORE_AVAILABLE = sa is not None
+
+# Default database file name, inside the aggregated output directory
+STORE_FILENAME = "findings.db"
+
+# Rows per INSERT statement while writing a scan
+INSERT_BATCH_SIZE = 5000
+
+# Columns that get a (scan_id, column) index
+INDEXED_FIELDS = ('severity', 'account_id', 'cloud_provider', 'finding_id', 'region', 'source',
+                  'fingerprint')
+
+
+def _build_schema():
+    """Table definitions (built lazily: SQLAlchemy is optional)."""
+    metadata = sa.MetaData()
+
+    scans = sa.Table(
+        'scans', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        # Timestamp in the export file names (YYYYMMDD_HHMMSS)
+        sa.Column('scan_timestamp', sa.String, nullable=False),
+        # When the scan was stored (seconds since the epoch)
+        sa.Column('created_at', sa.Float, nullable=False),
+        sa.Column('total_findings', sa.Integer, nullable=False),
+        sa.Column('summary', sa.Text, nullable=False),
+        sa.Index('ix_scans_scan_timestamp', 'scan_timestamp'),
+    )
+
+    finding_columns = [
+        sa.Column(name, sa.Text, nullable=False, default='')
+        for name in FINDING_FIELDS
+        if name != 'compliance'
+    ]
+    findings = sa.Table(
+        'findings', metadata,
+        # Integer primary key = SQLite rowid, shared with findings_fts
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('scan_id', sa.Integer, sa.ForeignKey('scans.id'), nullable=False),
+        sa.Column('position', sa.Integer, nullable=False),
+        *finding_columns,
+        # JSON list of framework names
+        sa.Column('compliance', sa.Text, nullable=False, default='[]'),
+        # Sort key for severity (see SEVERITY_ORDER)
+        sa.Column('severity_rank', sa.Integer, nullable=False),
+        sa.UniqueConstraint('scan_id', 'position', name='uq_findings_scan_position'),
+        *[sa.Index(f"ix_findings_{name}", 'scan_id', name) for name in INDEXED_FIELDS],
+    )
+
+    remediations = sa.Table(
+        'remediations', metadata,
+        sa.Column('scan_id', sa.Integer, sa.ForeignKey('scans.id'), primary_key=True),
+        sa.Column('remediation_id', sa.Text, primary_key=True),
+        # JSON remediation dict (summary, doc_url, options)
+        sa.Column('data', sa.Text, nullable=False),
+    )
+
+    return metadata, scans, findings, remediations
+
+
+def create_engine(path: Path) -> 'sa.engine.Engine':
+    """
+    SQLAlchemy engine for a store file.
+
+    WAL journaling lets the dashboard keep reading while the aggregator
+    writes a new scan.
+    """
+    engine = sa.create_engine(f"sqlite:///{Path(path)}")
+
+    @sa.event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+    return engine
+
+
+class FindingsStore:
+    """Writes aggregation runs into the SQLite store"""
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: SQLite database file (created, with its tables, if missing)
+        """
+        self.path = Path(path)
+        self.engine = create_engine(self.path)
+        self.metadata, self.scans, self.findings, self.remediations = _build_schema()
+
+        self.metadata.create_all(self.engine)
+        self._add_missing_columns()
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS findings_fts USING fts5("
+                + ', '.join(TEXT_FIELDS)
+                # Contentless: we only need the matching rowids back
+                + ", content='', prefix='2 3')"
+            )
+
+    def _add_missing_columns(self):
+        """Upgrade a database created before a finding field (and its index) existed."""
+        existing = {c['name'] for c in sa.inspect(self.engine).get_columns('findings')}
+        missing = [c for c in self.findings.columns if c.name not in existing]
+        if not missing:
+            return
+        with self.engine.begin() as conn:
+            for column in missing:
+                conn.exec_driver_sql(
+                    f"ALTER TABLE findings ADD COLUMN {column.name} TEXT NOT NULL DEFAULT ''"
+                )
+            for index in self.findings.indexes:
+                index.create(conn, checkfirst=True)
+
+    def write_scan(self, scan_timestamp: str, findings: List, remediations: Dict[str, Dict],
+                   summary: Dict) -> int:
+        """
+        Store one aggregation run in a single transaction.
+
+        Args:
+            scan_timestamp: Timestamp used in the export file names
+            findings: Finding records, in export order
+            remediations: remediation_id -> remediation dict
+            summary: The run's summary (as written to findings_summary_*.json)
+
+        Returns:
+            The new scan's id
+        """
+        with self.engine.begin() as conn:
+            scan_id = conn.execute(self.scans.insert().values(
+                scan_timestamp=scan_timestamp,
+                created_at=time.time(),
+                total_findings=len(findings),
+                summary=json.dumps(summary),
+            )).inserted_primary_key[0]
+
+            for batch in _batches(self._rows(scan_id, findings), INSERT_BATCH_SIZE):
+                conn.execute(self.findings.insert(), batch)
+
+            # Index the new rows for full-text search in one statement
+            conn.exec_driver_sql(
+                f"INSERT INTO findings_fts(rowid, {', '.join(TEXT_FIELDS)}) "
+                f"SELECT id, {', '.join(TEXT_FIELDS)} FROM findings WHERE scan_id = ?",
+                (scan_id,)
+            )
+
+            if remediations:
+                conn.execute(self.remediations.insert(), [
+                    {'scan_id': scan_id, 'remediation_id': remediation_id,
+                     'data': json.dumps(remediation)}
+                    for remediation_id, remediation in remediations.items()
+                ])
+
+        return scan_id
+
+    @staticmethod
+    def _rows(scan_id: int, findings: Iterable) -> Iterable[Dict]:
+        for position, finding in enumerate(findings):
+            row = finding.to_dict()
+            row['compliance'] = json.dumps(row.get('compliance') or [])
+            for name, value in row.items():
+                if value is None:
+                    row[name] = ''
+                elif name != 'compliance' and not isinstance(value, str):
+                    row[name] = str(value)
+            row['scan_id'] = scan_id
+            row['position'] = position
+            row['severity_rank'] = SEVERITY_ORDER.get(row['severity'], 99)
+            yield row
+
+    def delete_scans(self, scan_timestamps: Iterable[str]) -> int:
+        """
+        Remove the scans with these export timestamps (retention, see
+        retention.py), then VACUUM so the file actually shrinks.
+
+        Returns:
+            Number of scans removed
+        """
+        scan_timestamps = list(scan_timestamps)
+        if not scan_timestamps:
+            return 0
+
+        with self.engine.begin() as conn:
+            scan_ids = [row.id for row in conn.execute(
+                sa.select(self.scans.c.id).where(self.scans.c.scan_timestamp.in_(scan_timestamps))
+            )]
+            if not scan_ids:
+                return 0
+            placeholders = ', '.join('?' * len(scan_ids))
+            # findings_fts is contentless: a row is deleted by passing back
+            # the values it was indexed with
+            conn.exec_driver_sql(
+                f"INSERT INTO findings_fts(findings_fts, rowid, {', '.join(TEXT_FIELDS)}) "
+                f"SELECT 'delete', id, {', '.join(TEXT_FIELDS)} FROM findings "
+                f"WHERE scan_id IN ({placeholders})",
+                tuple(scan_ids)
+            )
+            conn.execute(self.findings.delete().where(self.findings.c.scan_id.in_(scan_ids)))
+            conn.execute(self.remediations.delete().where(self.remediations.c.scan_id.in_(scan_ids)))
+            conn.execute(self.scans.delete().where(self.scans.c.id.in_(scan_ids)))
+
+        with self.engine.connect() as conn:
+            conn.execution_options(isolation_level='AUTOCOMMIT').exec_driver_sql('VACUUM')
+        return len(scan_ids)
+
+    def latest_scan_id(self) -> Optional[int]:
+        with self.engine.connect() as conn:
+            return conn.execute(sa.select(sa.func.max(self.scans.c.id))).scalar()
+
+
+def _batches(rows: Iterable[Dict], size: int) -> Iterable[List[Dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,645 @@
+#!/usr/bin/env python3
+"""
+Multi-Account AWS Security Scanning (parallel)
+
+Runs Prowler across many AWS accounts at once and organizes the results
+into account-specific subdirectories, the layout aggregate_findings.py
+reads:
+
+    output/<account_id>/prowler-output-<account_id>-<timestamp>.json
+    output/<account_id>/latest.json      names the finished output
+    output/<account_id>/prowler-scan.log  Prowler's console output
+
+With --shard-by each account's scan is split into several Prowler
+processes (one per region, or per group of services) that run at the
+same time, each writing its own file:
+
+    output/<account_id>/prowler-output-<account_id>-<shard>-<timestamp>.json
+    output/<account_id>/prowler-scan-<shard>.log
+
+SUPPORTED APPROACHES (same options as run_multi_account_scan.sh, which
+now runs this script):
+1. AWS Profiles (--profiles): Use named profiles from ~/.aws/credentials
+2. Assume Role (--accounts + --role-arn): Assume a role in each account
+3. AWS Organizations (--org): Auto-discover accounts from Organizations
+
+WHY PARALLEL?
+-------------
+A Prowler scan spends most of its time waiting on AWS API calls, not
+using the CPU. Running accounts one after another (the old bash loop)
+means a 200-account organization takes 200 scan-times. Here a pool of
+--workers threads each start one Prowler process at a time, so the run
+takes roughly (accounts / workers) scan-times.
+
+HOW IT WORKS:
+-------------
+1. The accounts to scan are worked out from the options. Account IDs,
+   the organization's accounts and regions are looked up once, in this
+   process, and cached on disk for --discovery-ttl seconds (see
+   aws_discovery.py), so a repeated run makes no discovery calls.
+2. Each worker runs `prowler aws ... --output-directory output/<account>`
+   as a child process. Prowler's console output goes to that account's
+   prowler-scan.log, so parallel scans do not interleave on the terminal.
+3. A scan that runs longer than --timeout is stopped (with every process
+   it started) and reported, and the worker moves on to the next account.
+4. When Prowler finishes, latest.json is pointed at its new output file
+   (see write_prowler_pointer), so the aggregator only reads finished
+   scans. A sharded scan is finished when every shard is: latest.json
+   then names all of the shards' files, and the aggregator merges them
+   into one account. If any shard fails, latest.json is left as it was.
+5. With --aggregate, each finished account is normalized right away,
+   while the others are still scanning, and the dashboard gets a partial
+   snapshot (see scan_pipeline.py) at most every --publish-interval
+   seconds. The full export is written as soon as the last scan is done.
+6. Every account's start and outcome (status, output files, duration)
+   is written to the checkpoint journal, output/scan-journal.jsonl (see
+   scan_journal.py). If the run dies part way, run it again with
+   --resume: accounts that completed within --fresh-hours are skipped.
+7. At the end the total wall time is compared with the sum of the
+   per-account times, i.e. what the same scans would have taken one
+   after another.
+
+USAGE EXAMPLES:
+---------------
+    python scripts/scanning/multi_account_scan.py --profiles "prod,staging,dev"
+    python scripts/scanning/multi_account_scan.py --workers 8 --org \\
+        --role-arn "arn:aws:iam::ACCOUNT_ID:role/SecurityAuditRole"
+    python scripts/scanning/multi_account_scan.py --profiles "prod" --shard-by region
+    python scripts/scanning/multi_account_scan.py --org --role-arn "..." --resume
+"""
+
+import argparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    from .aggregate_findings import (
+        PROWLER_PATTERNS, FindingsAggregator, prowler_file_order, write_prowler_pointer,
+    )
+    from .aws_discovery import (
+        DEFAULT_DISCOVERY_TTL, DISCOVERY_CACHE_NAME, AccountDiscovery, get_account_id,
+    )
+    from .scan_journal import DEFAULT_FRESH_HOURS, JOURNAL_NAME, ScanJournal
+    from .scan_pipeline import DEFAULT_PUBLISH_INTERVAL, RunningAggregation
+except ImportError:
+    # Running as a script: python scripts/scanning/multi_account_scan.py
+    from aggregate_findings import (
+        PROWLER_PATTERNS, FindingsAggregator, prowler_file_order, write_prowler_pointer,
+    )
+    from aws_discovery import (
+        DEFAULT_DISCOVERY_TTL, DISCOVERY_CACHE_NAME, AccountDiscovery, get_account_id,
+    )
+    from scan_journal import DEFAULT_FRESH_HOURS, JOURNAL_NAME, ScanJournal
+    from scan_pipeline import DEFAULT_PUBLISH_INTERVAL, RunningAggregation
+
+# Prowler processes running at the same time. Each one holds a few
+# hundred MB, so this is kept modest; raise it on a big runner.
+DEFAULT_WORKERS = 4
+
+# Longest a single account's scan may run (seconds); 0 = no limit
+DEFAULT_TIMEOUT = 2 * 60 * 60
+
+# How long a stopped scan gets to exit before it is killed (seconds)
+TERMINATE_GRACE = 10
+
+# Prowler's console output, per account
+SCAN_LOG_NAME = "prowler-scan.log"
+
+# Exit codes of a finished Prowler scan: 0 (every check passed) or 3 (some
+# checks failed). Anything else means it crashed or was killed, and the
+# JSON it left behind may be cut short.
+PROWLER_FINISHED_CODES = (0, 3)
+
+# Services that get a shard of their own with --shard-by service (one
+# comma-separated group per shard): the ones that take longest in big
+# accounts. Every other service runs in one more shard, 'rest'.
+DEFAULT_SERVICE_GROUPS = ('ec2,vpc', 'iam', 's3', 'cloudtrail,cloudwatch,logs')
+
+# Serializes progress lines printed by the workers
+_print_lock = threading.Lock()
+
+
+class ScanTarget(NamedTuple):
+    """One account to scan, and how to get credentials for it"""
+    account_id: Optional[str]      # None: look it up from the profile
+    profile: Optional[str] = None
+    role_arn: Optional[str] = None  # may contain the ACCOUNT_ID placeholder
+
+    @property
+    def label(self) -> str:
+        return self.account_id or f"profile {self.profile}"
+
+
+class Shard(NamedTuple):
+    """One part of an account's scan, run as a Prowler process of its own"""
+    name: str                       # in the output file name, e.g. 'eu-west-1'
+    args: Tuple[str, ...]           # Prowler options selecting this part
+
+
+class ScanResult(NamedTuple):
+    """How one account's scan went"""
+    target: ScanTarget
+    account_id: Optional[str]
+    status: str                     # 'completed', 'failed' or 'timeout'
+    duration: float                 # seconds
+    output_files: List[Path]        # one per shard; empty unless completed
+    message: str = ''
+
+
+def _say(message: str):
+    with _print_lock:
+        print(message, flush=True)
+
+
+def region_shards(regions: List[str]) -> List[Shard]:
+    """One shard per region."""
+    return [Shard(region, ('--region', region)) for region in regions]
+
+
+def service_shards(groups: List[str]) -> List[Shard]:
+    """
+    One shard per group of services ('ec2,vpc'), plus a 'rest' shard that
+    runs every service not in a group, so together they cover a full scan.
+    """
+    shards, grouped = [], []
+    for group in groups:
+        services = [s.strip() for s in group.split(',') if s.strip()]
+        if services:
+            shards.append(Shard('+'.join(services), ('--service', *services)))
+            grouped += services
+    shards.append(Shard('rest', ('--excluded-services', *grouped)))
+    return shards
+
+
+def prowler_command(prowler: str, account_id: str, target: ScanTarget,
+                    output_dir: Path, service: Optional[str] = None,
+                    shard: Optional[Shard] = None,
+                    output_filename: Optional[str] = None) -> List[str]:
+    """The Prowler command line for one account (or one shard of it)."""
+    cmd = [prowler, 'aws']
+    if target.profile:
+        cmd += ['--profile', target.profile]
+    if target.role_arn:
+        # Replace ACCOUNT_ID placeholder with actual account ID
+        cmd += ['--role', target.role_arn.replace('ACCOUNT_ID', account_id)]
+    if service:
+        cmd += ['--service', service]
+    if shard:
+        cmd += shard.args
+    cmd += ['--output-directory', str(output_dir), '--output-formats', 'json']
+    if output_filename:
+        # Without the extension; Prowler adds .json
+        cmd += ['--output-filename', output_filename]
+    return cmd
+
+
+def _prowler_outputs(directory: Path) -> set:
+    return {
+        f for pattern in PROWLER_PATTERNS for f in directory.glob(pattern)
+        if '.ocsf.json' not in f.name
+    }
+
+
+def _run(cmd: List[str], log_file: Path, timeout: Optional[float]) -> int:
+    """
+    Run a command with its output going to log_file; its exit code.
+
+    The command gets its own process group, so on timeout everything it
+    started is stopped too (terminated, then killed after
+    TERMINATE_GRACE seconds).
+
+    Raises:
+        subprocess.TimeoutExpired: if it ran longer than timeout
+    """
+    with open(log_file, 'w') as log:
+        process = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT,
+                                   stdin=subprocess.DEVNULL, start_new_session=True)
+        try:
+            return process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _stop(process)
+            raise
+
+
+def _stop(process: subprocess.Popen):
+    """Stop a process and its process group."""
+    def send(sig):
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(process.pid, sig)
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass
+
+    send(signal.SIGTERM)
+    try:
+        process.wait(timeout=TERMINATE_GRACE)
+    except subprocess.TimeoutExpired:
+        send(getattr(signal, 'SIGKILL', signal.SIGTERM))
+        process.wait()
+
+
+def scan_account(target: ScanTarget, output_dir: Path, prowler: str = 'prowler',
+                 service: Optional[str] = None, timeout: Optional[float] = None,
+                 shards: Optional[List[Shard]] = None) -> ScanResult:
+    """
+    Run Prowler for one account and point its latest.json at the result.
+
+    With shards, one Prowler process per shard runs at the same time, and
+    latest.json names all of their files once every shard has finished.
+
+    Never raises: problems are reported in the returned ScanResult, so one
+    bad account does not stop the others.
+    """
+    start = time.monotonic()
+
+    def result(status, account_id=None, output_files=None, message=''):
+        return ScanResult(target, account_id, status, time.monotonic() - start,
+                          output_files or [], message)
+
+    account_id = target.account_id or get_account_id(target.profile)
+    if not account_id:
+        return result('failed', message=f"Could not get account ID for profile: {target.profile}")
+
+    account_output_dir = Path(output_dir) / account_id
+    account_output_dir.mkdir(parents=True, exist_ok=True)
+
+    if shards:
+        _say(f"[INFO] Scanning account: {account_id} ({len(shards)} shards)")
+        timestamp = time.strftime('%Y%m%d%H%M%S')
+        with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+            outcomes = list(executor.map(
+                lambda shard: _scan_shard(prowler, account_id, target, account_output_dir,
+                                          service, shard, timestamp, timeout),
+                shards
+            ))
+        failures = [(status, message) for status, _, message in outcomes if status != 'completed']
+        if failures:
+            status = 'timeout' if any(s == 'timeout' for s, _ in failures) else 'failed'
+            return result(status, account_id, message='; '.join(m for _, m in failures))
+        output_files = [output_file for _, output_file, _ in outcomes]
+        write_prowler_pointer(account_output_dir, output_files)
+        return result('completed', account_id, output_files)
+
+    before = _prowler_outputs(account_output_dir)
+
+    _say(f"[INFO] Scanning account: {account_id}")
+    cmd = prowler_command(prowler, account_id, target, account_output_dir, service)
+    try:
+        returncode = _run(cmd, account_output_dir / SCAN_LOG_NAME, timeout)
+    except subprocess.TimeoutExpired:
+        return result('timeout', account_id,
+                      message=f"Stopped after {timeout:.0f}s (see {SCAN_LOG_NAME})")
+    except OSError as e:
+        return result('failed', account_id, message=f"Could not run Prowler: {e}")
+
+    if returncode not in PROWLER_FINISHED_CODES:
+        return result('failed', account_id,
+                      message=f"Prowler exited with {returncode} (see {SCAN_LOG_NAME})")
+
+    new_outputs = _prowler_outputs(account_output_dir) - before
+    if not new_outputs:
+        return result('failed', account_id,
+                      message=f"Prowler exited with {returncode} and wrote no JSON output "
+                              f"(see {SCAN_LOG_NAME})")
+
+    output_file = max(new_outputs, key=prowler_file_order)
+    write_prowler_pointer(account_output_dir, [output_file])
+    return result('completed', account_id, [output_file])
+
+
+def _scan_shard(prowler: str, account_id: str, target: ScanTarget, account_output_dir: Path,
+                service: Optional[str], shard: Shard, timestamp: str,
+                timeout: Optional[float]) -> Tuple[str, Optional[Path], str]:
+    """Run one shard of an account's scan: (status, output file, message)."""
+    # The shard's name goes before the timestamp, which the aggregator
+    # expects at the end (see prowler_file_order)
+    name = f"prowler-output-{account_id}-{shard.name}-{timestamp}"
+    log_name = f"prowler-scan-{shard.name}.log"
+    cmd = prowler_command(prowler, account_id, target, account_output_dir, service, shard, name)
+    try:
+        returncode = _run(cmd, account_output_dir / log_name, timeout)
+    except subprocess.TimeoutExpired:
+        return 'timeout', None, f"Shard {shard.name} stopped after {timeout:.0f}s (see {log_name})"
+    except OSError as e:
+        return 'failed', None, f"Could not run Prowler: {e}"
+
+    if returncode not in PROWLER_FINISHED_CODES:
+        return 'failed', None, (f"Shard {shard.name}: Prowler exited with {returncode} "
+                                f"(see {log_name})")
+
+    output_file = account_output_dir / f"{name}.json"
+    if not output_file.exists():
+        return 'failed', None, (f"Shard {shard.name}: Prowler exited with {returncode} and "
+                                f"wrote no JSON output (see {log_name})")
+    return 'completed', output_file, ''
+
+
+def scan_accounts(targets: List[ScanTarget], output_dir: Path, workers: int = DEFAULT_WORKERS,
+                  prowler: str = 'prowler', service: Optional[str] = None,
+                  timeout: Optional[float] = DEFAULT_TIMEOUT,
+                  shards: Optional[List[Shard]] = None,
+                  on_result: Optional[Callable[[ScanResult], None]] = None,
+                  journal: Optional[ScanJournal] = None) -> List[ScanResult]:
+    """
+    Scan `workers` accounts at a time. Each account is one Prowler
+    process, or one per shard if shards are given (so up to
+    workers x shards processes run at the same time).
+
+    on_result, if given, is called with each ScanResult as soon as that
+    account is done, in this thread (while the other scans go on). If it
+    raises, the error is reported for that account and the other accounts
+    are still reported (and journaled) as they finish.
+    journal, if given, gets a line when each account's scan starts and
+    one with its outcome when it is done.
+
+    Returns:
+        One ScanResult per target, in target order
+    """
+    timeout = timeout or None
+
+    def scan(target: ScanTarget) -> ScanResult:
+        if journal is not None:
+            journal.record(target.label, 'started')
+        return scan_account(target, output_dir, prowler, service, timeout, shards)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(scan, target): i for i, target in enumerate(targets)}
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if journal is not None:
+                journal.record(
+                    result.target.label, result.status,
+                    account_id=result.account_id,
+                    output_files=[f.relative_to(output_dir).as_posix() for f in result.output_files],
+                    duration=round(result.duration, 1),
+                    message=result.message,
+                )
+            name = result.account_id or result.target.label
+            if result.status == 'completed':
+                _say(f"[SUCCESS] Completed scan for account {name} ({result.duration:.1f}s, "
+                     f"{len(results)}/{len(targets)} done)")
+            else:
+                _say(f"[ERROR] Scan {result.status} for {name}: {result.message}")
+            if on_result is not None:
+                try:
+                    on_result(result)
+                except Exception as e:
+                    # e.g. unreadable Prowler output: the scans still running are not affected
+                    _say(f"[ERROR] Processing the results of {name} failed: {e}")
+    return [results[i] for i in range(len(targets))]
+
+
+def resume_targets(targets: List[ScanTarget], journal: ScanJournal,
+                   fresh_hours: float = DEFAULT_FRESH_HOURS
+                   ) -> Tuple[List[ScanTarget], Dict[str, Dict]]:
+    """
+    Split targets into those still to scan and those the journal says
+    completed within the last fresh_hours (by label, with their entry).
+    """
+    since = datetime.now() - timedelta(hours=fresh_hours)
+    pending, done = [], {}
+    for target in targets:
+        entry = journal.completed_since(target.label, since)
+        if entry is None:
+            pending.append(target)
+        else:
+            done[target.label] = entry
+    return pending, done
+
+
+def speedup_report(results: List[ScanResult], wall_time: float) -> str:
+    """Wall time against the time the same scans would have taken one by one."""
+    serial = sum(r.duration for r in results)
+    speedup = serial / wall_time if wall_time > 0 else 1.0
+    return (f"Wall time: {wall_time:.1f}s; serial time (sum of per-account scans): "
+            f"{serial:.1f}s; speedup: {speedup:.1f}x")
+
+
+def main():
+    """Parse the options, scan every account and print a report."""
+    script_dir = Path(__file__).parent.absolute()
+    project_root = script_dir.parent.parent
+
+    parser = argparse.ArgumentParser(
+        description="Multi-account AWS security scanning using Prowler, several accounts at a time"
+    )
+    parser.add_argument('--profiles', help="Comma-separated list of AWS profile names")
+    parser.add_argument('--accounts',
+                        help="Comma-separated list of AWS account IDs (use with --role-arn)")
+    parser.add_argument('--role-arn',
+                        help="IAM role ARN to assume in each account; use ACCOUNT_ID as "
+                             "placeholder for the account ID")
+    parser.add_argument('--org', action='store_true',
+                        help="Use AWS Organizations to discover accounts "
+                             "(requires organizations:ListAccounts permission)")
+    parser.add_argument('--service', help="Limit scan to specific service (e.g., s3, iam, ec2)")
+    parser.add_argument('--quick', action='store_true', help="Quick scan mode (S3 service only)")
+    parser.add_argument('--output-dir', default=str(project_root / "output"),
+                        help="Output directory (default: output/)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"Accounts scanned at the same time (default: {DEFAULT_WORKERS})")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help=f"Stop an account's scan after this many seconds "
+                             f"(default: {DEFAULT_TIMEOUT}, 0 = no limit)")
+    parser.add_argument('--shard-by', choices=['region', 'service'],
+                        help="Split each account's scan into concurrent Prowler processes, "
+                             "one per region or per group of services")
+    parser.add_argument('--regions',
+                        help="With --shard-by region: comma-separated regions "
+                             "(default: the regions enabled in the account)")
+    parser.add_argument('--service-groups', default=';'.join(DEFAULT_SERVICE_GROUPS),
+                        help="With --shard-by service: semicolon-separated groups of "
+                             "comma-separated services, one shard each; every other service "
+                             f"runs in one more shard (default: \"{';'.join(DEFAULT_SERVICE_GROUPS)}\")")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip accounts the checkpoint journal (scan-journal.jsonl in the "
+                             "output directory) says completed within --fresh-hours")
+    parser.add_argument('--fresh-hours', type=float, default=DEFAULT_FRESH_HOURS,
+                        help=f"With --resume: how recent a completed scan must be to be "
+                             f"skipped (default: {DEFAULT_FRESH_HOURS})")
+    parser.add_argument('--discovery-ttl', type=float, default=DEFAULT_DISCOVERY_TTL,
+                        help=f"Reuse account IDs, organization accounts and regions looked up "
+                             f"by a run in the last this many seconds (default: "
+                             f"{DEFAULT_DISCOVERY_TTL}, 0 = always look them up)")
+    parser.add_argument('--aggregate', action='store_true',
+                        help="Aggregate each account as soon as its scan finishes and keep "
+                             "the dashboard updated with partial results (see scan_pipeline.py)")
+    parser.add_argument('--publish-interval', type=float, default=DEFAULT_PUBLISH_INTERVAL,
+                        help=f"With --aggregate: shortest time between partial snapshots in "
+                             f"seconds (default: {DEFAULT_PUBLISH_INTERVAL})")
+    args = parser.parse_args()
+
+    if not (args.profiles or args.accounts or args.org):
+        parser.error("You must specify one of: --profiles, --accounts (with --role-arn), or --org")
+    if args.accounts and not args.role_arn:
+        parser.error("--accounts requires --role-arn to be specified")
+    service = 's3' if args.quick else args.service
+    if args.shard_by == 'service' and service:
+        parser.error("--shard-by service splits the full scan; it cannot be combined "
+                     "with --service or --quick")
+    if args.regions and args.shard_by != 'region':
+        parser.error("--regions only applies to --shard-by region")
+
+    # Check if Prowler is installed
+    prowler = shutil.which('prowler')
+    if prowler is None:
+        print("[ERROR] Prowler is not installed. Install with: pip install prowler", file=sys.stderr)
+        sys.exit(1)
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    discovery = AccountDiscovery(output_dir / DISCOVERY_CACHE_NAME, args.discovery_ttl)
+
+    # Work out the accounts to scan, based on approach
+    if args.profiles:
+        profiles = [p.strip() for p in args.profiles.split(',') if p.strip()]
+        # Looked up side by side; a profile whose account cannot be found
+        # is reported as failed when its turn to scan comes
+        with ThreadPoolExecutor(max_workers=max(1, min(args.workers, len(profiles)))) as executor:
+            account_ids = list(executor.map(discovery.account_id, profiles))
+        targets = [ScanTarget(a, profile=p) for a, p in zip(account_ids, profiles)]
+        print(f"[INFO] Scanning {len(targets)} account(s) using AWS profiles")
+    elif args.accounts:
+        targets = [ScanTarget(a.strip(), role_arn=args.role_arn)
+                   for a in args.accounts.split(',') if a.strip()]
+        print(f"[INFO] Scanning {len(targets)} account(s) using assume role")
+    else:
+        print("[INFO] Discovering accounts from AWS Organizations...")
+        accounts = discovery.organization_accounts()
+        if not accounts:
+            print("[ERROR] Could not list accounts from AWS Organizations", file=sys.stderr)
+            print("[ERROR] Ensure you have organizations:ListAccounts permission", file=sys.stderr)
+            sys.exit(1)
+        print(f"[INFO] Found {len(accounts)} active account(s)")
+        if args.role_arn:
+            targets = [ScanTarget(a, role_arn=args.role_arn) for a in accounts]
+        else:
+            # Without a role only the account of the current credentials can be scanned
+            current_account = discovery.account_id()
+            targets = [ScanTarget(a) for a in accounts if a == current_account]
+            for account_id in accounts:
+                if account_id != current_account:
+                    print(f"[WARNING] Skipping account {account_id} "
+                          f"(no role specified for cross-account access)")
+
+    shards = None
+    if args.shard_by == 'region':
+        if args.regions:
+            regions = [r.strip() for r in args.regions.split(',') if r.strip()]
+        else:
+            # Looked up once, with the first target's credentials
+            regions = discovery.regions(targets[0].profile if targets else None)
+            if not regions:
+                print("[ERROR] Could not list regions; pass them with --regions", file=sys.stderr)
+                sys.exit(1)
+        shards = region_shards(regions)
+    elif args.shard_by == 'service':
+        shards = service_shards(args.service_groups.split(';'))
+    if shards:
+        print(f"[INFO] Each account is scanned in {len(shards)} shards: "
+              f"{', '.join(shard.name for shard in shards)}")
+
+    if discovery.hits or discovery.lookups:
+        print(f"[INFO] Account discovery: {discovery.hits} cached, "
+              f"{discovery.lookups} looked up")
+
+    journal = ScanJournal(output_dir / JOURNAL_NAME)
+    journal.compact()
+    # Accounts in this run, including those a resumed run skips
+    total_accounts = len(targets)
+    done: Dict[str, Dict] = {}
+    if args.resume:
+        targets, done = resume_targets(targets, journal, args.fresh_hours)
+        for label, entry in done.items():
+            print(f"[INFO] Skipping {label}: completed at {entry['time']}")
+        print(f"[INFO] Resuming: {len(done)} account(s) already done, {len(targets)} to scan")
+        if not targets:
+            print("[INFO] Nothing left to scan")
+            return
+
+    workers = min(args.workers, len(targets)) or 1
+    print(f"[INFO] {workers} worker(s), timeout per account: "
+          f"{f'{args.timeout:.0f}s' if args.timeout else 'none'}")
+    print()
+
+    running = None
+    on_result: Optional[Callable[[ScanResult], None]] = None
+    if args.aggregate:
+        aggregator = FindingsAggregator(
+            prowler_dir=str(output_dir),
+            scoutsuite_dir=str(project_root / "scoutsuite-report"),
+            output_dir=str(project_root / "scan-results" / "aggregated")
+        )
+        running = RunningAggregation(aggregator, expected_accounts=total_accounts,
+                                     publish_interval=args.publish_interval)
+
+        def aggregate_result(result: ScanResult):
+            if result.status == 'completed':
+                running.add(result.output_files)
+
+        on_result = aggregate_result
+
+    try:
+        if running is not None:
+            # Accounts finished before a resume are in the snapshots (and
+            # their progress count) from the start
+            for entry in done.values():
+                running.add([output_dir / f for f in entry['output_files']])
+
+        start = time.monotonic()
+        results = scan_accounts(targets, output_dir, workers, prowler, service, args.timeout,
+                                shards=shards, on_result=on_result, journal=journal)
+        wall_time = time.monotonic() - start
+        if running is not None:
+            running.finish()
+            print(f"[INFO] Findings aggregated {time.monotonic() - start - wall_time:.1f}s "
+                  f"after the last scan finished")
+    finally:
+        # Interrupted or crashed before the full export: the dashboard goes
+        # back to the previous run instead of a partial one "in progress"
+        if running is not None:
+            running.abort()
+
+    completed = [r for r in results if r.status == 'completed']
+    print()
+    print("=" * 60)
+    print("  SCAN COMPLETE")
+    print("=" * 60)
+    print(f"[INFO] {len(completed)}/{len(results)} account(s) scanned")
+    for r in results:
+        if r.status != 'completed':
+            print(f"[WARNING] {r.account_id or r.target.label}: {r.status} - {r.message}")
+    print(f"[INFO] {speedup_report(results, wall_time)}")
+    print(f"[INFO] Output directory: {output_dir}")
+    if len(completed) < len(results):
+        print(f"[INFO] Run again with --resume to scan only the accounts not done yet "
+              f"(journal: {journal.path})")
+    print()
+    print("[INFO] Next steps:")
+    if running is None:
+        print("  1. Aggregate findings:")
+        print(f"     python {project_root / 'scripts' / 'scanning' / 'aggregate_findings.py'}")
+        print("  2. Launch dashboard:")
+    else:
+        print("  Findings are aggregated. Launch dashboard:")
+    print(f"     python {project_root / 'dashboard' / 'app.py'}")
+
+    if len(completed) < len(results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
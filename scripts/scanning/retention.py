@@ -0,0 +1,237 @@
+"""
+Retention for scan-results/aggregated: the `latest` pointer and compaction
+
+Used by aggregate_findings.py: every export updates the pointer, and
+`aggregate_findings.py compact` runs the compaction job.
+
+WHY?
+----
+Each aggregation run adds a JSON, CSV, Parquet and summary file (and a
+scan in findings.db), and nothing was ever deleted. The dashboard also
+used to find the newest export by listing the directory and checking the
+creation time of every file in it, so every request got slower as the
+history grew.
+
+HOW IT WORKS:
+-------------
+1. latest.json names the files of the newest run:
+
+       {"scan": "20240108_120000",
+        "findings": ["aggregated_findings_20240108_120000.parquet",
+                     "aggregated_findings_20240108_120000.json"],
+        "summary": "findings_summary_20240108_120000.json",
+        "store_scan": 42}
+
+   `findings` is in order of preference (the dashboard takes the first
+   one it can read); store_scan is the run's id in findings.db, if it was
+   stored there. The dashboard reads this one small file instead of
+   listing the directory.
+
+2. compact() keeps the newest `keep_runs` runs as they are. Older runs are
+   rolled into compressed monthly history segments (see scan_history.py)
+   and their files, and their scans in findings.db, are deleted.
+
+3. History older than `history_days` (counts, fingerprints and segments)
+   is deleted too, so the directory stays bounded.
+"""
+
+import json
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+try:
+    from .atomic_files import atomic_write
+    from .compression import ZSTD_AVAILABLE
+    from .findings_store import STORE_AVAILABLE, STORE_FILENAME, FindingsStore
+    from .scan_diff import read_export
+    from .scan_history import HISTORY_DIRNAME, ScanHistory
+except ImportError:
+    # Running as a script: python scripts/scanning/aggregate_findings.py compact
+    from atomic_files import atomic_write
+    from compression import ZSTD_AVAILABLE
+    from findings_store import STORE_AVAILABLE, STORE_FILENAME, FindingsStore
+    from scan_diff import read_export
+    from scan_history import HISTORY_DIRNAME, ScanHistory
+
+# Pointer to the newest run, inside the aggregated output directory
+LATEST_POINTER = "latest.json"
+
+# Default retention policy
+DEFAULT_KEEP_RUNS = 10
+DEFAULT_HISTORY_DAYS = 365
+
+# Export formats compaction can read back (Parquet needs pyarrow)
+_READABLE_FORMATS = {'json', 'ndjson', 'ndjson.gz'} | ({'ndjson.zst'} if ZSTD_AVAILABLE else set())
+
+# The files an aggregation run writes: <prefix>_<YYYYMMDD_HHMMSS>.<ext>
+_RUN_FILE = re.compile(
+    r'^(?:aggregated_findings|remediations|findings_summary)_(\d{8}_\d{6})'
+    r'\.(?:json|ndjson|ndjson\.gz|ndjson\.zst|csv|parquet)$'
+)
+
+
+def write_latest_pointer(output_dir: Path, scan: str, findings_files: List[Path],
+                         summary_file: Path, store_scan: Optional[int] = None):
+    """
+    Point latest.json at a run's files.
+
+    Call this after every file of the run has been written: the files
+    are complete by the time a reader can find them. The pointer itself
+    is written atomically (see atomic_files.py), so readers see either
+    the old pointer or the new one.
+
+    Files are named relative to output_dir, so a run written into a
+    subdirectory (the partial/ snapshots of scan_pipeline.py) keeps it.
+    """
+    pointer = {
+        'scan': scan,
+        'findings': [_pointer_name(output_dir, f) for f in findings_files],
+        'summary': _pointer_name(output_dir, summary_file),
+        'store_scan': store_scan,
+    }
+    with atomic_write(Path(output_dir) / LATEST_POINTER) as f:
+        json.dump(pointer, f, indent=2)
+
+
+def _pointer_name(output_dir: Path, path: Path) -> str:
+    try:
+        return Path(path).relative_to(output_dir).as_posix()
+    except ValueError:
+        return Path(path).name
+
+
+def read_latest_pointer(output_dir: Path) -> Optional[Dict]:
+    path = Path(output_dir) / LATEST_POINTER
+    if not path.exists():
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def run_files(output_dir: Path) -> Dict[str, List[Path]]:
+    """The files of each run in the output directory, by scan timestamp (oldest first)."""
+    runs: Dict[str, List[Path]] = {}
+    for path in Path(output_dir).iterdir():
+        match = _RUN_FILE.match(path.name)
+        if match:
+            runs.setdefault(match.group(1), []).append(path)
+    return dict(sorted(runs.items()))
+
+
+class CompactionReport(NamedTuple):
+    compacted: List[str]       # runs rolled into history segments
+    kept: List[str]            # runs left as they were
+    store_scans_removed: int
+    history_files_removed: int
+    bytes_before: int
+    bytes_after: int
+
+
+def _directory_size(directory: Path) -> int:
+    return sum(f.stat().st_size for f in Path(directory).rglob('*') if f.is_file())
+
+
+def _unreadable(files: List[Path]) -> bool:
+    """Whether a run's findings are only in formats compaction cannot read."""
+    formats = {f.name.split('.', 1)[1] for f in files if f.name.startswith('aggregated_findings_')}
+    return bool(formats) and not formats & _READABLE_FORMATS
+
+
+def _load_run(files: List[Path]):
+    """(summary, remediations, findings) of a run, from whichever of its files exist."""
+    by_name = {f.name: f for f in files}
+    scan = _RUN_FILE.match(files[0].name).group(1)
+
+    summary = {}
+    summary_file = by_name.get(f"findings_summary_{scan}.json")
+    if summary_file:
+        with open(summary_file, 'r') as f:
+            summary = json.load(f)
+
+    remediations = {}
+    findings: List[Dict] = []
+    json_file = by_name.get(f"aggregated_findings_{scan}.json")
+    ndjson_file = next((
+        by_name[name] for name in (f"aggregated_findings_{scan}.ndjson{suffix}"
+                                   for suffix in ('', '.gz', '.zst'))
+        if name in by_name
+    ), None)
+    if json_file:
+        with open(json_file, 'r') as f:
+            data = json.load(f)
+        # Older exports are a plain list of findings
+        if isinstance(data, list):
+            findings = data
+        else:
+            findings = data.get('findings', [])
+            remediations = data.get('remediations', {})
+    elif ndjson_file:
+        findings = list(read_export(ndjson_file))
+        remediations_file = by_name.get(f"remediations_{scan}.json")
+        if remediations_file:
+            with open(remediations_file, 'r') as f:
+                remediations = json.load(f)
+    return summary, remediations, findings
+
+
+def compact(output_dir: Path, keep_runs: int = DEFAULT_KEEP_RUNS,
+            history_days: int = DEFAULT_HISTORY_DAYS,
+            now: Optional[datetime] = None) -> CompactionReport:
+    """
+    Apply the retention policy to an aggregated output directory.
+
+    Args:
+        output_dir: Aggregated output directory
+        keep_runs: Newest runs kept as full exports (at least 1; the run
+                   latest.json points at is always kept)
+        history_days: History older than this many days is deleted
+                      (0 keeps it forever)
+        now: Reference time for history_days (default: now)
+    """
+    output_dir = Path(output_dir)
+    bytes_before = _directory_size(output_dir)
+
+    runs = run_files(output_dir)
+    scans = list(runs)
+    keep = set(scans[-max(keep_runs, 1):])
+    pointer = read_latest_pointer(output_dir)
+    if pointer:
+        keep.add(pointer['scan'])
+    # A run only exported to Parquet (or zstd without zstandard) cannot be
+    # read back here: leave it alone rather than lose it
+    old = [
+        scan for scan in scans
+        if scan not in keep and not _unreadable(runs[scan])
+    ]
+
+    history = ScanHistory(output_dir / HISTORY_DIRNAME)
+    # A generator: each old run is loaded only when its turn comes
+    history.add_to_segments(
+        (scan, *_load_run(runs[scan])) for scan in old
+    )
+    for scan in old:
+        for path in runs[scan]:
+            path.unlink()
+
+    store_scans_removed = 0
+    db_file = output_dir / STORE_FILENAME
+    if old and STORE_AVAILABLE and db_file.exists():
+        store = FindingsStore(db_file)
+        store_scans_removed = store.delete_scans(old)
+        store.engine.dispose()
+
+    history_files_removed = 0
+    if history_days > 0:
+        cutoff = (now or datetime.now()) - timedelta(days=history_days)
+        history_files_removed = history.prune(cutoff.strftime("%Y%m%d_%H%M%S"))
+
+    return CompactionReport(
+        compacted=old,
+        kept=[scan for scan in scans if scan in keep],
+        store_scans_removed=store_scans_removed,
+        history_files_removed=history_files_removed,
+        bytes_before=bytes_before,
+        bytes_after=_directory_size(output_dir),
+    )
@@ -0,0 +1,216 @@
+"""
+Compare two aggregation runs: new, resolved and unchanged findings
+
+Used by `aggregate_findings.py diff` and by the dashboard's /api/diff,
+so both resolve runs (exports, or history segments after compaction) and
+compare them the same way.
+
+HOW IT WORKS:
+-------------
+Every finding has a fingerprint (see finding_fingerprint in finding.py):
+a hash of source, check id, resource and account. It stays the same from
+one scan to the next as long as the same check keeps failing on the same
+resource, even if the severity, title or timestamp change.
+
+So comparing two scans is two set lookups per finding:
+
+    new        in the newer scan, fingerprint not in the older one
+    resolved   in the older scan, fingerprint not in the newer one
+    unchanged  in the newer scan, fingerprint also in the older one
+
+Building the two fingerprint sets and checking each finding against the
+other scan's set is linear in the size of the two scans; nothing is
+compared pairwise.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    from .compression import open_text, strip_compression
+    from .finding import finding_fingerprint
+    from .scan_history import HISTORY_DIRNAME, ScanHistory
+except ImportError:
+    # Running as a script: python scripts/scanning/aggregate_findings.py diff
+    from compression import open_text, strip_compression
+    from finding import finding_fingerprint
+    from scan_history import HISTORY_DIRNAME, ScanHistory
+
+# Export files a scan can be read from, in order of preference
+EXPORT_PATTERNS = ("aggregated_findings_{}.ndjson", "aggregated_findings_{}.ndjson.gz",
+                   "aggregated_findings_{}.ndjson.zst", "aggregated_findings_{}.json")
+
+_EXPORT_NAME = re.compile(r'^aggregated_findings_(\d{8}_\d{6})\.(?:json|ndjson(?:\.gz|\.zst)?)$')
+
+
+class ScanDiff(NamedTuple):
+    """Findings of two scans, split by whether they changed"""
+    new: List[Dict]
+    resolved: List[Dict]
+    unchanged: List[Dict]
+
+    def counts(self) -> Dict[str, int]:
+        return {'new': len(self.new), 'resolved': len(self.resolved),
+                'unchanged': len(self.unchanged)}
+
+
+def fingerprint_of(finding: Dict) -> str:
+    """A finding's fingerprint (computed for exports made before they existed)."""
+    return finding.get('fingerprint') or finding_fingerprint(
+        finding.get('source'), finding.get('finding_id'),
+        finding.get('resource_arn') or finding.get('resource'), finding.get('account_id')
+    )
+
+
+def diff_findings(base: Iterable[Dict], head: Iterable[Dict]) -> ScanDiff:
+    """
+    Compare an older scan (base) with a newer one (head).
+
+    head is only iterated once, so it can be a stream (e.g. NDJSON lines).
+    """
+    base = list(base)
+    base_fingerprints = {fingerprint_of(finding) for finding in base}
+
+    head_fingerprints = set()
+    new, unchanged = [], []
+    for finding in head:
+        fingerprint = fingerprint_of(finding)
+        head_fingerprints.add(fingerprint)
+        if fingerprint in base_fingerprints:
+            unchanged.append(finding)
+        else:
+            new.append(finding)
+
+    resolved = [f for f in base if fingerprint_of(f) not in head_fingerprints]
+    return ScanDiff(new, resolved, unchanged)
+
+
+def read_export(path: Path) -> Iterator[Dict]:
+    """
+    The findings of a JSON or NDJSON export (NDJSON is read line by line,
+    and decompressed as it is read if it is .ndjson.gz / .ndjson.zst).
+    """
+    path = Path(path)
+    with open_text(path) as f:
+        if strip_compression(path.name).endswith('.ndjson'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        data = json.load(f)
+    # Older exports are a plain list of findings
+    yield from data if isinstance(data, list) else data.get('findings', [])
+
+
+def list_scans(output_dir: Path) -> List[str]:
+    """Timestamps of the exports in an output directory, oldest first."""
+    return sorted({
+        match.group(1)
+        for match in (_EXPORT_NAME.match(p.name) for p in Path(output_dir).iterdir())
+        if match
+    })
+
+
+def find_export(output_dir: Path, scan: str) -> Path:
+    """
+    The export file of a scan, given its timestamp (YYYYMMDD_HHMMSS) or a path.
+
+    Raises:
+        FileNotFoundError: if there is no such export
+    """
+    if Path(scan).is_file():
+        return Path(scan)
+    for pattern in EXPORT_PATTERNS:
+        path = Path(output_dir) / pattern.format(scan)
+        if path.exists():
+            return path
+    raise FileNotFoundError(f"No export found for scan {scan} in {output_dir}")
+
+
+def load_scan(output_dir: Path, scan: str) -> Tuple[str, Iterable[Dict]]:
+    """
+    A scan's findings, from its export or, for runs the compaction job has
+    rolled into the history, from its history segment.
+
+    Returns:
+        (where the findings come from, findings)
+
+    Raises:
+        FileNotFoundError: if the scan is in neither
+    """
+    try:
+        path = find_export(output_dir, scan)
+        return path.name, read_export(path)
+    except FileNotFoundError:
+        history = ScanHistory(Path(output_dir) / HISTORY_DIRNAME)
+        run = history.read_segment_run(scan)
+        if run is None:
+            raise
+        return f"{scan} ({history.segment_file(scan).name})", run[1]
+
+
+def scan_file(output_dir: Path, scan: str) -> Path:
+    """
+    The file a scan is read from: its export, or the history segment it
+    was compacted into.
+
+    Raises:
+        FileNotFoundError: if there is neither
+    """
+    try:
+        return find_export(output_dir, scan)
+    except FileNotFoundError:
+        segment = ScanHistory(Path(output_dir) / HISTORY_DIRNAME).segment_file(scan)
+        if not segment.exists():
+            raise
+        return segment
+
+
+def resolve_scans(output_dir: Path, base: Optional[str] = None,
+                  head: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Fill in the default scans of a diff (see diff_scans).
+
+    Raises:
+        FileNotFoundError: if there is no scan at all, or none before head
+    """
+    scans = list_scans(output_dir)
+    # Older runs may only be left in the history (see retention.py)
+    history = ScanHistory(Path(output_dir) / HISTORY_DIRNAME)
+    scans = sorted(set(scans) | set(history.scan_ids()))
+    if head is None:
+        if not scans:
+            raise FileNotFoundError(f"No exports found in {output_dir}")
+        head = scans[-1]
+    if base is None:
+        # head may be an export path: compare by its timestamp
+        match = _EXPORT_NAME.match(Path(head).name)
+        head_timestamp = match.group(1) if match else head
+        earlier = [scan for scan in scans if scan < head_timestamp]
+        if not earlier:
+            raise FileNotFoundError(f"No export older than {head} in {output_dir}")
+        base = earlier[-1]
+    return base, head
+
+
+def diff_scans(output_dir: Path, base: Optional[str] = None,
+               head: Optional[str] = None) -> Tuple[str, str, ScanDiff]:
+    """
+    Compare two scans of an output directory.
+
+    Args:
+        output_dir: Aggregated output directory
+        base: Older scan (timestamp or export path); default: the scan
+              before head
+        head: Newer scan; default: the latest scan
+
+    Returns:
+        (base source, head source, ScanDiff), where a source is the export
+        file name or the history segment the scan was read from
+    """
+    base, head = resolve_scans(output_dir, base, head)
+    base_source, base_findings = load_scan(output_dir, base)
+    head_source, head_findings = load_scan(output_dir, head)
+    return base_source, head_source, diff_findings(base_findings, head_findings)
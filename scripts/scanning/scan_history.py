@@ -0,0 +1,230 @@
+"""
+History of aggregation runs: compact per-scan counts and fingerprints
+
+Used by aggregate_findings.py, which records every export here, and read
+by the dashboard's /api/trends endpoint (see dashboard/trends.py).
+
+WHY A SEPARATE HISTORY?
+-----------------------
+Each aggregated_findings_*.json is a full snapshot of one run. Charting a
+year of daily scans from those would mean reading a year of raw files.
+The history keeps only what a trend chart (or a scan-to-scan comparison)
+needs, so it stays small however many findings each run had.
+
+HOW IT WORKS:
+-------------
+Everything lives in scan-results/aggregated/history/:
+
+    scans.jsonl                 one line per run, oldest first:
+                                {"scan": "20240101_120000",
+                                 "time": "2024-01-01T12:00:00",
+                                 "total": 506,
+                                 "by_severity": {...}, "by_account": {...},
+                                 "by_cloud_provider": {...}, "by_check": {...}}
+    fingerprints_<scan>.bin     the run's finding fingerprints (see
+                                finding_fingerprint), sorted, as unsigned
+                                64-bit little-endian integers: 8 bytes
+                                per finding
+    segments/segment_<YYYYMM>.ndjson.gz
+                                full findings of the runs of one month that
+                                were rolled out of the aggregated directory
+                                by the compaction job (see retention.py),
+                                gzip-compressed. Each run is one header line
+                                {"scan", "summary", "remediations", "count"}
+                                followed by its `count` findings, one per line.
+
+A run's fingerprints file is written before its line is appended to
+scans.jsonl, so a reader never sees a scan without its fingerprints.
+Fingerprints files and segments are written atomically (see
+atomic_files.py), so they are never seen half-written either.
+"""
+
+import gzip
+import json
+import sys
+from array import array
+from datetime import datetime
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from .atomic_files import atomic_write
+except ImportError:
+    # Running as a script: python scripts/scanning/aggregate_findings.py
+    from atomic_files import atomic_write
+
+# Default directory name, inside the aggregated output directory
+HISTORY_DIRNAME = "history"
+
+# Sub-directory of the history with the compacted runs
+SEGMENTS_DIRNAME = "segments"
+
+# The summary breakdowns kept for each scan
+HISTORY_BREAKDOWNS = ('by_severity', 'by_account', 'by_cloud_provider', 'by_check')
+
+
+class ScanHistory:
+    """Append-only record of aggregation runs"""
+
+    def __init__(self, directory: Path):
+        """
+        Args:
+            directory: History directory (created if missing)
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.scans_file = self.directory / "scans.jsonl"
+        self.segments_dir = self.directory / SEGMENTS_DIRNAME
+
+    def fingerprints_file(self, scan: str) -> Path:
+        return self.directory / f"fingerprints_{scan}.bin"
+
+    def record(self, scan: str, summary: Dict, fingerprints: Iterable[int]) -> Dict:
+        """
+        Add one run to the history.
+
+        Args:
+            scan: The run's timestamp, as used in the export file names
+                  (YYYYMMDD_HHMMSS)
+            summary: The run's summary (see SummaryCounter)
+            fingerprints: Fingerprint of each finding in the run
+
+        Returns:
+            The scans.jsonl entry written for the run
+        """
+        values = array('Q', sorted(set(fingerprints)))
+        if sys.byteorder == 'big':
+            values.byteswap()
+        with atomic_write(self.fingerprints_file(scan), 'wb') as f:
+            values.tofile(f)
+
+        entry = {
+            'scan': scan,
+            'time': datetime.strptime(scan, "%Y%m%d_%H%M%S").isoformat(),
+            'total': summary.get('total_findings', 0),
+        }
+        for name in HISTORY_BREAKDOWNS:
+            entry[name] = summary.get(name, {})
+
+        # One write() per line, so a crash cannot leave half an entry
+        # followed by the next scan's line
+        with open(self.scans_file, 'a') as f:
+            f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        return entry
+
+    def scans(self) -> Iterator[Dict]:
+        """The scans.jsonl entries, oldest first."""
+        if not self.scans_file.exists():
+            return
+        with open(self.scans_file, 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def fingerprints(self, scan: str) -> Optional[array]:
+        """A run's sorted fingerprints, or None if the run is not in the history."""
+        path = self.fingerprints_file(scan)
+        if not path.exists():
+            return None
+        values = array('Q')
+        with open(path, 'rb') as f:
+            values.frombytes(f.read())
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values
+
+    def scan_ids(self) -> List[str]:
+        return [entry['scan'] for entry in self.scans()]
+
+    def segment_file(self, scan: str) -> Path:
+        """The segment a run belongs to (one per month of scan timestamps)."""
+        return self.segments_dir / f"segment_{scan[:6]}.ndjson.gz"
+
+    def add_to_segments(self, runs: Iterable[Tuple[str, Dict, Dict, Iterable[Dict]]]) -> List[str]:
+        """
+        Store the full findings of some runs in their monthly segments.
+
+        Args:
+            runs: (scan, summary, remediations, findings) for each run, in
+                  scan order. Runs are written one at a time, so this can
+                  be a generator that loads each run when it is reached.
+
+        Returns:
+            The scans added (runs already in their segment are skipped, so
+            an interrupted compaction can simply be run again)
+        """
+        added = []
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+
+        for path, month in groupby(runs, key=lambda run: self.segment_file(run[0])):
+            # The segment is replaced once the whole month is written
+            with atomic_write(path, 'wb') as raw, gzip.open(raw, 'wt') as out:
+                present = set()
+                # Copy the runs already in the segment first
+                if path.exists():
+                    for header, old_findings in self.iter_segment(path):
+                        present.add(header['scan'])
+                        self._write_run(out, header, old_findings)
+
+                for scan, summary, remediations, findings in month:
+                    if scan in present:
+                        continue
+                    findings = list(findings)
+                    header = {'scan': scan, 'summary': summary,
+                              'remediations': remediations, 'count': len(findings)}
+                    self._write_run(out, header, findings)
+                    present.add(scan)
+                    added.append(scan)
+        return added
+
+    @staticmethod
+    def _write_run(out, header: Dict, findings: Iterable[Dict]):
+        out.write(json.dumps(header, separators=(',', ':')) + '\n')
+        for finding in findings:
+            out.write(json.dumps(finding, separators=(',', ':')) + '\n')
+
+    def iter_segment(self, path: Path) -> Iterator[Tuple[Dict, List[Dict]]]:
+        """(header, findings) of each run in a segment file."""
+        with gzip.open(path, 'rt') as f:
+            for line in f:
+                header = json.loads(line)
+                findings = [json.loads(next(f)) for _ in range(header['count'])]
+                yield header, findings
+
+    def read_segment_run(self, scan: str) -> Optional[Tuple[Dict, List[Dict]]]:
+        """A compacted run's (header, findings), or None if it is not in a segment."""
+        path = self.segment_file(scan)
+        if not path.exists():
+            return None
+        for header, findings in self.iter_segment(path):
+            if header['scan'] == scan:
+                return header, findings
+        return None
+
+    def prune(self, before: str) -> int:
+        """
+        Forget runs older than a scan timestamp: their scans.jsonl lines,
+        fingerprints and segments (a segment goes once its whole month is
+        older).
+
+        Returns:
+            Number of files deleted
+        """
+        deleted = 0
+        for path in self.directory.glob("fingerprints_*.bin"):
+            if path.stem[len('fingerprints_'):] < before:
+                path.unlink()
+                deleted += 1
+        if self.segments_dir.exists():
+            for path in self.segments_dir.glob("segment_*.ndjson.gz"):
+                if path.name[len('segment_'):len('segment_') + 6] < before[:6]:
+                    path.unlink()
+                    deleted += 1
+
+        kept = [entry for entry in self.scans() if entry['scan'] >= before]
+        if self.scans_file.exists():
+            with atomic_write(self.scans_file) as f:
+                for entry in kept:
+                    f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        return deleted
@@ -0,0 +1,127 @@
+"""
+Checkpoint journal of a multi-account scan
+
+Used by multi_account_scan.py, which records every account it scans here,
+so a run that died part way (expired credentials, out of memory, a
+preempted runner) can be restarted with --resume and only scan the
+accounts that are not done yet.
+
+HOW IT WORKS:
+-------------
+The journal is output/scan-journal.jsonl, one line per event:
+
+    {"target": "111111111111", "status": "started",
+     "time": "2024-01-01T12:00:00"}
+    {"target": "111111111111", "status": "completed",
+     "time": "2024-01-01T12:41:07", "account_id": "111111111111",
+     "output_files": ["111111111111/prowler-output-...json"],
+     "duration": 2467.3}
+
+"target" is the account ID, or "profile <name>" for a profile whose
+account ID could not be looked up (see ScanTarget.label); "status" is started, completed, failed or timeout.
+Each line is flushed and fsync()ed as it is written, so after a crash
+the journal still has every account that finished before it. A line cut
+short by the crash is ignored.
+
+Only the newest line of each target counts. At the start of every run
+the journal is rewritten (atomically, see atomic_files.py) with just
+those lines, so it does not grow from run to run.
+
+With --resume an account is skipped if its newest line says it completed
+within the freshness window (--fresh-hours) and its output files are
+still there.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    from .atomic_files import atomic_write
+except ImportError:
+    # Running as a script: python scripts/scanning/multi_account_scan.py
+    from atomic_files import atomic_write
+
+# Default file name, inside the Prowler output directory
+JOURNAL_NAME = "scan-journal.jsonl"
+
+# How recent a completed scan must be for --resume to skip it (hours)
+DEFAULT_FRESH_HOURS = 24
+
+
+class ScanJournal:
+    """Append-only record of each account's scans (thread-safe)"""
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: Journal file (created on the first record, with its
+                  directory if missing)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Newest entry of each target
+        self.entries: Dict[str, Dict] = self._read()
+
+    def _read(self) -> Dict[str, Dict]:
+        entries = {}
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # The last line of a run that crashed while writing it
+                        continue
+                    entries[entry['target']] = entry
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def compact(self):
+        """
+        Rewrite the journal with only the newest entry of each target (and
+        without a line cut short by a crash, which the next entry would
+        otherwise be appended to).
+        """
+        with self._lock:
+            if not self.entries and not self.path.exists():
+                return
+            with atomic_write(self.path) as f:
+                for entry in self.entries.values():
+                    f.write(json.dumps(entry) + "\n")
+
+    def record(self, target: str, status: str, **fields) -> Dict:
+        """Append an entry for a target and make it durable before returning."""
+        entry = {
+            'target': target,
+            'status': status,
+            'time': datetime.now().isoformat(timespec='seconds'),
+            **fields,
+        }
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.entries[target] = entry
+        return entry
+
+    def completed_since(self, target: str, since: datetime) -> Optional[Dict]:
+        """
+        The target's newest entry if it is a scan completed at or after
+        `since` whose output files still exist, else None.
+        """
+        entry = self.entries.get(target)
+        if entry is None or entry['status'] != 'completed':
+            return None
+        if datetime.fromisoformat(entry['time']) < since:
+            return None
+        output_files = entry.get('output_files') or []
+        if not output_files or not all((self.path.parent / f).exists() for f in output_files):
+            return None
+        return entry
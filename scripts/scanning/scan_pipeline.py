@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Pipelined Aggregation: aggregate each account as soon as its scan lands
+
+Normally aggregation starts once every account has been scanned, so the
+dashboard shows nothing new until the slowest account is done, and the
+normalization of all accounts is added on top of the whole scan time.
+
+In pipelined mode each account's Prowler output is normalized the moment
+its scan finishes, while the other accounts are still being scanned, and
+a running snapshot of everything aggregated so far is published for the
+dashboard. The run ends roughly when the last account's scan does, plus
+the time to normalize that one account.
+
+HOW IT WORKS:
+-------------
+1. A scan is finished when its account directory's latest.json is
+   written (see write_prowler_pointer). ProwlerWatcher notices new or
+   changed pointers with one stat() per account directory per poll.
+   (multi_account_scan.py --aggregate skips the polling: it hands each
+   account over as its scan completes.)
+2. RunningAggregation normalizes that account's output (all of its
+   files, for a scan sharded by region or service) with the usual
+   FindingsAggregator normalizers (and input cache) and keeps its
+   findings and summary counts.
+3. At most every publish interval the findings so far are written to
+   scan-results/aggregated/partial/ (NDJSON, remediations and a summary
+   with an "in_progress" section) and latest.json is pointed at them, so
+   the dashboard picks them up like any other run. Partial snapshots are
+   not added to the history or the SQLite store.
+4. When the scan is over, the full export (JSON, CSV, Parquet, store,
+   history) is written from the findings already in memory - nothing is
+   normalized twice - and the partial snapshot is removed.
+5. If the run ends without a full export (a crash, a second Ctrl+C),
+   latest.json is put back to the run it named before the first partial
+   snapshot, so the dashboard does not show "in progress" forever.
+
+USAGE EXAMPLES:
+---------------
+Watch output/ while run_multi_account_scan.sh runs elsewhere, until 200
+accounts have landed (or Ctrl+C):
+    python scripts/scanning/scan_pipeline.py --expect 200
+
+Or let the scanner feed the aggregator directly:
+    python scripts/scanning/multi_account_scan.py --org --role-arn "..." --aggregate
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .aggregate_findings import (
+        PROWLER_POINTER, FindingsAggregator, SummaryCounter, write_ndjson,
+    )
+    from .atomic_files import atomic_write
+    from .finding import Finding
+    from .retention import LATEST_POINTER, read_latest_pointer, write_latest_pointer
+except ImportError:
+    # Running as a script: python scripts/scanning/scan_pipeline.py
+    from aggregate_findings import PROWLER_POINTER, FindingsAggregator, SummaryCounter, write_ndjson
+    from atomic_files import atomic_write
+    from finding import Finding
+    from retention import LATEST_POINTER, read_latest_pointer, write_latest_pointer
+
+# Where partial snapshots are written, inside the aggregated output
+# directory (a subdirectory, so diff and compaction never see them as runs)
+PARTIAL_DIRNAME = "partial"
+
+# Shortest time between two partial snapshots (seconds). Each one rewrites
+# every finding aggregated so far (see RunningAggregation.publish), so with
+# many accounts finishing close together they are batched.
+DEFAULT_PUBLISH_INTERVAL = 30
+
+# How often the watcher looks for finished scans (seconds)
+DEFAULT_POLL_INTERVAL = 5
+
+
+class ProwlerWatcher:
+    """
+    Finds the account directories whose scan finished since the last poll.
+
+    Scans that had already finished when the watcher was created are not
+    reported: only results that land while it is watching.
+    """
+
+    def __init__(self, prowler_dir: Path):
+        self.prowler_dir = Path(prowler_dir)
+        self._seen = self._pointers()
+
+    def _pointers(self) -> Dict[Path, int]:
+        """latest.json mtime of every account directory that has one."""
+        pointers = {}
+        if not self.prowler_dir.exists():
+            return pointers
+        for directory in self.prowler_dir.iterdir():
+            if directory.is_dir() and directory.name.isdigit():
+                try:
+                    pointers[directory] = (directory / PROWLER_POINTER).stat().st_mtime_ns
+                except FileNotFoundError:
+                    pass
+        return pointers
+
+    def poll(self) -> List[Path]:
+        """Account directories with a new or updated latest.json, in name order."""
+        current = self._pointers()
+        landed = sorted(d for d, mtime in current.items() if self._seen.get(d) != mtime)
+        self._seen = current
+        return landed
+
+
+class RunningAggregation:
+    """Findings of the accounts aggregated so far, published as partial snapshots"""
+
+    def __init__(self, aggregator: FindingsAggregator, expected_accounts: Optional[int] = None,
+                 publish_interval: float = DEFAULT_PUBLISH_INTERVAL):
+        """
+        Args:
+            aggregator: Normalizes the Prowler output and writes the exports
+            expected_accounts: Accounts in this scan (shown in the snapshot's
+                               progress; None if not known)
+            publish_interval: Shortest time between partial snapshots (seconds)
+        """
+        self.aggregator = aggregator
+        self.expected_accounts = expected_accounts
+        self.publish_interval = publish_interval
+        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.partial_dir = aggregator.output_dir / PARTIAL_DIRNAME
+
+        # Account directory -> (Prowler files, their findings, their summary counts)
+        self._accounts: Dict[Path, Tuple[List[Path], List[Finding], SummaryCounter]] = {}
+        self._published_at: Optional[float] = None
+        self._unpublished = False
+        # What latest.json named before the first partial snapshot (put
+        # back by abort()), and whether the run ended with its full export
+        self._previous_pointer: Optional[Dict] = None
+        self._finished = False
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+    def add(self, files: List[Path]):
+        """
+        Normalize one account's Prowler output (one file per shard), then
+        publish a partial snapshot if the last one is more than
+        publish_interval old.
+        """
+        self._normalize([Path(f) for f in files])
+        self._unpublished = True
+        self.publish()
+
+    def _normalize(self, files: List[Path]):
+        aggregator = self.aggregator
+        # load_prowler_files merges the files' counts into summary_counter
+        aggregator.summary_counter = SummaryCounter()
+        findings = [f for shard in aggregator.load_prowler_files(files) for f in shard]
+        self._accounts[files[0].parent] = (files, findings, aggregator.summary_counter)
+
+    def _findings(self, directories: List[Path]) -> Tuple[List[Finding], SummaryCounter]:
+        findings, counter = [], SummaryCounter()
+        for directory in directories:
+            _, account_findings, account_counter = self._accounts[directory]
+            findings.extend(account_findings)
+            counter.merge(account_counter)
+        return findings, counter
+
+    def publish(self, force: bool = False) -> bool:
+        """
+        Write a partial snapshot of the accounts aggregated so far and point
+        latest.json at it. Skipped (False) if nothing changed since the
+        last one, or it is less than publish_interval old (unless force).
+
+        COST: a snapshot is one NDJSON file of every finding aggregated so
+        far, so each one is larger than the last and a run writes about
+        (total findings x snapshots / 2) findings in all. The dashboard
+        reads a run from a single findings file, which is why snapshots
+        are not split per account. publish_interval caps the number of
+        snapshots by the run's duration rather than its number of
+        accounts (a 4-hour scan at the default 30s writes at most 480);
+        for very large organizations raise it (--publish-interval, on
+        both multi_account_scan.py and scan_pipeline.py) to write fewer,
+        later snapshots.
+        """
+        if not self._unpublished:
+            return False
+        now = time.monotonic()
+        if not force and self._published_at is not None \
+                and now - self._published_at < self.publish_interval:
+            return False
+
+        findings, counter = self._findings(sorted(self._accounts))
+        if self._published_at is None:
+            self._previous_pointer = read_latest_pointer(self.aggregator.output_dir)
+        self.partial_dir.mkdir(exist_ok=True)
+
+        ndjson_file = self.partial_dir / f"aggregated_findings_{self.timestamp}.ndjson"
+        with atomic_write(ndjson_file) as f:
+            write_ndjson(f, (finding.to_dict() for finding in findings))
+
+        remediations_file = self.partial_dir / f"remediations_{self.timestamp}.json"
+        with atomic_write(remediations_file) as f:
+            json.dump(self.aggregator.remediations_for(findings), f, indent=2)
+
+        summary = counter.summary()
+        summary['in_progress'] = {
+            'accounts_aggregated': len(self._accounts),
+            'accounts_expected': self.expected_accounts,
+            'started_at': datetime.strptime(self.timestamp, "%Y%m%d_%H%M%S").isoformat(),
+        }
+        summary_file = self.partial_dir / f"findings_summary_{self.timestamp}.json"
+        with atomic_write(summary_file) as f:
+            json.dump(summary, f, indent=2)
+
+        write_latest_pointer(self.aggregator.output_dir, self.timestamp, [ndjson_file], summary_file)
+        print(f"Partial snapshot: {len(self._accounts)} account(s), {len(findings)} findings")
+
+        self._published_at = now
+        self._unpublished = False
+        return True
+
+    def finish(self):
+        """
+        Write the full export of the scan and remove the partial snapshot.
+
+        Every account's newest output is included, like a normal run;
+        accounts aggregated while the scan ran are not read again.
+        """
+        aggregator = self.aggregator
+        print("\n" + "="*50)
+        print("Aggregating Security Findings (pipelined)")
+        print("="*50 + "\n")
+
+        accounts: Dict[Path, List[Path]] = {}
+        for path in aggregator.prowler_files():
+            accounts.setdefault(path.parent, []).append(path)
+        for directory, files in accounts.items():
+            done = self._accounts.get(directory)
+            if done is None or done[0] != files:
+                self._normalize(files)
+        findings, counter = self._findings(list(accounts))
+        print(f"Loaded {len(findings)} Prowler findings (failures only)")
+
+        aggregator.summary_counter = counter
+        aggregator.findings = findings + aggregator.load_scoutsuite_findings()
+        if aggregator.cache:
+            aggregator.cache.save()
+            print(f"Input cache: {aggregator.cache.hits} reused, {aggregator.cache.misses} parsed")
+        print(f"\nTotal findings aggregated: {len(aggregator.findings)}")
+
+        aggregator.export_results()
+        self._finished = True
+        self._remove_partial()
+
+    def abort(self):
+        """
+        Withdraw the partial snapshot of a run that ended without finish()
+        (a crash, an interrupted export): latest.json is put back to what
+        it named before the first snapshot (or removed if there was no
+        pointer), so the dashboard does not show this run as in progress
+        forever. Does nothing after finish().
+        """
+        if self._finished or self._published_at is None:
+            return
+        self._finished = True
+        output_dir = self.aggregator.output_dir
+        pointer = read_latest_pointer(output_dir)
+        # Leave the pointer alone if something newer has replaced ours since
+        if pointer is not None and pointer.get('scan') == self.timestamp \
+                and pointer.get('summary', '').startswith(f"{PARTIAL_DIRNAME}/"):
+            if self._previous_pointer is None:
+                (output_dir / LATEST_POINTER).unlink()
+            else:
+                with atomic_write(output_dir / LATEST_POINTER) as f:
+                    json.dump(self._previous_pointer, f, indent=2)
+            print("Partial snapshot withdrawn: latest.json names the previous run again")
+        self._remove_partial()
+
+    def _remove_partial(self):
+        for path in self.partial_dir.glob(f"*_{self.timestamp}.*"):
+            path.unlink()
+        try:
+            self.partial_dir.rmdir()
+        except OSError:
+            # Not empty: another pipelined run is still using it
+            pass
+
+
+def watch(aggregator: FindingsAggregator, expected_accounts: Optional[int] = None,
+          poll_interval: float = DEFAULT_POLL_INTERVAL,
+          publish_interval: float = DEFAULT_PUBLISH_INTERVAL,
+          idle_timeout: Optional[float] = None) -> RunningAggregation:
+    """
+    Aggregate accounts as their scans land in aggregator.prowler_dir, then
+    write the full export.
+
+    Watching stops once expected_accounts have landed, after idle_timeout
+    seconds without a new one (once at least one has landed), or on
+    Ctrl+C.
+    """
+    watcher = ProwlerWatcher(aggregator.prowler_dir)
+    running = RunningAggregation(aggregator, expected_accounts, publish_interval)
+    print(f"Watching {aggregator.prowler_dir} for finished scans (Ctrl+C to stop)...")
+
+    last_landed = time.monotonic()
+    try:
+        try:
+            while expected_accounts is None or len(running) < expected_accounts:
+                for directory in watcher.poll():
+                    files = aggregator.latest_prowler_files(directory)
+                    if files:
+                        running.add(files)
+                        last_landed = time.monotonic()
+                running.publish()
+                if idle_timeout and len(running) and time.monotonic() - last_landed >= idle_timeout:
+                    print(f"No new scans for {idle_timeout:.0f}s, finishing")
+                    break
+                if expected_accounts is None or len(running) < expected_accounts:
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            print("\nStopped watching")
+
+        running.finish()
+    finally:
+        # Crashed before the full export was written: no "in progress" forever
+        running.abort()
+    return running
+
+
+def main():
+    """Watch output/ and aggregate each account as its scan lands."""
+    parser = argparse.ArgumentParser(
+        description="Aggregate each account's Prowler output as soon as its scan finishes"
+    )
+    parser.add_argument('--expect', type=int,
+                        help="Stop watching once this many accounts have landed")
+    parser.add_argument('--idle-timeout', type=float,
+                        help="Stop watching after this many seconds without a new account")
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"Seconds between checks for finished scans "
+                             f"(default: {DEFAULT_POLL_INTERVAL})")
+    parser.add_argument('--publish-interval', type=float, default=DEFAULT_PUBLISH_INTERVAL,
+                        help=f"Shortest time between partial snapshots in seconds "
+                             f"(default: {DEFAULT_PUBLISH_INTERVAL})")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Re-parse every input file instead of reusing unchanged results")
+    args = parser.parse_args()
+
+    # Same layout as aggregate_findings.py
+    project_root = Path(__file__).parent.absolute().parent.parent
+    aggregator = FindingsAggregator(
+        prowler_dir=str(project_root / "output"),
+        scoutsuite_dir=str(project_root / "scoutsuite-report"),
+        output_dir=str(project_root / "scan-results" / "aggregated"),
+        use_cache=not args.no_cache
+    )
+    watch(aggregator, args.expect, args.poll_interval, args.publish_interval, args.idle_timeout)
+
+    print("\nAggregation complete!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,595 @@
+"""
+Unit tests for the dashboard Flask application
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import dashboard.app as dashboard_app
+from dashboard.findings_index import FindingsIndex, InvalidQuery
+from dashboard.ndjson_findings import NdjsonFindings
+from dashboard.parquet_findings import ParquetFindings
+from scripts.scanning.aggregate_findings import FindingsAggregator
+from scripts.scanning.retention import compact, write_latest_pointer
+from scripts.scanning.scan_history import ScanHistory
+
+
+class TestDashboard:
+    """Test suite for dashboard routes"""
+
+    @pytest.fixture
+    def findings_dir(self, tmp_path, monkeypatch):
+        """Point the dashboard at an empty aggregated-results directory"""
+        findings_dir = tmp_path / "aggregated"
+        findings_dir.mkdir()
+        monkeypatch.setattr(dashboard_app, 'FINDINGS_DIR', findings_dir)
+        monkeypatch.setattr(dashboard_app, '_snapshot', None)
+        return findings_dir
+
+    @pytest.fixture
+    def client(self, findings_dir):
+        """Flask test client"""
+        dashboard_app.app.config['TESTING'] = True
+        return dashboard_app.app.test_client()
+
+    @pytest.fixture
+    def exported(self, tmp_path, findings_dir):
+        """Run the aggregator on three failing resources of one check"""
+        prowler_dir = tmp_path / "prowler"
+        prowler_dir.mkdir()
+        check = {
+            'CheckID': 's3_bucket_default_encryption',
+            'CheckTitle': 'Check if S3 buckets have default encryption',
+            'Severity': 'medium',
+            'Status': 'FAIL',
+            'AccountId': '111111111111',
+            'Region': 'us-east-1',
+            'Remediation': {
+                'Recommendation': {'Text': 'Enable default encryption on the bucket.'},
+                'Code': {'CLI': 'aws s3api put-bucket-encryption --bucket <BUCKET>'},
+            },
+        }
+        (prowler_dir / "prowler-output-111111111111.json").write_text(json.dumps([
+            dict(check, ResourceId=f"bucket-{i}") for i in range(3)
+        ]))
+
+        aggregator = FindingsAggregator(
+            prowler_dir=str(prowler_dir),
+            scoutsuite_dir=str(tmp_path / "scoutsuite"),
+            output_dir=str(findings_dir)
+        )
+        aggregator.aggregate_findings()
+        aggregator.export_results()
+        return aggregator
+
+    def test_index_without_findings(self, client):
+        """The dashboard renders before any aggregation has run"""
+        response = client.get('/')
+
+        assert response.status_code == 200
+        assert b'No findings yet' in response.data
+
+    def test_index_counts_come_from_summary(self, client, exported, monkeypatch):
+        """The home page reads its numbers from the summary, not the findings"""
+        snapshot = dashboard_app.get_snapshot()
+
+        class NoScan(list):
+            def __iter__(self):
+                raise AssertionError("index() iterated over the findings")
+
+        monkeypatch.setattr(dashboard_app, 'get_snapshot',
+                            lambda: snapshot._replace(findings=NoScan(snapshot.findings)))
+        page = client.get('/').get_data(as_text=True)
+
+        assert '<h2 class="mb-0">3</h2>' in page  # total and Medium cards
+        assert page.count('bucket-') == 3
+
+    def test_findings_page_renders_summary_rows(self, client, exported):
+        """The list only has summary rows; details are loaded per finding"""
+        response = client.get('/findings')
+        page = response.get_data(as_text=True)
+
+        assert response.status_code == 200
+        assert page.count('class="accordion-item finding-item"') == 3
+        assert 'put-bucket-encryption' not in page
+        assert page.count('data-detail-url="/findings/') == 3
+
+    def test_finding_detail(self, client, exported):
+        """The detail fragment renders the finding's shared remediation"""
+        response = client.get('/findings/1/detail')
+        fragment = response.get_data(as_text=True)
+
+        assert response.status_code == 200
+        assert 'bucket-1' in fragment
+        assert fragment.count('put-bucket-encryption --bucket') == 2  # copy button + code block
+        assert client.get('/findings/3/detail').status_code == 404
+
+    def test_finding_detail_stale_version(self, client, exported):
+        """A page rendered from an older snapshot is told to reload"""
+        assert client.get('/findings/0/detail?v=outdated').status_code == 410
+
+    def test_findings_page_pagination_and_filters(self, client, exported, monkeypatch):
+        """Filters and page numbers are applied on the server"""
+        monkeypatch.setattr(dashboard_app, 'FINDINGS_PER_PAGE', 2)
+
+        first = client.get('/findings?severity=Medium').get_data(as_text=True)
+        second = client.get('/findings?severity=Medium&page=2').get_data(as_text=True)
+        assert first.count('class="accordion-item finding-item"') == 2
+        assert 'Page 1 of 2' in first
+        assert 'page=2&amp;severity=Medium' in first
+        assert second.count('class="accordion-item finding-item"') == 1
+
+        empty = client.get('/findings?severity=Critical').get_data(as_text=True)
+        assert 'No Matching Findings' in empty
+
+    def test_findings_page_legacy_export(self, client, findings_dir):
+        """Older exports with inline remediation still render"""
+        legacy = [{
+            'source': 'Prowler', 'cloud_provider': 'AWS', 'finding_id': 'legacy_check',
+            'title': 'Legacy', 'severity': 'High', 'resource': 'bucket', 'issue': 'issue',
+            'account_id': '', 'remediation': {
+                'summary': 'Fix it', 'doc_url': '',
+                'options': [{'type': 'cli', 'label': 'AWS CLI', 'code': 'aws legacy-fix'}],
+            },
+        }]
+        (findings_dir / "aggregated_findings_20240101_000000.json").write_text(json.dumps(legacy))
+
+        assert 'Legacy' in client.get('/findings').get_data(as_text=True)
+        assert 'aws legacy-fix' in client.get('/findings/0/detail').get_data(as_text=True)
+
+    def test_ndjson_export_served_lazily(self, client, tmp_path, findings_dir, exported):
+        """NDJSON exports are read from disk and give the same answers"""
+        from_json = client.get('/api/findings').get_json()
+        page = client.get('/api/findings?sort=-resource&limit=2').get_json()
+
+        prowler_dir = tmp_path / "prowler"
+        aggregator = FindingsAggregator(
+            prowler_dir=str(prowler_dir),
+            scoutsuite_dir=str(tmp_path / "scoutsuite"),
+            output_dir=str(findings_dir)
+        )
+        aggregator.export_ndjson()
+        for path in findings_dir.glob("aggregated_findings_*.json"):
+            path.unlink()
+
+        snapshot = dashboard_app.get_snapshot()
+        assert isinstance(snapshot.findings, NdjsonFindings)
+
+        assert client.get('/api/findings').get_json() == from_json
+        assert client.get('/api/findings?sort=-resource&limit=2').get_json()['findings'] == \
+            page['findings']
+        assert 'put-bucket-encryption' in client.get('/findings/0/detail').get_data(as_text=True)
+
+    def test_api_export_sends_precompressed_bytes(self, client, tmp_path, findings_dir, exported):
+        """A gzip NDJSON export is sent as stored, with Content-Encoding"""
+        from_json = client.get('/api/findings').get_json()
+        aggregator = FindingsAggregator(
+            prowler_dir=str(tmp_path / "prowler"),
+            scoutsuite_dir=str(tmp_path / "scoutsuite"),
+            output_dir=str(findings_dir)
+        )
+        aggregator.export_ndjson('gzip')
+        export = next(findings_dir.glob("aggregated_findings_*.ndjson.gz"))
+
+        response = client.get('/api/export', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.mimetype == 'application/x-ndjson'
+        assert response.data == export.read_bytes()
+        assert 'Accept-Encoding' in response.headers['Vary']
+
+        gzip_etag = response.headers['ETag']
+
+        # Clients that cannot decode gzip get plain lines
+        response = client.get('/api/export', headers={'Accept-Encoding': 'identity'})
+        assert 'Content-Encoding' not in response.headers
+        assert response.headers['ETag'] != gzip_etag
+        assert client.get('/api/export', headers={
+            'Accept-Encoding': 'gzip', 'If-None-Match': gzip_etag}).status_code == 304
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line) for line in lines] == from_json
+        assert client.get('/api/findings').get_json() == from_json
+
+    def test_parquet_export_loads_columns_on_demand(self, client, findings_dir, exported):
+        """Parquet snapshots read only the columns a request touches"""
+        pytest.importorskip("pyarrow")
+        (findings_dir / "findings.db").unlink(missing_ok=True)
+        snapshot = dashboard_app.get_snapshot()
+        assert isinstance(snapshot.findings, ParquetFindings)
+
+        # Nothing is read until a request needs it
+        assert snapshot.findings.loaded_columns == []
+
+        client.get('/findings')
+        loaded = snapshot.findings.loaded_columns
+        for column in ('issue', 'risk', 'resource', 'resource_arn', 'description', 'compliance'):
+            assert column not in loaded
+
+        # A search builds the text index, which reads the text columns
+        client.get('/findings?q=bucket')
+        assert 'issue' in snapshot.findings.loaded_columns
+
+        from_parquet = client.get('/api/findings').get_json()
+        remediations = client.get('/api/remediations').get_json()
+        detail = client.get('/findings/0/detail').get_data(as_text=True)
+
+        # Same answers as the JSON export of the same run
+        for path in findings_dir.glob("*.parquet"):
+            path.unlink()
+        assert isinstance(dashboard_app.get_snapshot().findings, list)
+        assert from_parquet == client.get('/api/findings').get_json()
+        assert remediations == client.get('/api/remediations').get_json()
+        assert detail == client.get('/findings/0/detail').get_data(as_text=True)
+
+    @pytest.mark.parametrize("url", [
+        '/api/findings',
+        '/api/findings?limit=2',
+        '/api/findings?sort=-severity&limit=2',
+        '/api/findings?sort=resource&severity=Medium,High&limit=1&facets=severity,provider',
+        '/api/findings?q=buck+enc&facets=account',
+        '/api/findings?q=nothing',
+        '/api/remediations',
+        '/api/summary',
+        '/findings/2/detail',
+    ])
+    def test_store_answers_match_export_files(self, client, findings_dir, exported, url):
+        """Queries answered by the SQLite store equal those over the export files"""
+        pytest.importorskip("sqlalchemy")
+        assert dashboard_app.get_snapshot().key[0] == 'store'
+        from_store = client.get(url).get_data(as_text=True)
+
+        (findings_dir / "findings.db").unlink()
+        assert dashboard_app.get_snapshot().key[0] != 'store'
+        from_files = client.get(url).get_data(as_text=True)
+
+        # Cursors name their snapshot; everything else must be identical
+        from_store, from_files = (json.loads(text) if url.startswith('/api') else text
+                                  for text in (from_store, from_files))
+        if isinstance(from_store, dict) and 'next_cursor' in from_store:
+            assert (from_store.pop('next_cursor') is None) == (from_files.pop('next_cursor') is None)
+        assert from_store == from_files
+
+    def test_store_cursor_walk(self, client, exported):
+        """Keyset cursors from the store visit every finding once"""
+        pytest.importorskip("sqlalchemy")
+        assert dashboard_app.get_snapshot().key[0] == 'store'
+
+        for sort in ('', 'resource', '-resource', '-severity'):
+            seen, cursor = [], ''
+            while True:
+                body = client.get(f"/api/findings?sort={sort}&limit=1&fields=resource"
+                                  f"&cursor={cursor}").get_json()
+                seen.extend(f['resource'] for f in body['findings'])
+                cursor = body['next_cursor']
+                if cursor is None:
+                    break
+            assert sorted(seen) == ['bucket-0', 'bucket-1', 'bucket-2']
+            assert len(seen) == 3
+
+    def test_api_remediations(self, client, exported):
+        """Findings reference entries of /api/remediations"""
+        findings = client.get('/api/findings').get_json()
+        remediations = client.get('/api/remediations').get_json()
+
+        assert len(findings) == 3
+        assert set(remediations) == {f['remediation_id'] for f in findings}
+
+    def test_snapshot_reused_until_new_export(self, findings_dir, exported):
+        """Findings are parsed once and re-parsed only when a newer export lands"""
+        first = dashboard_app.get_snapshot()
+        assert dashboard_app.get_snapshot() is first
+        assert len(first.findings) == 3
+
+        newer = findings_dir / "aggregated_findings_29990101_000000.json"
+        newer.write_text(json.dumps({'remediations': {}, 'findings': []}))
+        os.utime(newer, ns=(2**62, 2**62))
+        # latest.json decides, not the newest file on disk
+        assert dashboard_app.get_snapshot() is first
+
+        write_latest_pointer(findings_dir, '29990101_000000', [newer],
+                             findings_dir / "findings_summary_29990101_000000.json")
+        second = dashboard_app.get_snapshot()
+        assert second is not first
+        assert second.findings == []
+        assert dashboard_app.get_snapshot() is second
+
+    def test_index_shows_partial_results(self, client, findings_dir):
+        """A pipelined scan's partial snapshot is shown with its progress"""
+        partial_dir = findings_dir / "partial"
+        partial_dir.mkdir()
+        findings_file = partial_dir / "aggregated_findings_20240101_120000.ndjson"
+        findings_file.write_text(json.dumps({
+            'title': 'Open bucket', 'severity': 'High', 'resource': 'bucket',
+            'cloud_provider': 'AWS'}) + "\n")
+        summary_file = partial_dir / "findings_summary_20240101_120000.json"
+        summary_file.write_text(json.dumps({
+            'total_findings': 1, 'by_severity': {'High': 1},
+            'in_progress': {'accounts_aggregated': 3, 'accounts_expected': 200},
+        }))
+        write_latest_pointer(findings_dir, '20240101_120000', [findings_file], summary_file)
+
+        response = client.get('/')
+        assert response.status_code == 200
+        assert b'Scan in progress' in response.data
+        assert b'of 200' in response.data
+
+    def test_snapshot_without_pointer(self, findings_dir, exported):
+        """Results written before latest.json existed are found by file name"""
+        (findings_dir / "latest.json").unlink()
+        newer = findings_dir / "aggregated_findings_29990101_000000.json"
+        newer.write_text(json.dumps({'remediations': {}, 'findings': []}))
+        os.utime(newer, ns=(2**62, 2**62))
+
+        assert dashboard_app.get_snapshot().findings == []
+
+    def test_api_conditional_requests(self, client, findings_dir, exported):
+        """Unchanged data is answered with an empty 304 until the next run"""
+        response = client.get('/api/summary')
+        etag = response.headers['ETag']
+        assert response.status_code == 200
+        assert response.headers['Last-Modified']
+        assert 'public' in response.headers['Cache-Control']
+
+        for url in ('/api/summary', '/api/findings', '/api/findings?severity=Medium'):
+            response = client.get(url, headers={'If-None-Match': etag})
+            assert response.status_code == 304
+            assert response.data == b''
+            assert response.headers['ETag'] == etag
+        # A proxy may weaken the ETag after compressing the body
+        assert client.get('/api/remediations',
+                          headers={'If-None-Match': f"W/{etag}"}).status_code == 304
+        response = client.get('/api/findings', headers={
+            'If-Modified-Since': client.get('/api/findings').headers['Last-Modified']})
+        assert response.status_code == 304
+
+        newer = findings_dir / "aggregated_findings_29990101_000000.json"
+        newer.write_text(json.dumps({'remediations': {}, 'findings': []}))
+        write_latest_pointer(findings_dir, '29990101_000000', [newer],
+                             findings_dir / "findings_summary_29990101_000000.json")
+        response = client.get('/api/findings', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.get_json() == []
+        assert response.headers['ETag'] != etag
+
+    def test_api_findings_page(self, client, exported):
+        """Query parameters switch /api/findings to filtered pages"""
+        response = client.get('/api/findings?severity=Medium&limit=2&fields=resource,severity')
+        body = response.get_json()
+
+        assert body['total'] == 3
+        assert body['findings'] == [
+            {'resource': 'bucket-0', 'severity': 'Medium'},
+            {'resource': 'bucket-1', 'severity': 'Medium'},
+        ]
+
+        response = client.get(f"/api/findings?severity=Medium&limit=2&fields=resource"
+                              f"&cursor={body['next_cursor']}")
+        body = response.get_json()
+        assert body['findings'] == [{'resource': 'bucket-2'}]
+        assert body['next_cursor'] is None
+
+    def test_api_findings_search_and_facets(self, client, exported):
+        """q searches the text index; facets adds per-value counts"""
+        body = client.get('/api/findings?q=buck+enc&facets=severity,account'
+                          '&fields=resource').get_data(as_text=True)
+        body = json.loads(body)
+
+        assert body['total'] == 3
+        assert body['facets'] == {'severity': {'Medium': 3}, 'account': {'111111111111': 3}}
+
+        body = client.get('/api/findings?q=bucket-2').get_json()
+        assert [f['resource'] for f in body['findings']] == ['bucket-2']
+
+    def test_api_findings_bad_query(self, client, exported):
+        """Unknown sort keys and malformed cursors are client errors"""
+        assert client.get('/api/findings?sort=nope').status_code == 400
+        assert client.get('/api/findings?cursor=garbage').status_code == 400
+        assert client.get('/api/findings?limit=ten').status_code == 400
+        assert client.get('/api/findings?facets=colour').status_code == 400
+
+    def test_api_trends_downsamples(self, client, findings_dir):
+        """A year of daily scans comes back as at most `points` points"""
+        history = ScanHistory(findings_dir / "history")
+        day = datetime(2024, 1, 1, 6, 0, 0)
+        for n in range(366):
+            scan = (day + timedelta(days=n)).strftime("%Y%m%d_%H%M%S")
+            history.record(scan, {'total_findings': n, 'by_severity': {'High': n}}, [n])
+
+        full = client.get('/api/trends').get_json()
+        assert full['scans'] == 366 and len(full['points']) == 100
+
+        weekly = client.get('/api/trends?from=2024-01-01&to=2024-12-31&points=52').get_json()
+        assert len(weekly['points']) == 52
+        assert sum(point['scans'] for point in weekly['points']) == 366
+        assert weekly['points'][-1]['counts'] == {'High': 365}
+
+        january = client.get('/api/trends?to=2024-01-31&agg=mean&points=1').get_json()
+        assert january['scans'] == 31
+        assert january['points'] == [{'time': '2024-01-31T06:00:00', 'scans': 31,
+                                      'total': 15.0, 'counts': {'High': 15.0}}]
+
+        assert client.get('/api/trends?by=colour').status_code == 400
+        assert client.get('/api/trends?from=yesterday').status_code == 400
+
+    def test_api_diff(self, client, findings_dir):
+        """/api/diff compares the latest export with the one before"""
+        def finding(resource, severity='High'):
+            return {'source': 'Prowler', 'finding_id': 'check', 'resource': resource,
+                    'resource_arn': '', 'account_id': '111111111111', 'severity': severity}
+
+        (findings_dir / "aggregated_findings_20240101_000000.json").write_text(json.dumps(
+            {'remediations': {}, 'findings': [finding('a'), finding('b')]}
+        ))
+        (findings_dir / "aggregated_findings_20240102_000000.json").write_text(json.dumps(
+            {'remediations': {}, 'findings': [finding('b', 'Low'), finding('c'), finding('d')]}
+        ))
+
+        diff = client.get('/api/diff?fields=resource,severity').get_json()
+        assert (diff['base'], diff['head']) == ('20240101_000000', '20240102_000000')
+        assert diff['counts'] == {'new': 2, 'resolved': 1, 'unchanged': 1}
+        assert diff['new'] == [{'resource': 'c', 'severity': 'High'},
+                               {'resource': 'd', 'severity': 'High'}]
+        assert diff['resolved'] == [{'resource': 'a', 'severity': 'High'}]
+        assert diff['unchanged'] == [{'resource': 'b', 'severity': 'Low'}]
+
+        limited = client.get('/api/diff?limit=1').get_json()
+        assert len(limited['new']) == 1 and limited['counts']['new'] == 2
+        assert client.get('/api/diff?base=20990101_000000').status_code == 404
+        assert client.get('/api/diff?head=20240101_000000').status_code == 404
+        assert client.get('/api/diff?base=/etc/passwd').status_code == 400
+
+        # A run compacted into the history can still be compared, like the CLI does
+        history = ScanHistory(findings_dir / "history")
+        for scan in ('20240101_000000', '20240102_000000'):
+            history.record(scan, {}, [])
+        compact(findings_dir, keep_runs=1, history_days=0)
+        assert not (findings_dir / "aggregated_findings_20240101_000000.json").exists()
+        compacted = client.get('/api/diff?fields=resource,severity').get_json()
+        assert compacted == diff
+
+    def test_api_trends_without_history(self, client):
+        assert client.get('/api/trends').get_json()['points'] == []
+
+
+class TestFindingsIndex:
+    """Test suite for the snapshot query indexes"""
+
+    @pytest.fixture
+    def index(self):
+        """Twelve findings across severities, accounts and regions"""
+        severities = ['Low', 'Critical', 'Medium', 'High']
+        findings = [
+            {
+                'severity': severities[i % 4],
+                'cloud_provider': 'AWS' if i < 8 else 'Azure',
+                'account_id': f"acct-{i % 3}",
+                'source': 'Prowler' if i < 8 else 'ScoutSuite',
+                'region': 'us-east-1' if i % 2 else 'eu-west-1',
+                'finding_id': f"check_{i % 5}",
+                'title': f"Title {i:02d}",
+                'resource': f"resource-{11 - i}",
+                'issue': 'Public bucket' if i == 7 else 'Other issue',
+            }
+            for i in range(12)
+        ]
+        return FindingsIndex(findings, version='v1')
+
+    def walk(self, index, limit, **query):
+        """Follow cursors until the last page; return all positions seen"""
+        seen, cursor = [], None
+        while True:
+            page, total, cursor = index.query(cursor=cursor, limit=limit, **query)
+            seen.extend(page)
+            if cursor is None:
+                return seen, total
+
+    def test_filters_and_or(self, index):
+        """Values of one filter are OR-ed, different filters AND-ed"""
+        page, total, _ = index.query({'severity': ['Critical', 'High'], 'provider': ['AWS']})
+
+        assert page == [1, 3, 5, 7]
+        assert total == 4
+
+    def test_text_search(self, index):
+        """Free text matches any of the searchable fields"""
+        page, total, _ = index.query({}, text='PUBLIC')
+
+        assert page == [7]
+
+    def test_text_search_prefix_and_all_words(self, index):
+        """Query words are prefixes and must all match"""
+        assert index.search('pub') == [7]
+        assert index.search('publ buck') == [7]
+        assert index.search('public nothing') == []
+        assert index.search('title 07') == [7]
+        assert index.search('  ') is None
+
+    def test_text_search_fields(self, index):
+        """Words from any indexed field are found, split on punctuation"""
+        index = FindingsIndex([
+            {'resource_arn': 'arn:aws:s3:::audit-logs', 'risk': 'Data exposure'},
+            {'resource_arn': 'arn:aws:s3:::web', 'finding_id': 's3_bucket_public_access'},
+        ])
+
+        assert index.search('audit') == [0]
+        assert index.search('exposure') == [0]
+        assert index.search('arn s3') == [0, 1]
+        assert index.search('public_access') == [1]
+
+    def test_facets(self, index):
+        """Facet counts ignore their own filter but apply the others"""
+        counts = index.facets({'severity': ['High'], 'provider': ['AWS']}, '',
+                              ['severity', 'provider'])
+
+        assert counts['severity'] == {'Low': 2, 'Critical': 2, 'Medium': 2, 'High': 2}
+        assert counts['provider'] == {'AWS': 2, 'Azure': 1}
+
+    def test_facets_unfiltered(self, index):
+        """Without filters the counts are the posting list sizes"""
+        assert index.facets({}, '', ['source']) == {'source': {'Prowler': 8, 'ScoutSuite': 4}}
+
+    def test_sort_severity_descending(self, index):
+        """Severity sorts by importance; '-' reverses"""
+        page, _, _ = index.query({}, sort='severity', limit=3)
+        assert [index.findings[p]['severity'] for p in page] == ['Critical'] * 3
+
+        page, _, _ = index.query({}, sort='-severity', limit=3)
+        assert [index.findings[p]['severity'] for p in page] == ['Low'] * 3
+
+    @pytest.mark.parametrize("query", [
+        {'filters': {}},
+        {'filters': {}, 'sort': 'resource'},
+        {'filters': {}, 'sort': '-title'},
+        {'filters': {'region': ['us-east-1']}},
+        {'filters': {'account': ['acct-0', 'acct-1']}, 'sort': '-severity'},
+    ])
+    def test_cursor_walk_visits_every_match_once(self, index, query):
+        """Paging with cursors returns each match exactly once, in order"""
+        everything, total, _ = index.query(limit=100, **query)
+        walked, _ = self.walk(index, limit=5, **query)
+
+        assert walked == everything
+        assert len(walked) == total
+
+    def test_stale_cursor_rejected(self, index):
+        """A cursor from another snapshot cannot be used"""
+        _, _, cursor = index.query({}, limit=2)
+        newer = FindingsIndex(index.findings, version='v2')
+
+        with pytest.raises(InvalidQuery):
+            newer.query({}, cursor=cursor, limit=2)
+
+    def test_offset_pages(self, index):
+        """offset skips matches, for numbered pages"""
+        everything, _, _ = index.query({'region': ['us-east-1']}, sort='title', limit=100)
+        page, total, _ = index.query({'region': ['us-east-1']}, sort='title', limit=2, offset=2)
+
+        assert page == everything[2:4]
+        assert total == len(everything)
+
+    def test_unknown_filter(self, index):
+        """Filtering on an unknown field is an error"""
+        with pytest.raises(InvalidQuery):
+            index.query({'colour': ['red']})
+
+
+class TestNdjsonFindings:
+    """Test suite for the lazy NDJSON findings view"""
+
+    def test_sequence_access(self, tmp_path):
+        """Indexing, slicing and iteration read the right lines"""
+        path = tmp_path / "findings.ndjson"
+        path.write_text('{"n": 0}\n{"n": 1}\n\n{"n": 2}\n')
+        findings = NdjsonFindings(path)
+
+        assert len(findings) == 3
+        assert findings[1] == {'n': 1}
+        assert findings[-1] == {'n': 2}
+        assert findings[0:2] == [{'n': 0}, {'n': 1}]
+        assert list(findings) == [{'n': 0}, {'n': 1}, {'n': 2}]
+        assert list(findings.iter_lines()) == [b'{"n": 0}', b'{"n": 1}', b'{"n": 2}']
+        with pytest.raises(IndexError):
+            findings[3]
+        findings.close()
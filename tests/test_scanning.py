@@ -2,10 +2,39 @@
 Unit tests for scanning aggregation functionality
 """
 
+import io
+import os
 import pytest
 import json
+import subprocess
+import sys
+import time
+from datetime import datetime
 from pathlib import Path
-from scripts.scanning.aggregate_findings import FindingsAggregator
+from scripts.scanning.aggregate_findings import (
+    FindingsAggregator,
+    SummaryCounter,
+    iter_json_array,
+    read_scoutsuite_results,
+    write_findings_document,
+    write_json_array,
+    write_ndjson,
+    write_prowler_pointer,
+)
+from scripts.scanning import aws_discovery
+from scripts.scanning.atomic_files import atomic_write
+from scripts.scanning.aws_discovery import AccountDiscovery
+from scripts.scanning.compression import COMPRESSION_SUFFIXES, compressed_writer, open_text
+from scripts.scanning.finding import FINDING_FIELDS, Finding
+from scripts.scanning.findings_store import FindingsStore
+from scripts.scanning.multi_account_scan import (
+    ScanTarget, region_shards, resume_targets, scan_accounts, service_shards, speedup_report,
+)
+from scripts.scanning.retention import compact, read_latest_pointer, write_latest_pointer
+from scripts.scanning.scan_diff import diff_scans, read_export
+from scripts.scanning.scan_pipeline import ProwlerWatcher, RunningAggregation
+from scripts.scanning.scan_history import ScanHistory
+from scripts.scanning.scan_journal import ScanJournal
 
 
 class TestFindingsAggregator:
@@ -26,20 +55,38 @@ class TestFindingsAggregator:
         }
     
     @pytest.fixture
-    def aggregator(self, tmp_path):
+    def make_aggregator(self, tmp_path):
+        """Build a new aggregator over the temporary directories (options passed through)"""
+        def make(**options):
+            return FindingsAggregator(
+                prowler_dir=str(tmp_path / "prowler"),
+                scoutsuite_dir=str(tmp_path / "scoutsuite"),
+                output_dir=str(tmp_path / "output"),
+                **options
+            )
+        return make
+
+    @pytest.fixture
+    def aggregator(self, tmp_path, make_aggregator):
         """Create aggregator instance with temporary directories"""
-        prowler_dir = tmp_path / "prowler"
-        scoutsuite_dir = tmp_path / "scoutsuite"
-        output_dir = tmp_path / "output"
-        
-        prowler_dir.mkdir()
-        scoutsuite_dir.mkdir()
-        
-        return FindingsAggregator(
-            prowler_dir=str(prowler_dir),
-            scoutsuite_dir=str(scoutsuite_dir),
-            output_dir=str(output_dir)
-        )
+        (tmp_path / "prowler").mkdir()
+        (tmp_path / "scoutsuite").mkdir()
+        return make_aggregator()
+
+    @pytest.fixture
+    def write_accounts(self, tmp_path, sample_prowler_finding):
+        """
+        Write one Prowler output file per account directory:
+        write_accounts({account_id: [fields overriding the sample, per check]})
+        """
+        def write(accounts):
+            for account_id, checks in accounts.items():
+                account_dir = tmp_path / "prowler" / account_id
+                account_dir.mkdir(parents=True, exist_ok=True)
+                (account_dir / f"prowler-output-{account_id}.json").write_text(json.dumps([
+                    dict(sample_prowler_finding, AccountId=account_id, **check) for check in checks
+                ]))
+        return write
     
     def test_normalize_prowler_finding(self, aggregator, sample_prowler_finding):
         """Test Prowler finding normalization"""
@@ -50,6 +97,20 @@ class TestFindingsAggregator:
         assert normalized['severity'] == 'Critical'
         assert normalized['finding_id'] == 'check_s3_bucket_public_access'
     
+    def test_fingerprint_ignores_volatile_fields(self, aggregator, sample_prowler_finding):
+        """The same check on the same resource and account matches across scans"""
+        finding = aggregator._normalize_prowler_finding(sample_prowler_finding)
+        rescanned = aggregator._normalize_prowler_finding(
+            dict(sample_prowler_finding, Severity='low', CheckTitle='Renamed check')
+        )
+        other_account = aggregator._normalize_prowler_finding(
+            dict(sample_prowler_finding, AccountId='999999999999')
+        )
+
+        assert finding.fingerprint == rescanned.fingerprint
+        assert finding.fingerprint != other_account.fingerprint
+        assert len(finding.fingerprint) == 16
+
     def test_severity_mapping(self, aggregator):
         """Test severity level mapping"""
         assert aggregator._map_severity('CRITICAL') == 'Critical'
@@ -76,6 +137,1017 @@ class TestFindingsAggregator:
         assert 'Critical' in summary['by_severity']
         assert summary['by_cloud_provider']['AWS'] == 1
 
+    def test_load_prowler_from_dir_keeps_only_failures(self, aggregator, sample_prowler_finding):
+        """Test that streamed Prowler files drop PASS rows"""
+        passed = dict(sample_prowler_finding, Status='PASS', CheckID='check_passed')
+        account_dir = aggregator.prowler_dir / "111111111111"
+        account_dir.mkdir()
+        prowler_file = account_dir / "prowler-output-111111111111-20240101.json"
+        prowler_file.write_text(json.dumps([passed, sample_prowler_finding, passed]))
+
+        findings = aggregator.load_prowler_findings()
+
+        assert len(findings) == 1
+        assert findings[0]['finding_id'] == 'check_s3_bucket_public_access'
+
+    def test_latest_prowler_file_follows_pointer(self, aggregator, sample_prowler_finding):
+        """latest.json decides; without it the newest scan time in the name wins"""
+        account_dir = aggregator.prowler_dir / "111111111111"
+        account_dir.mkdir()
+        older = account_dir / "prowler-output-111111111111-20240101000000.json"
+        newer = account_dir / "prowler-output-111111111111-20240201000000.json"
+        older.write_text(json.dumps([sample_prowler_finding]))
+        newer.write_text(json.dumps([sample_prowler_finding]))
+
+        assert aggregator.latest_prowler_files(account_dir) == [newer]
+
+        # A scan still writing its output: the pointer keeps naming the last complete one
+        write_prowler_pointer(account_dir, [older])
+        newer.write_text('[{"Status": "FA')
+        assert aggregator.latest_prowler_files(account_dir) == [older]
+        assert len(aggregator.load_prowler_findings()) == 1
+
+    def test_parallel_load_matches_serial(self, make_aggregator, write_accounts):
+        """Process-pool loading returns the same findings in the same order"""
+        write_accounts({
+            account_id: [{'ResourceId': f"bucket-{i}"} for i in range(3)]
+            for account_id in ['333333333333', '111111111111', '222222222222']
+        })
+
+        def load(workers):
+            return [
+                (f['account_id'], f['resource'])
+                for f in make_aggregator(workers=workers).load_prowler_findings()
+            ]
+
+        serial = load(1)
+        assert load(2) == serial
+        assert [account for account, _ in serial] == ['111111111111'] * 3 + \
+            ['222222222222'] * 3 + ['333333333333'] * 3
+
+    def test_input_cache_reuses_unchanged_files(self, make_aggregator, write_accounts):
+        """Only inputs that changed since the last run are parsed again"""
+        write_accounts({'111111111111': [{}], '222222222222': [{}]})
+
+        def run():
+            aggregator = make_aggregator()
+            aggregator.aggregate_findings()
+            return aggregator
+
+        first = run()
+        assert (first.cache.hits, first.cache.misses) == (0, 2)
+
+        second = run()
+        assert (second.cache.hits, second.cache.misses) == (2, 0)
+        assert [f['account_id'] for f in second.findings] == ['111111111111', '222222222222']
+
+        # Rescan one account: only that file is parsed again
+        write_accounts({'222222222222': [{'ResourceId': 'bucket-a'}, {'ResourceId': 'bucket-b'}]})
+        third = run()
+        assert (third.cache.hits, third.cache.misses) == (1, 1)
+        assert len(third.findings) == 3
+
+    def test_input_cache_ignores_other_format_versions(self, tmp_path, make_aggregator,
+                                                       write_accounts, monkeypatch):
+        """Entries of an older format, or a bumped version, are misses, not crashes"""
+        from scripts.scanning import aggregate_findings
+        write_accounts({'111111111111': [{}], '222222222222': [{}]})
+        make_aggregator().aggregate_findings()
+
+        # A pre-versioning entry (a bare list of findings) under the current name
+        cache_dir = tmp_path / "output" / ".cache"
+        for cache_file in cache_dir.glob("prowler-*"):
+            cache_file.write_text(json.dumps([{'account_id': '111111111111'}]))
+        stale = make_aggregator()
+        stale.aggregate_findings()
+        assert (stale.cache.hits, stale.cache.misses) == (0, 2)
+        assert len(stale.findings) == 2
+
+        monkeypatch.setattr(aggregate_findings, 'NORMALIZED_FORMAT_VERSION',
+                            aggregate_findings.NORMALIZED_FORMAT_VERSION + 1)
+        bumped = make_aggregator()
+        bumped.aggregate_findings()
+        assert (bumped.cache.hits, bumped.cache.misses) == (0, 2)
+        assert len(bumped.findings) == 2
+        # Entries of the previous version are cleaned up on save
+        version = aggregate_findings.NORMALIZED_FORMAT_VERSION
+        assert {f.name.split('-')[1] for f in cache_dir.glob("prowler-*")} == {f"v{version}"}
+
+    def test_iter_findings_streams_cache_hits(self, make_aggregator, write_accounts):
+        """A cached file is read back one finding at a time, same as a parse"""
+        write_accounts({'111111111111': [{'ResourceId': f"bucket-{i}"} for i in range(3)]})
+        parsed = make_aggregator()
+        parsed.aggregate_findings()
+
+        cached = make_aggregator()
+        stream = cached.iter_findings()
+        first = next(stream)
+        assert cached.cache.hits == 1
+        findings = [first] + list(stream)
+        assert [f.to_dict() for f in findings] == [f.to_dict() for f in parsed.findings]
+        summary = cached.summary_counter.summary()
+        assert summary == dict(parsed.summary_counter.summary(), timestamp=summary['timestamp'])
+
+    def test_running_summary_matches_recount(self, make_aggregator, write_accounts):
+        """Counts kept while loading (serial, parallel, cached) equal a recount"""
+        write_accounts({
+            account_id: [{'Severity': severity, 'ResourceId': f"bucket-{i}"}
+                         for i, severity in enumerate(severities)]
+            for account_id, severities in [('111111111111', ['critical', 'low']),
+                                           ('222222222222', ['critical', 'critical', 'high'])]
+        })
+
+        def summarize(workers):
+            aggregator = make_aggregator(workers=workers)
+            aggregator.aggregate_findings()
+            running = aggregator.generate_summary()
+            recount = SummaryCounter()
+            for finding in aggregator.findings:
+                recount.add(finding)
+            assert running == dict(recount.summary(), timestamp=running['timestamp'])
+            return running
+
+        first = summarize(1)
+        assert first['by_severity_account'] == {
+            'Critical': {'111111111111': 1, '222222222222': 2},
+            'Low': {'111111111111': 1},
+            'High': {'222222222222': 1},
+        }
+        assert first['by_severity_provider'] == {'Critical': {'AWS': 3}, 'Low': {'AWS': 1},
+                                                 'High': {'AWS': 1}}
+        # Second run comes from the cache, third uses worker processes
+        assert summarize(1)['by_severity_account'] == first['by_severity_account']
+        assert summarize(2)['total_findings'] == 5
+
+    def test_load_scoutsuite_findings(self, aggregator):
+        """Test ScoutSuite parsing, one finding per flagged item"""
+        results = {
+            'services': {
+                'storageaccounts': {
+                    'findings': {
+                        'storageaccount-https-only': {
+                            'description': 'Storage accounts allow HTTP traffic',
+                            'level': 'danger',
+                            'flagged_items': 2,
+                            'items': [
+                                'storageaccounts.subscriptions.abc.storage_accounts.acct1',
+                                'storageaccounts.subscriptions.abc.storage_accounts.acct2',
+                            ],
+                            'remediation': 'Run <code>az storage account update</code>',
+                        },
+                        'storageaccount-clean': {'flagged_items': 0, 'items': []},
+                    }
+                }
+            }
+        }
+        results_dir = aggregator.scoutsuite_dir / "scoutsuite-results"
+        results_dir.mkdir()
+        (results_dir / "scoutsuite_results_azure-tenant-1.js").write_text(
+            "scoutsuite_results =\n" + json.dumps(results)
+        )
+
+        findings = aggregator.load_scoutsuite_findings()
+
+        assert [f['resource'] for f in findings] == ['acct1', 'acct2']
+        assert all(f['severity'] == 'High' for f in findings)
+
+    def test_export_results_writes_dicts(self, aggregator, sample_prowler_finding):
+        """Finding records are exported as plain JSON objects"""
+        aggregator.findings = [
+            aggregator._normalize_prowler_finding(sample_prowler_finding)
+        ]
+
+        aggregator.export_results()
+
+        json_file = next(aggregator.output_dir.glob("aggregated_findings_*.json"))
+        exported = json.loads(json_file.read_text())
+        finding = exported['findings'][0]
+        assert list(finding.keys()) == list(FINDING_FIELDS)
+        assert finding['severity'] == 'Critical'
+        assert finding['remediation_id'] in exported['remediations']
+
+    def test_export_parquet_types(self, aggregator, sample_prowler_finding):
+        """Parquet export uses dictionary and list columns"""
+        pq = pytest.importorskip("pyarrow.parquet")
+        aggregator.findings = [
+            aggregator._normalize_prowler_finding(
+                dict(sample_prowler_finding, Compliance={'CIS-1.5': ['2.1.1']})
+            )
+        ]
+
+        aggregator.export_results()
+
+        table = pq.read_table(next(aggregator.output_dir.glob("aggregated_findings_*.parquet")))
+        assert table.column_names == list(FINDING_FIELDS)
+        assert str(table.schema.field('severity').type) == 'dictionary<values=string, indices=int32, ordered=0>'
+        assert table.column('compliance').to_pylist() == [['CIS-1.5']]
+
+        remediations = pq.read_table(next(aggregator.output_dir.glob("remediations_*.parquet")))
+        assert remediations.column('remediation_id').to_pylist() == \
+            [aggregator.findings[0].remediation_id]
+        assert str(remediations.schema.field('options').type).startswith('list<element: struct<')
+
+    def test_export_writes_store(self, aggregator, sample_prowler_finding):
+        """Each export adds a scan to the indexed SQLite store"""
+        pytest.importorskip("sqlalchemy")
+        import sqlite3
+
+        aggregator.findings = [
+            aggregator._normalize_prowler_finding(dict(sample_prowler_finding, ResourceId=f"b-{i}"))
+            for i in range(3)
+        ]
+        aggregator.export_results()
+        aggregator.export_results()
+
+        db = sqlite3.connect(aggregator.output_dir / "findings.db")
+        assert db.execute("SELECT count(*) FROM scans").fetchone() == (2,)
+        assert db.execute(
+            "SELECT position, resource, severity_rank FROM findings WHERE scan_id = 2 ORDER BY position"
+        ).fetchall() == [(0, 'b-0', 0), (1, 'b-1', 0), (2, 'b-2', 0)]
+        assert db.execute("SELECT count(*) FROM remediations WHERE scan_id = 2").fetchone() == (1,)
+        indexes = {name for (name,) in db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {'ix_findings_severity', 'ix_findings_account_id', 'ix_findings_cloud_provider',
+                'ix_findings_finding_id', 'ix_scans_scan_timestamp'} <= indexes
+        db.close()
+
+    def test_export_ndjson_streams_findings(self, aggregator, sample_prowler_finding):
+        """NDJSON export writes one finding per line plus the remediation table"""
+        account_dir = aggregator.prowler_dir / '111111111111'
+        account_dir.mkdir()
+        (account_dir / "prowler-output-111111111111.json").write_text(json.dumps([
+            dict(sample_prowler_finding, ResourceId=f"bucket-{i}") for i in range(3)
+        ] + [dict(sample_prowler_finding, Status='PASS')]))
+
+        aggregator.export_ndjson()
+
+        assert aggregator.findings == []
+        lines = next(aggregator.output_dir.glob("aggregated_findings_*.ndjson")).read_text().splitlines()
+        findings = [json.loads(line) for line in lines]
+        assert [f['resource'] for f in findings] == ['bucket-0', 'bucket-1', 'bucket-2']
+
+        remediations = json.loads(next(aggregator.output_dir.glob("remediations_*.json")).read_text())
+        assert set(remediations) == {f['remediation_id'] for f in findings}
+
+        summary = json.loads(next(aggregator.output_dir.glob("findings_summary_*.json")).read_text())
+        assert summary['total_findings'] == 3
+        assert summary['by_severity'] == {'Critical': 3}
+
+    @pytest.mark.parametrize('compression', ['gzip', 'zstd'])
+    def test_compressed_input_and_output(self, aggregator, sample_prowler_finding, compression):
+        """Compressed Prowler output is read as a stream; --compress writes compressed NDJSON"""
+        account_dir = aggregator.prowler_dir / '111111111111'
+        account_dir.mkdir()
+        name = f"prowler-output-111111111111-20240101000000.json{COMPRESSION_SUFFIXES[compression]}"
+        with open(account_dir / name, 'wb') as raw, compressed_writer(raw, compression) as f:
+            json.dump([dict(sample_prowler_finding, ResourceId=f"bucket-{i}") for i in range(3)], f)
+
+        aggregator.export_ndjson(compression)
+
+        export = next(aggregator.output_dir.glob("aggregated_findings_*.ndjson.*"))
+        assert export.name.endswith(COMPRESSION_SUFFIXES[compression])
+        with open_text(export) as f:
+            findings = [json.loads(line) for line in f]
+        assert [f['resource'] for f in findings] == ['bucket-0', 'bucket-1', 'bucket-2']
+        assert read_latest_pointer(aggregator.output_dir)['findings'] == [export.name]
+        assert [f['resource'] for f in read_export(export)] == ['bucket-0', 'bucket-1', 'bucket-2']
+
+    def test_export_records_history(self, aggregator, sample_prowler_finding):
+        """Each export adds its counts and fingerprints to the scan history"""
+        aggregator.findings = [
+            aggregator._normalize_prowler_finding(dict(sample_prowler_finding, ResourceId=f"b-{i}"))
+            for i in range(3)
+        ]
+        aggregator.export_results()
+
+        history = ScanHistory(aggregator.output_dir / "history")
+        (entry,) = history.scans()
+        assert entry['total'] == 3
+        assert entry['by_severity'] == {'Critical': 3}
+        assert entry['by_check'] == {'check_s3_bucket_public_access': 3}
+        fingerprints = history.fingerprints(entry['scan'])
+        assert list(fingerprints) == sorted(int(f.fingerprint, 16) for f in aggregator.findings)
+
+    def test_diff_scans(self, aggregator, sample_prowler_finding):
+        """Two runs split into new, resolved and unchanged by fingerprint"""
+        def findings(*resources):
+            return [
+                aggregator._normalize_prowler_finding(dict(sample_prowler_finding, ResourceId=r))
+                for r in resources
+            ]
+
+        out = aggregator.output_dir
+        # Older run: a legacy export (plain list, no fingerprints)
+        legacy = [f.to_dict() for f in findings('b-0', 'b-1', 'b-2')]
+        for finding in legacy:
+            del finding['fingerprint']
+        (out / "aggregated_findings_20240101_000000.json").write_text(json.dumps(legacy))
+        with open(out / "aggregated_findings_20240108_000000.ndjson", 'w') as f:
+            write_ndjson(f, (finding.to_dict() for finding in findings('b-1', 'b-2', 'b-3')))
+
+        base, head, diff = diff_scans(out)
+
+        assert (base, head) == ("aggregated_findings_20240101_000000.json",
+                                "aggregated_findings_20240108_000000.ndjson")
+        assert diff.counts() == {'new': 1, 'resolved': 1, 'unchanged': 2}
+        assert [f['resource'] for f in diff.new] == ['b-3']
+        assert [f['resource'] for f in diff.resolved] == ['b-0']
+        assert diff_scans(out, head="20240101_000000", base="20240101_000000")[2].counts() == \
+            {'new': 0, 'resolved': 0, 'unchanged': 3}
+        with pytest.raises(FileNotFoundError):
+            diff_scans(out, head="20240101_000000")
+
+    def test_compact_rolls_old_runs_into_history(self, aggregator, sample_prowler_finding):
+        """Old runs move to compressed segments; recent runs and the pointer stay"""
+        out = aggregator.output_dir
+        history = ScanHistory(out / "history")
+        scans = ['20240110_000000', '20240120_000000', '20240201_000000',
+                 '20240210_000000', '20240220_000000']
+        for n, scan in enumerate(scans):
+            findings = [
+                aggregator._normalize_prowler_finding(dict(sample_prowler_finding, ResourceId=f"b-{i}"))
+                for i in range(n + 1)
+            ]
+            with open(out / f"aggregated_findings_{scan}.json", 'w') as f:
+                write_findings_document(f, (x.to_dict() for x in findings),
+                                        aggregator.remediations_for(findings))
+            (out / f"findings_summary_{scan}.json").write_text(json.dumps({'total_findings': n + 1}))
+            history.record(scan, {'total_findings': n + 1}, [int(x.fingerprint, 16) for x in findings])
+        # The pointer still names an older run: it is kept anyway
+        write_latest_pointer(out, scans[1], [out / f"aggregated_findings_{scans[1]}.json"],
+                             out / f"findings_summary_{scans[1]}.json")
+
+        report = compact(out, keep_runs=2, history_days=0)
+
+        assert report.compacted == [scans[0], scans[2]]
+        assert report.kept == [scans[1], scans[3], scans[4]]
+        assert not list(out.glob(f"*_{scans[0]}.json"))
+        assert sorted(p.name for p in (out / "history" / "segments").iterdir()) == \
+            ['segment_202401.ndjson.gz', 'segment_202402.ndjson.gz']
+        header, findings = history.read_segment_run(scans[2])
+        assert header['summary'] == {'total_findings': 3} and len(findings) == 3
+        assert set(header['remediations']) == {findings[0]['remediation_id']}
+
+        # Compacted runs can still be compared; running again changes nothing
+        assert diff_scans(out, scans[0], scans[4])[2].counts() == \
+            {'new': 4, 'resolved': 0, 'unchanged': 1}
+        assert compact(out, keep_runs=2, history_days=0).compacted == []
+
+        # History older than 30 days (before 2024-02-04) is dropped; a
+        # segment goes once its whole month is older
+        compact(out, keep_runs=2, history_days=30, now=datetime(2024, 3, 5))
+        assert history.scan_ids() == scans[3:]
+        assert not history.fingerprints_file(scans[0]).exists()
+        assert not history.segment_file(scans[0]).exists()
+        assert history.segment_file(scans[2]).exists()
+
+    def test_store_delete_scans(self, aggregator, sample_prowler_finding):
+        """Deleting a scan removes its rows and its full-text entries"""
+        pytest.importorskip("sqlalchemy")
+        import sqlite3
+
+        findings = [aggregator._normalize_prowler_finding(sample_prowler_finding)]
+        store = FindingsStore(aggregator.output_dir / "findings.db")
+        for scan in ('20240101_000000', '20240102_000000'):
+            store.write_scan(scan, findings, aggregator.remediations_for(findings), {})
+
+        assert store.delete_scans(['20240101_000000', '20990101_000000']) == 1
+        store.engine.dispose()
+
+        db = sqlite3.connect(aggregator.output_dir / "findings.db")
+        assert db.execute("SELECT scan_timestamp FROM scans").fetchall() == [('20240102_000000',)]
+        assert db.execute("SELECT DISTINCT scan_id FROM findings").fetchall() == [(2,)]
+        assert db.execute("SELECT rowid FROM findings_fts WHERE findings_fts MATCH 'public'").fetchall() \
+            == [(2,)]
+        db.close()
+
+    def test_remediation_shared_per_check(self, aggregator, sample_prowler_finding):
+        """Every failing resource of a check points at one remediation entry"""
+        check = dict(sample_prowler_finding, Remediation={
+            'Recommendation': {'Text': 'Block public access on the bucket.', 'Url': ''},
+            'Code': {'CLI': 'aws s3api put-public-access-block --bucket <BUCKET>'},
+        })
+        (aggregator.prowler_dir / "prowler-output-1.json").write_text(json.dumps([
+            dict(check, ResourceId=f"bucket-{i}") for i in range(5)
+        ]))
+
+        findings = aggregator.load_prowler_findings()
+
+        assert {f.remediation_id for f in findings} == {'prowler:check_s3_bucket_public_access'}
+        assert len(aggregator.remediations) == 1
+        options = aggregator.remediations['prowler:check_s3_bucket_public_access']['options']
+        assert options[0]['type'] == 'cli'
+
+    def test_remediation_variants_get_separate_keys(self, tmp_path, sample_prowler_finding):
+        """The same check with different guidance in two accounts is not merged"""
+        prowler_dir = tmp_path / "prowler"
+        for account_id, text in [('111111111111', 'Old advice.'), ('222222222222', 'New advice.')]:
+            account_dir = prowler_dir / account_id
+            account_dir.mkdir(parents=True)
+            check = dict(sample_prowler_finding, AccountId=account_id,
+                         Remediation={'Recommendation': {'Text': text}})
+            (account_dir / f"prowler-output-{account_id}.json").write_text(json.dumps([check]))
+
+        for workers in (1, 2):
+            aggregator = FindingsAggregator(
+                prowler_dir=str(prowler_dir),
+                scoutsuite_dir=str(tmp_path / "scoutsuite"),
+                output_dir=str(tmp_path / f"output-{workers}"),
+                workers=workers
+            )
+            findings = aggregator.load_prowler_findings()
+
+            summaries = [aggregator.remediations[f.remediation_id]['summary'] for f in findings]
+            assert summaries == ['Old advice.', 'New advice.']
+            assert len(aggregator.remediations) == 2
+
+
+class TestFinding:
+    """Test suite for the slotted Finding record"""
+
+    @pytest.fixture
+    def sample_finding_dict(self):
+        """A normalized finding in its JSON form"""
+        return {
+            'source': 'Prowler', 'cloud_provider': 'AWS', 'finding_id': 's3_check',
+            'title': 'S3 check', 'severity': 'High', 'status': 'FAIL',
+            'resource': 'bucket', 'resource_arn': 'arn:aws:s3:::bucket',
+            'region': 'us-east-1', 'account_id': '111111111111',
+            'description': 'desc', 'issue': 'issue', 'risk': 'risk',
+            'remediation_id': 'prowler:s3_check',
+            'compliance': ['CIS-1.5'], 'timestamp': '2024-01-01T00:00:00',
+            'fingerprint': '7b0d51fac154f311',
+        }
+
+    def test_dict_round_trip(self, sample_finding_dict):
+        """to_dict/from_dict preserve every field"""
+        finding = Finding.from_dict(sample_finding_dict)
+
+        assert finding.to_dict() == sample_finding_dict
+        assert Finding.from_dict(finding.to_dict()) == finding
+
+    def test_mapping_access(self, sample_finding_dict):
+        """Findings can still be read like the old dicts"""
+        finding = Finding.from_dict(sample_finding_dict)
+
+        assert finding['severity'] == 'High'
+        assert finding.get('region') == 'us-east-1'
+        assert finding.get('not_a_field', 'default') == 'default'
+        assert dict(finding) == sample_finding_dict
+        with pytest.raises(KeyError):
+            finding['not_a_field']
+
+    def test_legacy_dict_gets_fingerprint(self, sample_finding_dict):
+        """Findings exported before fingerprints existed get one on load"""
+        legacy = {k: v for k, v in sample_finding_dict.items() if k != 'fingerprint'}
+        assert Finding.from_dict(legacy).fingerprint == sample_finding_dict['fingerprint']
+
+    def test_no_instance_dict(self, sample_finding_dict):
+        """Slots keep per-finding overhead down"""
+        assert not hasattr(Finding.from_dict(sample_finding_dict), '__dict__')
+
+
+class TestAtomicWrite:
+    """Test suite for atomic_write"""
+
+    def test_replaces_complete_file(self, tmp_path):
+        path = tmp_path / "summary.json"
+        path.write_text('old')
+        with atomic_write(path) as f:
+            f.write('new')
+            # Not visible until the write is complete
+            assert path.read_text() == 'old'
+        assert path.read_text() == 'new'
+        assert list(tmp_path.iterdir()) == [path]
+
+    def test_failed_write_keeps_old_file(self, tmp_path):
+        path = tmp_path / "summary.json"
+        path.write_text('old')
+        with pytest.raises(RuntimeError):
+            with atomic_write(path) as f:
+                f.write('partial')
+                raise RuntimeError("disk full")
+        assert path.read_text() == 'old'
+        assert list(tmp_path.iterdir()) == [path]
+
+
+class TestWriteJsonArray:
+    """Test suite for the incremental JSON array writer"""
+
+    @pytest.mark.parametrize("items", [
+        [],
+        [{'a': 1}],
+        [{'a': {'b': [1, 2]}, 'text': 'line\nbreak'}, [], 3, 'x'],
+    ])
+    def test_matches_json_dump(self, items):
+        """Output is identical to json.dump(..., indent=2)"""
+        out = io.StringIO()
+        write_json_array(out, iter(items))
+
+        assert out.getvalue() == json.dumps(items, indent=2)
+
+
+class TestWriteNdjson:
+    """Test suite for the NDJSON writer"""
+
+    def test_one_value_per_line(self):
+        """Each item is one compact line; newlines in strings stay escaped"""
+        items = [{'a': 1}, {'text': 'line\nbreak'}]
+        out = io.StringIO()
+
+        assert write_ndjson(out, iter(items)) == 2
+        assert out.getvalue() == '{"a":1}\n{"text":"line\\nbreak"}\n'
+        assert [json.loads(line) for line in out.getvalue().splitlines()] == items
+
+
+class TestReadScoutsuiteResults:
+    """Test suite for the memory-mapped ScoutSuite reader"""
+
+    def test_decodes_payload_after_marker(self, tmp_path):
+        """Whitespace and a trailing semicolon around the JSON are ignored"""
+        path = tmp_path / "scoutsuite_results_azure-tenant.js"
+        path.write_text('scoutsuite_results =\n  {"services": {"é": 1}};\n', encoding='utf-8')
+
+        assert read_scoutsuite_results(path) == {'services': {'é': 1}}
+
+    def test_missing_marker(self, tmp_path):
+        """Files without the assignment are not ScoutSuite results"""
+        path = tmp_path / "other.js"
+        path.write_text('var x = {};')
+
+        assert read_scoutsuite_results(path) is None
+
+    def test_empty_file(self, tmp_path):
+        """An empty file cannot be mapped and is treated as missing"""
+        path = tmp_path / "empty.js"
+        path.write_text('')
+
+        assert read_scoutsuite_results(path) is None
+
+    def test_invalid_json(self, tmp_path):
+        """A corrupt payload raises so the caller can report it"""
+        path = tmp_path / "broken.js"
+        path.write_text('scoutsuite_results = {"services": ')
+
+        with pytest.raises(json.JSONDecodeError):
+            read_scoutsuite_results(path)
+
+
+class TestIterJsonArray:
+    """Test suite for the streaming JSON array reader"""
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+    def test_matches_json_load(self, tmp_path, chunk_size):
+        """Elements come back identical regardless of chunk boundaries"""
+        data = [
+            {'Status': 'FAIL', 'Nested': {'List': [1, 2.5, None, True]}},
+            {'Status': 'PASS', 'Text': 'comma, bracket ] and "quotes"'},
+            12345,
+            'plain string',
+        ]
+        path = tmp_path / "data.json"
+        path.write_text(json.dumps(data, indent=2))
+
+        with open(path) as f:
+            assert list(iter_json_array(f, chunk_size=chunk_size)) == data
+
+    def test_empty_array(self, tmp_path):
+        """An empty array yields nothing"""
+        path = tmp_path / "empty.json"
+        path.write_text(" [ ] ")
+
+        with open(path) as f:
+            assert list(iter_json_array(f)) == []
+
+    def test_rejects_non_array(self, tmp_path):
+        """A top-level object is not a Prowler findings list"""
+        path = tmp_path / "object.json"
+        path.write_text('{"Status": "FAIL"}')
+
+        with open(path) as f:
+            with pytest.raises(json.JSONDecodeError):
+                list(iter_json_array(f))
+
+    def test_truncated_file(self, tmp_path):
+        """A half-written file is reported as a decode error"""
+        path = tmp_path / "truncated.json"
+        path.write_text('[{"Status": "FAIL"}, {"Status": ')
+
+        with open(path) as f:
+            with pytest.raises(json.JSONDecodeError):
+                list(iter_json_array(f, chunk_size=4))
+
+
+# A stand-in for `prowler aws`: writes one failing check for the account
+# of its --role after FAKE_PROWLER_SLEEP seconds, and exits 3 like
+# Prowler does when checks fail. Accounts listed in FAKE_PROWLER_HANG
+# never finish; those in FAKE_PROWLER_CRASH write half their output and
+# exit 1. With --region the bucket is in that region, and a global
+# IAM check is reported too (as Prowler does from every region).
+FAKE_PROWLER = """#!{python}
+import json, os, sys, time
+args = sys.argv[1:]
+output_dir = args[args.index('--output-directory') + 1]
+account_id = args[args.index('--role') + 1].split(':')[4]
+if account_id in os.environ.get('FAKE_PROWLER_HANG', '').split(','):
+    time.sleep(3600)
+time.sleep(float(os.environ.get('FAKE_PROWLER_SLEEP', '0')))
+region = args[args.index('--region') + 1] if '--region' in args else None
+checks = [{{'CheckID': 's3_bucket_public_access', 'Severity': 'high', 'Status': 'FAIL',
+           'AccountId': account_id, 'ResourceId': 'bucket-%s' % region if region else 'bucket',
+           'Region': region or 'us-east-1'}}]
+if region:
+    checks.append({{'CheckID': 'iam_root_mfa_enabled', 'Severity': 'critical', 'Status': 'FAIL',
+                    'AccountId': account_id, 'ResourceId': 'root', 'Region': 'us-east-1'}})
+if '--output-filename' in args:
+    name = args[args.index('--output-filename') + 1] + '.json'
+else:
+    name = 'prowler-output-%s-%s.json' % (account_id, time.strftime('%Y%m%d%H%M%S'))
+with open(os.path.join(output_dir, name), 'w') as f:
+    if account_id in os.environ.get('FAKE_PROWLER_CRASH', '').split(','):
+        f.write(json.dumps(checks)[:20])
+        sys.exit(1)
+    json.dump(checks, f)
+print('scanned', account_id)
+sys.exit(3)
+"""
+
+
+class TestMultiAccountScan:
+    """Test suite for the parallel multi-account scan (fake prowler on PATH)"""
+
+    ROLE = "arn:aws:iam::ACCOUNT_ID:role/SecurityAuditRole"
+
+    @pytest.fixture
+    def fake_prowler(self, tmp_path, monkeypatch):
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir()
+        prowler = bin_dir / "prowler"
+        prowler.write_text(FAKE_PROWLER.format(python=sys.executable))
+        prowler.chmod(0o755)
+        monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+        return prowler
+
+    def test_accounts_scanned_concurrently(self, tmp_path, fake_prowler, monkeypatch):
+        """Four 1-second scans with four workers take about one second"""
+        monkeypatch.setenv('FAKE_PROWLER_SLEEP', '1')
+        accounts = ['111111111111', '222222222222', '333333333333', '444444444444']
+        output_dir = tmp_path / "output"
+
+        start = time.monotonic()
+        results = scan_accounts([ScanTarget(a, role_arn=self.ROLE) for a in accounts],
+                                output_dir, workers=4, prowler=str(fake_prowler))
+        wall_time = time.monotonic() - start
+
+        assert [r.status for r in results] == ['completed'] * 4
+        assert [r.account_id for r in results] == accounts
+        assert wall_time < sum(r.duration for r in results) / 2
+        assert 'speedup' in speedup_report(results, wall_time)
+        for result in results:
+            pointer = json.loads((output_dir / result.account_id / "latest.json").read_text())
+            assert pointer['files'] == [f.name for f in result.output_files]
+
+        aggregator = FindingsAggregator(str(output_dir), str(tmp_path / "scoutsuite"),
+                                        str(tmp_path / "aggregated"))
+        assert len(aggregator.load_prowler_findings()) == 4
+
+    def test_timeout_stops_one_account(self, tmp_path, fake_prowler, monkeypatch):
+        """A hung scan is stopped and reported; the other accounts still finish"""
+        monkeypatch.setenv('FAKE_PROWLER_HANG', '222222222222')
+        targets = [ScanTarget(a, role_arn=self.ROLE) for a in ['111111111111', '222222222222']]
+
+        results = scan_accounts(targets, tmp_path / "output", workers=2,
+                                prowler=str(fake_prowler), timeout=1)
+
+        assert [r.status for r in results] == ['completed', 'timeout']
+        assert results[1].duration < 30
+        assert not (tmp_path / "output" / '222222222222' / "latest.json").exists()
+
+    def test_crashed_scan_is_failed(self, tmp_path, fake_prowler, monkeypatch):
+        """A scan that exits with an error is failed, even though it left output behind"""
+        monkeypatch.setenv('FAKE_PROWLER_CRASH', '222222222222')
+        output_dir = tmp_path / "output"
+        journal = ScanJournal(output_dir / "scan-journal.jsonl")
+        targets = [ScanTarget(a, role_arn=self.ROLE) for a in ['111111111111', '222222222222']]
+
+        results = scan_accounts(targets, output_dir, workers=2, prowler=str(fake_prowler),
+                                journal=journal)
+        sharded, = scan_accounts([targets[1]], tmp_path / "sharded", prowler=str(fake_prowler),
+                                 shards=region_shards(['eu-west-1', 'us-east-1']))
+
+        assert [r.status for r in results] == ['completed', 'failed']
+        assert 'exited with 1' in results[1].message
+        assert list((output_dir / '222222222222').glob("prowler-output-*.json"))
+        assert not (output_dir / '222222222222' / "latest.json").exists()
+        assert journal.entries['222222222222']['status'] == 'failed'
+        pending, _ = resume_targets(targets, journal)
+        assert [t.account_id for t in pending] == ['222222222222']
+
+        assert sharded.status == 'failed'
+        assert not (tmp_path / "sharded" / '222222222222' / "latest.json").exists()
+
+    def test_sharded_scan_merges_shards(self, tmp_path, fake_prowler):
+        """Region shards run side by side; the aggregator merges them into one account"""
+        output_dir = tmp_path / "output"
+        regions = ['eu-west-1', 'us-east-1', 'ap-south-1']
+
+        result, = scan_accounts([ScanTarget('111111111111', role_arn=self.ROLE)], output_dir,
+                                prowler=str(fake_prowler), shards=region_shards(regions))
+
+        assert result.status == 'completed'
+        assert [f.name[:-len('-20240101000000.json')] for f in result.output_files] == [
+            f"prowler-output-111111111111-{region}" for region in regions]
+        account_dir = output_dir / '111111111111'
+        pointer = json.loads((account_dir / "latest.json").read_text())
+        assert pointer['files'] == [f.name for f in result.output_files]
+
+        aggregator = FindingsAggregator(str(output_dir), str(tmp_path / "scoutsuite"),
+                                        str(tmp_path / "aggregated"))
+        # Three regional buckets, and the global IAM check once (not once per shard)
+        findings = aggregator._load_prowler_from_dir(account_dir)
+        assert sorted(f.resource for f in findings) == [
+            'bucket-ap-south-1', 'bucket-eu-west-1', 'bucket-us-east-1', 'root']
+        aggregator.aggregate_findings()
+        assert aggregator.generate_summary()['by_severity'] == {'High': 3, 'Critical': 1}
+        assert aggregator.summary_counter.total == 4
+        assert len(list(aggregator.iter_findings())) == 4
+        assert aggregator.summary_counter.total == 4
+
+    def test_service_shards_cover_full_scan(self):
+        """Every service not in a group runs in the 'rest' shard"""
+        shards = service_shards(['ec2, vpc', 'iam', ''])
+        assert [shard.name for shard in shards] == ['ec2+vpc', 'iam', 'rest']
+        assert shards[0].args == ('--service', 'ec2', 'vpc')
+        assert shards[-1].args == ('--excluded-services', 'ec2', 'vpc', 'iam')
+
+    def test_journal_and_resume(self, tmp_path, fake_prowler, monkeypatch):
+        """A resumed run only scans the accounts that did not complete recently"""
+        monkeypatch.setenv('FAKE_PROWLER_HANG', '222222222222')
+        output_dir = tmp_path / "output"
+        targets = [ScanTarget(a, role_arn=self.ROLE)
+                   for a in ['111111111111', '222222222222', '333333333333']]
+        journal = ScanJournal(output_dir / "scan-journal.jsonl")
+
+        scan_accounts(targets, output_dir, workers=3, prowler=str(fake_prowler), timeout=1,
+                      journal=journal)
+
+        entry = journal.entries['111111111111']
+        assert entry['status'] == 'completed'
+        assert entry['output_files'][0].startswith('111111111111/prowler-output-')
+        assert journal.entries['222222222222']['status'] == 'timeout'
+
+        # Read back after a crash that cut the last line short
+        with open(journal.path, 'a') as f:
+            f.write('{"target": "333333333333", "sta')
+        journal = ScanJournal(journal.path)
+        pending, done = resume_targets(targets, journal)
+        assert [t.account_id for t in pending] == ['222222222222']
+        assert sorted(done) == ['111111111111', '333333333333']
+
+        # Too old, or its output is gone: scanned again
+        pending, _ = resume_targets(targets, journal, fresh_hours=-1)
+        assert len(pending) == 3
+        (output_dir / journal.entries['333333333333']['output_files'][0]).unlink()
+        pending, _ = resume_targets(targets, journal)
+        assert [t.account_id for t in pending] == ['222222222222', '333333333333']
+
+        journal.compact()
+        assert len(journal.path.read_text().splitlines()) == 3
+
+    def test_failing_callback_does_not_stop_reporting(self, tmp_path, fake_prowler, capsys):
+        """An on_result error is reported for its account; the others are still handled"""
+        accounts = ['111111111111', '222222222222', '333333333333']
+        journal = ScanJournal(tmp_path / "output" / "scan-journal.jsonl")
+        handled = []
+
+        def on_result(result):
+            handled.append(result.account_id)
+            if len(handled) == 1:
+                raise ValueError("malformed Prowler output")
+
+        results = scan_accounts([ScanTarget(a, role_arn=self.ROLE) for a in accounts],
+                                tmp_path / "output", workers=1, prowler=str(fake_prowler),
+                                on_result=on_result, journal=journal)
+
+        assert [r.status for r in results] == ['completed'] * 3
+        assert sorted(handled) == accounts
+        assert all(journal.entries[a]['status'] == 'completed' for a in accounts)
+        assert "malformed Prowler output" in capsys.readouterr().out
+
+    def test_command_line(self, tmp_path, fake_prowler):
+        """The script finds prowler on PATH and reports the speedup over serial"""
+        script = Path(__file__).parent.parent / "scripts" / "scanning" / "multi_account_scan.py"
+        out = subprocess.run(
+            [sys.executable, str(script), '--accounts', '111111111111,222222222222',
+             '--role-arn', self.ROLE, '--output-dir', str(tmp_path / "output")],
+            capture_output=True, text=True
+        )
+
+        assert out.returncode == 0, out.stderr
+        assert '2/2 account(s) scanned' in out.stdout
+        assert 'speedup:' in out.stdout
+        assert 'scanned 111111111111' in (
+            tmp_path / "output" / '111111111111' / "prowler-scan.log").read_text()
+
+        out = subprocess.run(
+            [sys.executable, str(script), '--accounts', '111111111111,222222222222',
+             '--role-arn', self.ROLE, '--output-dir', str(tmp_path / "output"), '--resume'],
+            capture_output=True, text=True
+        )
+        assert out.returncode == 0, out.stderr
+        assert '2 account(s) already done, 0 to scan' in out.stdout
+
+    def test_results_aggregated_as_they_land(self, tmp_path, fake_prowler):
+        """on_result hands each finished account to the running aggregation"""
+        output_dir = tmp_path / "output"
+        aggregator = FindingsAggregator(str(output_dir), str(tmp_path / "scoutsuite"),
+                                        str(tmp_path / "aggregated"))
+        running = RunningAggregation(aggregator, expected_accounts=2, publish_interval=0)
+
+        def on_result(scan):
+            assert scan.status == 'completed'
+            running.add(scan.output_files)
+
+        scan_accounts([ScanTarget(a, role_arn=self.ROLE) for a in ['111111111111', '222222222222']],
+                      output_dir, workers=2, prowler=str(fake_prowler), on_result=on_result)
+
+        pointer = read_latest_pointer(aggregator.output_dir)
+        summary = json.loads((aggregator.output_dir / pointer['summary']).read_text())
+        assert summary['in_progress']['accounts_aggregated'] == 2
+        assert summary['total_findings'] == 2
+
+
+class TestScanPipeline:
+    """Test suite for pipelined aggregation (scan_pipeline.py)"""
+
+    def write_scan(self, prowler_dir, account_id, resources, timestamp):
+        account_dir = prowler_dir / account_id
+        account_dir.mkdir(parents=True, exist_ok=True)
+        checks = [{'CheckID': 's3_bucket_public_access', 'Severity': 'high', 'Status': 'FAIL',
+                   'AccountId': account_id, 'ResourceId': r, 'Region': 'us-east-1'}
+                  for r in resources]
+        path = account_dir / f"prowler-output-{account_id}-{timestamp}.json"
+        path.write_text(json.dumps(checks))
+        write_prowler_pointer(account_dir, [path])
+
+    def test_partial_snapshots_then_full_export(self, tmp_path):
+        """Each landed account is published right away; the end result is a normal run"""
+        prowler_dir = tmp_path / "prowler"
+        # Finished before the watch started: not reported, but in the full export
+        self.write_scan(prowler_dir, '333333333333', ['old'], '20240101000000')
+        aggregator = FindingsAggregator(str(prowler_dir), str(tmp_path / "scoutsuite"),
+                                        str(tmp_path / "aggregated"))
+        watcher = ProwlerWatcher(prowler_dir)
+        running = RunningAggregation(aggregator, expected_accounts=2, publish_interval=0)
+        assert watcher.poll() == []
+
+        self.write_scan(prowler_dir, '111111111111', ['a', 'b'], '20240201000000')
+        assert watcher.poll() == [prowler_dir / '111111111111']
+        running.add(aggregator.latest_prowler_files(prowler_dir / '111111111111'))
+
+        pointer = read_latest_pointer(aggregator.output_dir)
+        assert pointer['findings'][0].startswith('partial/')
+        summary = json.loads((aggregator.output_dir / pointer['summary']).read_text())
+        assert summary['total_findings'] == 2
+        assert summary['in_progress']['accounts_aggregated'] == 1
+        assert summary['in_progress']['accounts_expected'] == 2
+        assert len(list(read_export(aggregator.output_dir / pointer['findings'][0]))) == 2
+
+        self.write_scan(prowler_dir, '222222222222', ['c'], '20240201000000')
+        assert watcher.poll() == [prowler_dir / '222222222222']
+        running.add(aggregator.latest_prowler_files(prowler_dir / '222222222222'))
+        assert watcher.poll() == []
+        running.finish()
+
+        # Nothing normalized twice: only the account from before the watch is parsed now
+        assert aggregator.cache.misses == 3
+        pointer = read_latest_pointer(aggregator.output_dir)
+        assert '/' not in pointer['findings'][0]
+        summary = json.loads((aggregator.output_dir / pointer['summary']).read_text())
+        assert 'in_progress' not in summary
+        assert summary['by_account'] == {'111111111111': 2, '222222222222': 1,
+                                         '333333333333': 1}
+        assert not (aggregator.output_dir / "partial").exists()
+
+    def test_publish_interval_batches_accounts(self, tmp_path):
+        """Accounts landing within the interval wait for the next snapshot"""
+        prowler_dir = tmp_path / "prowler"
+        aggregator = FindingsAggregator(str(prowler_dir), str(tmp_path / "scoutsuite"),
+                                        str(tmp_path / "aggregated"))
+        running = RunningAggregation(aggregator, publish_interval=3600)
+        for account_id in ['111111111111', '222222222222']:
+            self.write_scan(prowler_dir, account_id, ['a'], '20240201000000')
+            running.add(aggregator.latest_prowler_files(prowler_dir / account_id))
+
+        summary_file = aggregator.output_dir / read_latest_pointer(aggregator.output_dir)['summary']
+        assert json.loads(summary_file.read_text())['total_findings'] == 1
+        assert running.publish(force=True)
+        assert json.loads(summary_file.read_text())['total_findings'] == 2
+        assert not running.publish(force=True)
+
+    def test_abort_restores_previous_pointer(self, tmp_path, monkeypatch):
+        """A run that crashes before its full export leaves the dashboard on the previous run"""
+        prowler_dir = tmp_path / "prowler"
+        aggregator = FindingsAggregator(str(prowler_dir), str(tmp_path / "scoutsuite"),
+                                        str(tmp_path / "aggregated"))
+        self.write_scan(prowler_dir, '111111111111', ['a'], '20240101000000')
+        aggregator.aggregate_findings()
+        aggregator.export_results()
+        previous = read_latest_pointer(aggregator.output_dir)
+
+        running = RunningAggregation(aggregator, publish_interval=0)
+        running.add(aggregator.latest_prowler_files(prowler_dir / '111111111111'))
+        assert read_latest_pointer(aggregator.output_dir)['findings'][0].startswith('partial/')
+
+        def crash():
+            raise OSError("disk full")
+        monkeypatch.setattr(aggregator, 'export_results', crash)
+        with pytest.raises(OSError):
+            try:
+                running.finish()
+            finally:
+                running.abort()
+
+        assert read_latest_pointer(aggregator.output_dir) == previous
+        assert not (aggregator.output_dir / "partial").exists()
+
+
+# A stand-in for the AWS CLI: logs each call to FAKE_AWS_LOG and answers
+# the identity of two profiles and an organization's account list.
+FAKE_AWS = """#!{python}
+import os, sys
+args = sys.argv[1:]
+with open(os.environ['FAKE_AWS_LOG'], 'a') as f:
+    f.write(' '.join(args) + '\\n')
+if args[:2] == ['sts', 'get-caller-identity']:
+    profile = args[args.index('--profile') + 1] if '--profile' in args else 'default'
+    print({{'prod': '111111111111', 'dev': '222222222222'}}.get(profile, '999999999999'))
+elif args[:2] == ['organizations', 'list-accounts']:
+    print('111111111111\\t222222222222')
+else:
+    sys.exit(255)
+"""
+
+
+class TestAccountDiscovery:
+    """Test suite for cached account discovery (fake AWS CLI on PATH)"""
+
+    @pytest.fixture
+    def aws_calls(self, tmp_path, monkeypatch):
+        """The AWS CLI calls made so far (boto3, if installed, is not used here)"""
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir()
+        aws = bin_dir / "aws"
+        aws.write_text(FAKE_AWS.format(python=sys.executable))
+        aws.chmod(0o755)
+        log = tmp_path / "aws-calls.log"
+        log.touch()
+        monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+        monkeypatch.setenv('FAKE_AWS_LOG', str(log))
+        monkeypatch.delenv('AWS_ACCESS_KEY_ID', raising=False)
+        monkeypatch.delenv('AWS_PROFILE', raising=False)
+        monkeypatch.setattr(aws_discovery, 'boto3', None)
+        return lambda: log.read_text().splitlines()
+
+    def test_each_lookup_made_once(self, tmp_path, aws_calls):
+        """Repeated questions in one run are answered from memory"""
+        discovery = AccountDiscovery()
+
+        assert [discovery.account_id(p) for p in ['prod', 'dev', 'prod']] == [
+            '111111111111', '222222222222', '111111111111']
+        assert discovery.organization_accounts() == ['111111111111', '222222222222']
+        assert discovery.organization_accounts() == ['111111111111', '222222222222']
+        assert discovery.account_id('missing') == '999999999999'
+
+        assert len(aws_calls()) == 4
+        assert (discovery.lookups, discovery.hits) == (4, 2)
+
+    def test_cached_on_disk_until_ttl(self, tmp_path, aws_calls, monkeypatch):
+        """A later run within the TTL makes no calls; other credentials do not share answers"""
+        cache_file = tmp_path / ".discovery-cache.json"
+        first = AccountDiscovery(cache_file, ttl=3600)
+        first.account_id('prod')
+        first.account_id()
+        first.organization_accounts()
+        assert len(aws_calls()) == 3
+
+        second = AccountDiscovery(cache_file, ttl=3600)
+        assert second.account_id('prod') == '111111111111'
+        assert second.organization_accounts() == ['111111111111', '222222222222']
+        assert second.lookups == 0
+        assert len(aws_calls()) == 3
+
+        # Different default credentials: looked up again
+        monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'AKIAEXAMPLE')
+        assert second.account_id() == '999999999999'
+        assert len(aws_calls()) == 4
+        assert 'AKIAEXAMPLE' not in cache_file.read_text()
+
+        # Expired, or caching turned off
+        time.sleep(0.01)
+        AccountDiscovery(cache_file, ttl=0.001).account_id('prod')
+        AccountDiscovery(cache_file, ttl=0).account_id('prod')
+        assert len(aws_calls()) == 6
+
 
 # TODO: Add more test cases
 # - Test with actual Prowler JSON files